@@ -1,25 +1,39 @@
 from fastapi import FastAPI, Request, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import time
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
 from typing import Dict, Optional
 import logging
+import orjson
+from pydantic import BaseModel, Field
 
 from config.settings import settings
-from api_gateway.middleware import RateLimiter, AuthMiddleware
+from api_gateway.middleware import RedisRateLimiter, AuthMiddleware
 from orchestration.conversation_manager import ConversationManager
-from security.auth_service import AuthService
+from security.auth_service import get_auth_service
+from transaction_engine.workflow_engine import get_transaction_engine
 
 logger = logging.getLogger(__name__)
 
+# Hot settings bound once at import
+APP_NAME = settings.APP_NAME
+APP_VERSION = settings.APP_VERSION
+REQUEST_TIMEOUT = settings.API_REQUEST_TIMEOUT
+TRANSACTION_TIMEOUT = settings.CORE_BANKING_TIMEOUT
+
 # Initialize FastAPI app
 app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
-    docs_url="/docs" if settings.DEBUG else None
+    title=APP_NAME,
+    version=APP_VERSION,
+    docs_url="/docs" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
@@ -32,11 +46,44 @@ app.add_middleware(
 )
 
 # Initialize services
-conversation_manager = ConversationManager()
-auth_service = AuthService()
+# (ConversationManager is created in startup_event on the running loop)
+auth_service = get_auth_service()
+tx_engine = get_transaction_engine()
+
+# Rate Limiter (Redis-backed once connected at startup, shared across workers)
+rate_limiter = RedisRateLimiter(max_requests=settings.API_RATE_LIMIT, window_seconds=60)
+redis_client = None
+
+# Frontend UI, read once at startup and served from memory
+FRONTEND_HTML_PATH = Path("frontend/index.html")
+frontend_html: Optional[bytes] = None
+
+# ============================================================================
+# Request Models
+# ============================================================================
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1)
+    session_id: Optional[str] = None
+    stream: bool = False  # answer as Server-Sent Events
+
+class LoginRequest(BaseModel):
+    user_id: str
+    otp: str
+
+class OTPRequest(BaseModel):
+    user_id: str
+
+class TransactionRequest(BaseModel):
+    type: str
+    params: Dict = Field(default_factory=dict)
 
-# Rate Limiter
-rate_limiter = RateLimiter(max_requests=settings.API_RATE_LIMIT, window_seconds=60)
+# ============================================================================
+# Dependencies
+# ============================================================================
+
+def get_conversation_manager(request: Request) -> ConversationManager:
+    return request.app.state.conversation_manager
 
 # ============================================================================
 # API Endpoints
@@ -44,13 +91,11 @@ rate_limiter = RateLimiter(max_requests=settings.API_RATE_LIMIT, window_seconds=
 
 @app.get("/")
 async def root():
-    from pathlib import Path
-    html_file = Path("frontend/index.html")
-    if html_file.exists():
-        return HTMLResponse(content=html_file.read_text(encoding='utf-8'))
+    if frontend_html is not None:
+        return HTMLResponse(content=frontend_html)
     else:
-        return JSONResponse(content={
-            "service": settings.APP_NAME,
+        return ORJSONResponse(content={
+            "service": APP_NAME,
             "status": "operational",
             "message": "Frontend UI not yet created. Use /docs for API documentation"
         })
@@ -58,117 +103,164 @@ async def root():
 @app.get("/ops")
 async def root():
     return {
-        "service": settings.APP_NAME,
-        "version": settings.APP_VERSION,
+        "service": APP_NAME,
+        "version": APP_VERSION,
         "status": "operational"
     }
 
+HEALTH_COMPONENTS = {
+    "api_gateway": "up",
+    "llm_core": "up",
+    "vector_db": "up",
+    "transaction_engine": "up"
+}
+
+@lru_cache(maxsize=1)
+def _health_body(second: int) -> bytes:
+    """Encoded health response, built at most once per wall-clock second"""
+    return orjson.dumps({
+        "status": "healthy",
+        "timestamp": datetime.fromtimestamp(second),
+        "components": HEALTH_COMPONENTS
+    })
+
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "components": {
-            "api_gateway": "up",
-            "llm_core": "up",
-            "vector_db": "up",
-            "transaction_engine": "up"
-        }
-    }
+    return Response(content=_health_body(int(time.time())), media_type="application/json")
+
+async def _sse_events(response: Dict):
+    """Streamed chat reply as SSE: a meta event, one data event per chunk, then done"""
+    stream = response.pop("message_stream")
+    try:
+        yield b"event: meta\ndata: " + orjson.dumps(response) + b"\n\n"
+        async for chunk in stream:
+            yield b"data: " + orjson.dumps(chunk) + b"\n\n"
+        yield b"event: done\ndata: {}\n\n"
+    finally:
+        # On disconnect too, so the turn is finished and the LLM stream closed
+        await stream.aclose()
 
 @app.post("/api/v1/chat")
-async def chat(request: Request):
+async def chat(
+    req: ChatRequest,
+    request: Request,
+    conversation_manager: ConversationManager = Depends(get_conversation_manager)
+):
     '''Main chat endpoint - routes through orchestration layer'''
     try:
+        # Read client address and headers straight from the ASGI scope
+        scope = request.scope
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        raw_headers = dict(scope["headers"])
+        
         # Rate limiting
-        client_ip = request.client.host
-        if not rate_limiter.check_limit(client_ip):
+        if not await rate_limiter.check_limit(client_ip):
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
         
-        # Parse request
-        body = await request.json()
-        message = body.get("message")
-        session_id = body.get("session_id") or request.headers.get("X-Session-ID")
-        
-        if not message:
-            raise HTTPException(status_code=400, detail="Message is required")
+        message = req.message
+        session_id = req.session_id
+        if not session_id and b"x-session-id" in raw_headers:
+            session_id = raw_headers[b"x-session-id"].decode("latin-1")
         
         # Get authentication token
-        auth_token = request.headers.get("Authorization")
+        auth_token = raw_headers.get(b"authorization")
         user_context = None
         if auth_token:
-            user_context = auth_service.verify_token(auth_token)
+            auth_token = auth_token.decode("latin-1")
+            user_context = (
+                auth_service.cached_token(auth_token)
+                or await run_in_threadpool(auth_service.verify_token, auth_token)
+            )
         
-        # Process through orchestration layer
-        response = await conversation_manager.process_message(
-            message=message,
-            session_id=session_id,
-            user_context=user_context
-        )
+        # Process through orchestration layer, bounded so a slow LLM/RAG
+        # call cannot hold the worker slot indefinitely
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            response = await conversation_manager.process_message(
+                message=message,
+                session_id=session_id,
+                user_context=user_context,
+                stream=req.stream
+            )
+        
+        if "message_stream" in response:
+            return StreamingResponse(_sse_events(response), media_type="text/event-stream")
         
-        return JSONResponse(content=response)
+        # Already JSON-native (datetimes included) - skip jsonable_encoder
+        return ORJSONResponse(response)
         
     except HTTPException:
         raise
+    except TimeoutError:
+        logger.warning("Chat request timed out after %ss", REQUEST_TIMEOUT)
+        raise HTTPException(status_code=504, detail="Request timed out")
     except Exception as e:
-        logger.error(f"Chat error: {str(e)}", exc_info=True)
+        logger.error("Chat error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/v1/auth/login")
-async def login(request: Request):
+async def login(req: LoginRequest):
     '''Authenticate user and return JWT token'''
-    body = await request.json()
-    user_id = body.get("user_id")
-    otp = body.get("otp")
+    user_id = req.user_id
+    otp = req.otp
     
     # Verify OTP
-    if auth_service.verify_otp(user_id, otp):
-        token = auth_service.create_token(user_id)
+    if await auth_service.verify_otp(user_id, otp):
+        token = await run_in_threadpool(auth_service.create_token, user_id)
         return {"token": token, "user_id": user_id}
     else:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
 @app.post("/api/v1/auth/request-otp")
-async def request_otp(request: Request):
+async def request_otp(req: OTPRequest):
     '''Request OTP for authentication'''
-    body = await request.json()
-    user_id = body.get("user_id")
+    user_id = req.user_id
     
-    otp = auth_service.generate_otp(user_id)
+    otp = await auth_service.generate_otp(user_id)
     # In production, send via SMS/Email
-    logger.info(f"OTP for {user_id}: {otp}")
+    logger.info("OTP for %s: %s", user_id, otp)
     
     return {"message": "OTP sent successfully"}
 
 @app.post("/api/v1/transactions/execute")
-async def execute_transaction(request: Request):
+async def execute_transaction(req: TransactionRequest, request: Request):
     '''Execute banking transaction'''
     # This endpoint requires authentication
     auth_token = request.headers.get("Authorization")
     if not auth_token:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    user_context = auth_service.verify_token(auth_token)
-    body = await request.json()
-    
-    # Process through transaction engine
-    from transaction_engine.workflow_engine import TransactionEngine
-    tx_engine = TransactionEngine()
-    
-    result = await tx_engine.execute(
-        transaction_type=body.get("type"),
-        params=body.get("params"),
-        user_context=user_context
+    user_context = (
+        auth_service.cached_token(auth_token)
+        or await run_in_threadpool(auth_service.verify_token, auth_token)
     )
+    if user_context is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    # Process through transaction engine. Shielded so a timeout only stops
+    # waiting - a transaction already sent to core banking still completes.
+    try:
+        async with asyncio.timeout(TRANSACTION_TIMEOUT):
+            result = await asyncio.shield(tx_engine.execute(
+                transaction_type=req.type,
+                params=req.params,
+                user_context=user_context
+            ))
+    except TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Transaction is still processing. Please check its status shortly."
+        )
     
-    return result
+    # Returned as a response so FastAPI skips jsonable_encoder; orjson
+    # handles the result's datetimes and floats natively
+    return ORJSONResponse(result)
 
 @app.get("/api/v1/documents/ingest")
 async def ingest_documents():
     '''Trigger document ingestion into vector DB'''
-    from knowledge_base.rag_engine import RAGEngine
-    
-    rag = RAGEngine()
+    # RAG engine is built on first use (loads embeddings client and vector store)
+    from knowledge_base.rag_engine import get_rag_engine
+    rag = get_rag_engine()
     result = await rag.ingest_documents()
     
     return {"status": "success", "documents_processed": result}
@@ -179,8 +271,45 @@ async def ingest_documents():
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
+    logger.info("Starting %s v%s", APP_NAME, APP_VERSION)
+    logger.info("Environment: %s", settings.ENVIRONMENT)
+    
+    # Conversation orchestration, shared by all requests on this worker
+    app.state.conversation_manager = ConversationManager()
+    
+    # Load frontend UI into memory
+    global frontend_html
+    if FRONTEND_HTML_PATH.exists():
+        frontend_html = FRONTEND_HTML_PATH.read_bytes()
+    
+    # Connect shared rate limit, session, transaction and OTP stores
+    global redis_client
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+    
+    client = aioredis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB
+    )
+    try:
+        await client.ping()
+        rate_limiter.connect(client)
+        app.state.conversation_manager.sessions.connect(client)
+        tx_engine.transactions.connect(client)
+        auth_service.connect(client)
+        redis_client = client
+        logger.info("Rate limiter, session, transaction and OTP stores connected to Redis")
+    except RedisError as e:
+        await client.aclose()
+        logger.warning("Redis unavailable (%s) - using in-process rate limiter", e)
+    
+    # First-use setup of the transaction path, so the first transaction
+    # does not pay for it
+    await tx_engine.warmup()
+    
+    # Sweep idle identifiers from the in-process limiter off the request path
+    app.state.rate_limit_reaper = asyncio.create_task(rate_limiter.fallback.run_reaper())
     
     # Initialize components
     from knowledge_base.vector_store import VectorStore
@@ -193,6 +322,12 @@ async def startup_event():
 async def shutdown_event():
     logger.info("Shutting down gracefully...")
     # Cleanup resources
+    app.state.rate_limit_reaper.cancel()
+    from llm_core.mistral_client import MistralClient
+    await run_in_threadpool(MistralClient.save_semantic_cache)
+    await app.state.conversation_manager.audit.close()
+    if redis_client is not None:
+        await redis_client.aclose()
 
 if __name__ == "__main__":
     import uvicorn
@@ -200,5 +335,8 @@ if __name__ == "__main__":
         "api_gateway.gateway:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
-        reload=settings.DEBUG
+        workers=settings.API_WORKERS,
+        loop="uvloop",
+        http="httptools",
+        reload=False
     )
\ No newline at end of file
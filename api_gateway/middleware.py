@@ -1,37 +1,176 @@
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict
+import asyncio
+from collections import OrderedDict
+import time
+import uuid
+from typing import Tuple
 import logging
 
+from redis.exceptions import RedisError
+
 logger = logging.getLogger(__name__)
 
+class _LimiterShard:
+    """One slice of the rate limiter state with its own lock and LRU queues"""
+
+    __slots__ = ("lock", "probation", "protected")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.probation: OrderedDict[str, Tuple[int, int, int]] = OrderedDict()
+        self.protected: OrderedDict[str, Tuple[int, int, int]] = OrderedDict()
+
 class RateLimiter:
-    def __init__(self, max_requests: int, window_seconds: int):
+    """
+    Sliding window counter rate limiter
+
+    Each identifier holds only (window, prev_count, cur_count). The rate is
+    estimated by weighting the previous fixed window by how much of it still
+    overlaps the sliding window - O(1) integer math per check.
+
+    Tracked identifiers are capped with an LRU-2 style policy: identifiers
+    seen once sit in a probation queue that is evicted first, so floods of
+    rotating source IPs cannot push out repeat clients.
+
+    State is split into power-of-two shards selected by hash(identifier),
+    each with its own lock and LRU, so concurrent checks rarely contend.
+    """
+
+    NUM_SHARDS = 64  # must be a power of two
+
+    def __init__(self, max_requests: int, window_seconds: int, max_identifiers: int = 100_000):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, list] = defaultdict(list)
-    
-    def check_limit(self, identifier: str) -> bool:
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=self.window_seconds)
-        
-        # Clean old requests
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if req_time > cutoff
-        ]
-        
+        self.max_identifiers = max_identifiers
+        self.shard_capacity = max(1, max_identifiers // self.NUM_SHARDS)
+        self.shards = [_LimiterShard() for _ in range(self.NUM_SHARDS)]
+
+    def _shard(self, identifier: str) -> _LimiterShard:
+        return self.shards[hash(identifier) & (self.NUM_SHARDS - 1)]
+
+    async def check_limit(self, identifier: str) -> bool:
+        shard = self._shard(identifier)
+
+        async with shard.lock:
+            now = time.monotonic()
+            window = int(now // self.window_seconds)
+
+            state = shard.protected.pop(identifier, None)
+            if state is None:
+                state = shard.probation.pop(identifier, None)
+            repeat = state is not None
+            stored_window, prev_count, cur_count = state or (window, 0, 0)
+
+            # Rotate fixed windows
+            if stored_window == window - 1:
+                prev_count, cur_count = cur_count, 0
+            elif stored_window != window:
+                # Entirely out of window - drop history and treat as new
+                prev_count, cur_count = 0, 0
+                repeat = False
+
+            # Weight previous window by its remaining overlap
+            elapsed = (now % self.window_seconds) / self.window_seconds
+            estimated = prev_count * (1 - elapsed) + cur_count
+
+            allowed = estimated < self.max_requests
+            if allowed:
+                cur_count += 1
+            self._store(shard, identifier, (window, prev_count, cur_count), repeat)
+
         # Check limit
-        if len(self.requests[identifier]) >= self.max_requests:
-            logger.warning(f"Rate limit exceeded for {identifier}")
+        if not allowed:
+            logger.warning("Rate limit exceeded for %s", identifier)
+        return allowed
+
+    async def run_reaper(self):
+        """Background task: sweep expired identifiers once per window"""
+        while True:
+            await asyncio.sleep(self.window_seconds)
+            removed = await self.reap()
+            if removed:
+                logger.debug("Rate limiter reaped %d idle identifiers", removed)
+
+    async def reap(self) -> int:
+        """Drop identifiers whose counters have entirely left the window"""
+        stale_before = int(time.monotonic() // self.window_seconds) - 1
+        removed = 0
+
+        for shard in self.shards:
+            async with shard.lock:
+                for queue in (shard.probation, shard.protected):
+                    # Queues are in access order, so stale entries sit at the front
+                    while queue and next(iter(queue.values()))[0] < stale_before:
+                        queue.popitem(last=False)
+                        removed += 1
+
+        return removed
+
+    def _store(self, shard: _LimiterShard, identifier: str, state: Tuple[int, int, int], repeat: bool):
+        """Insert as most recently used; hard cap evicts probation entries first"""
+        (shard.protected if repeat else shard.probation)[identifier] = state
+
+        while len(shard.probation) + len(shard.protected) > self.shard_capacity:
+            (shard.probation or shard.protected).popitem(last=False)
+
+class RedisRateLimiter:
+    """
+    Redis-backed sliding window rate limiter
+
+    State lives in a per-identifier sorted set so every worker process shares
+    the same limit. Trim + count + insert run atomically in one Lua script
+    (one round-trip per check). Falls back to the in-process RateLimiter
+    while Redis is not connected or unreachable.
+    """
+
+    # KEYS[1] = rate limit key; ARGV = window_seconds, max_requests, member
+    SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local window = tonumber(ARGV[1]) * 1000000
+local limit = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) >= limit then
+    return 0
+end
+redis.call('ZADD', key, now, ARGV[3])
+redis.call('EXPIRE', key, ARGV[1])
+return 1
+"""
+
+    def __init__(self, max_requests: int, window_seconds: int):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.fallback = RateLimiter(max_requests, window_seconds)
+        self.redis = None
+        self._script = None
+
+    def connect(self, redis_client) -> None:
+        """Attach a redis.asyncio client and register the Lua script"""
+        self.redis = redis_client
+        self._script = redis_client.register_script(self.SLIDING_WINDOW_SCRIPT)
+
+    async def check_limit(self, identifier: str) -> bool:
+        if self._script is None:
+            return await self.fallback.check_limit(identifier)
+
+        try:
+            # EVALSHA, re-sending the script body only if Redis lost it
+            allowed = await self._script(
+                keys=[f"rl:{identifier}"],
+                args=[self.window_seconds, self.max_requests, uuid.uuid4().hex]
+            )
+        except RedisError as e:
+            logger.warning("Redis rate limit check failed: %s. Using in-process limiter.", e)
+            return await self.fallback.check_limit(identifier)
+
+        if not allowed:
+            logger.warning("Rate limit exceeded for %s", identifier)
             return False
-        
-        self.requests[identifier].append(now)
         return True
 
 class AuthMiddleware:
     @staticmethod
     def verify_token(token: str) -> dict:
-        from security.auth_service import AuthService
-        auth = AuthService()
-        return auth.verify_token(token)
\ No newline at end of file
+        from security.auth_service import get_auth_service
+        return get_auth_service().verify_token(token)
@@ -1,8 +1,14 @@
 import os
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Must be set before chromadb is imported anywhere
+os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
 
 class Settings(BaseSettings):
+    # Settings are read once at startup and never mutated
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, frozen=True)
+    
     # Application
     APP_NAME: str = "DBS AI Chatbot"
     APP_VERSION: str = "1.0.0"
@@ -13,30 +19,49 @@ class Settings(BaseSettings):
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     API_RATE_LIMIT: int = 100  # requests per minute
+    API_WORKERS: int = 2 * (os.cpu_count() or 1) + 1
+    API_REQUEST_TIMEOUT: int = 30  # seconds per chat request
     
     # Mistral API
     MISTRAL_API_KEY: Optional[str] = os.getenv("MISTRAL_API_KEY")
     MISTRAL_MODEL: str = "mistral-large-latest"
     MISTRAL_TEMPERATURE: float = 0.3
     MISTRAL_MAX_TOKENS: int = 1024
+    MISTRAL_MAX_CONCURRENCY: int = 32  # API calls in flight per worker
+    MISTRAL_TIMEOUT: int = 30  # seconds per API call
+    LLM_CACHE_SIZE: int = 1024
+    LLM_CACHE_TTL: int = 3600  # seconds
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.3  # higher temperatures are never cached
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    LLM_SEMANTIC_CACHE_PATH: str = "./data/semcache.pkl"
     
     # ChromaDB (Vector Store)
     CHROMA_PERSIST_DIR: str = "./data/chroma"
     CHROMA_COLLECTION: str = "dbs_knowledge"
-    os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
     
     # Embeddings
     EMBEDDING_MODEL: str = "mistral-embed"
+    LOCAL_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_DIMENSION: int = 384  # LOCAL_EMBEDDING_MODEL output size
+    EMBEDDING_PRECISION: str = "int8"  # stored vectors: float32, float16 or int8
     
     # RAG Configuration
     RAG_TOP_K: int = 5
     RAG_SCORE_THRESHOLD: float = 0.7
+    RAG_QUERY_CACHE_SIZE: int = 1024
+    RAG_IN_MEMORY_MAX_DOCS: int = 100_000  # search chunks in-process up to this size
+    RAG_QUERY_CACHE_THRESHOLD: float = 0.95  # min cosine similarity for a cache hit
+    CAG_ENABLED: bool = False  # send the whole knowledge base when it fits
+    CAG_MAX_TOKENS: int = 4_000  # larger knowledge bases use RAG retrieval
+    RAGBOOST_ENABLED: bool = True  # keep chunks repeated from the last turn in their earlier order
     
     # Redis (Session Store)
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     SESSION_TTL: int = 1800  # 30 minutes
+    SESSION_HISTORY_MAX: int = 64  # messages kept per session
+    TRANSACTION_TTL: int = 900  # seconds a transaction stays confirmable
     
     # Security
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "dev-secret-key-change-in-production")
@@ -46,6 +71,7 @@ class Settings(BaseSettings):
     # Core Banking (Mock)
     CORE_BANKING_URL: str = "http://localhost:9000"
     CORE_BANKING_TIMEOUT: int = 10
+    CORE_BANKING_SIMULATE_LATENCY: bool = False  # mock client sleeps like a remote call
     
     # Fraud Detection
     FRAUD_VELOCITY_LIMIT: int = 3  # max transactions per hour
@@ -54,9 +80,5 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "./logs/chatbot.log"
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
 
 settings = Settings()
\ No newline at end of file
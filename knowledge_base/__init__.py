@@ -14,10 +14,26 @@ def __getattr__(name):
     elif name == 'RAGEngine':
         from knowledge_base.rag_engine import RAGEngine
         return RAGEngine
+    elif name == 'SemanticCache':
+        from knowledge_base.semantic_cache import SemanticCache
+        return SemanticCache
+    elif name == 'RegexTextSplitter':
+        from knowledge_base.text_splitter import RegexTextSplitter
+        return RegexTextSplitter
+    elif name == 'AsyncBatcher':
+        from knowledge_base.batcher import AsyncBatcher
+        return AsyncBatcher
+    elif name == 'KnowledgeBundle':
+        from knowledge_base.cag_bundle import KnowledgeBundle
+        return KnowledgeBundle
     raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 __all__ = [
     'VectorStore',
     'EmbeddingsGenerator',
-    'RAGEngine'
+    'RAGEngine',
+    'SemanticCache',
+    'RegexTextSplitter',
+    'AsyncBatcher',
+    'KnowledgeBundle'
 ]
\ No newline at end of file
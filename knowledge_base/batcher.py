@@ -0,0 +1,130 @@
+"""
+Async Batcher - Coalesces concurrent single-item calls into batched calls
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBatcher:
+    """
+    Micro-batcher for calls with a fixed per-call overhead
+
+    Callers await submit(item). A background worker collects items until
+    max_batch_size is reached or max_wait seconds pass after the first one,
+    then hands the whole list to process_batch (one call) and fans the
+    results back out to each caller in order. Up to max_concurrency batches
+    run at once; while all slots are busy, new items keep queueing and go
+    out together in the next batch.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.01,
+        max_concurrency: int = 4
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+
+        # Batch size -> number of batches, for tuning max_wait
+        self.batch_sizes: Counter = Counter()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Batches in flight (strong references until they finish)
+        self._inflight: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start the worker on the running loop (submit() does this on first use)"""
+        if self._worker is not None and not self._worker.done():
+            return
+
+        # A restarted worker keeps the queue, so items submitted while the
+        # previous one was stopping are still served. Queues and futures
+        # from another (finished) loop cannot be, so those start afresh.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        # Started lazily so the worker runs on the caller's event loop
+        self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # Wait for a free slot first, so items arriving meanwhile are
+            # collected into this batch rather than queued behind it
+            await self._slots.acquire()
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+
+                # Fill the batch until it is full or the window closes
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except TimeoutError:
+                        break
+            except BaseException:
+                # Worker cancelled mid-collection: release the slot and
+                # don't leave the collected callers waiting
+                self._slots.release()
+                for _, future in batch:
+                    future.cancel()
+                raise
+
+            self.batch_sizes[len(batch)] += 1
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run one batch and resolve its callers' futures"""
+        items = [item for item, _ in batch]
+        try:
+            results = await self.process_batch(items)
+            if len(results) != len(batch):
+                raise ValueError(f"expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            logger.error("Batch of %d failed: %s", len(items), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # Cancelled: callers must not wait forever
+            for _, future in batch:
+                future.cancel()
+            raise
+        finally:
+            self._slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,104 @@
+"""
+CAG Bundle - Whole knowledge base as one prompt block (Cache-Augmented Generation)
+"""
+
+import logging
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough size estimate used against the token budget
+CHARS_PER_TOKEN = 4
+
+# Seconds between checks of the documents folder for changes
+BUNDLE_CHECK_INTERVAL = 5.0
+
+
+@lru_cache(maxsize=1)
+def get_knowledge_bundle() -> "KnowledgeBundle":
+    """Process-wide KnowledgeBundle, built on first use"""
+    from config.settings import settings
+    return KnowledgeBundle(
+        Path("knowledge_base/documents"),
+        max_tokens=settings.CAG_MAX_TOKENS if settings.CAG_ENABLED else 0
+    )
+
+
+class KnowledgeBundle:
+    """
+    Concatenation of every text document in the knowledge base
+
+    A small, near-static knowledge base can be sent whole as a fixed prompt
+    prefix instead of being embedded and searched on every turn. The pinned
+    Mistral client has no prompt caching, so every turn pays for the whole
+    bundle in input tokens; keep max_tokens to a few thousand. The bundle is rebuilt when a file's mtime or size changes,
+    and is unavailable (None) when the folder is empty, holds PDFs, or the
+    text exceeds max_tokens - callers then fall back to RAG retrieval.
+    """
+
+    def __init__(self, documents_path: Path, max_tokens: int):
+        self.documents_path = documents_path
+        self.max_tokens = max_tokens
+
+        self.text: Optional[str] = None
+        self.sources: List[str] = []
+        self.tokens = 0
+
+        self._signature = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[str]:
+        """Bundle text, or None when the knowledge base does not fit"""
+        if self.max_tokens <= 0:
+            return None
+
+        now = time.monotonic()
+        if now - self._checked > BUNDLE_CHECK_INTERVAL:
+            with self._lock:
+                if now - self._checked > BUNDLE_CHECK_INTERVAL:
+                    self._refresh()
+                    self._checked = now
+        return self.text
+
+    def _refresh(self):
+        files = sorted(
+            p for p in self.documents_path.glob("*")
+            if p.suffix.lower() in (".txt", ".pdf")
+        )
+        try:
+            stats = [p.stat() for p in files]
+        except OSError:
+            return
+        signature = tuple((p.name, st.st_mtime_ns, st.st_size) for p, st in zip(files, stats))
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        self.text, self.sources, self.tokens = None, [], 0
+        if not files:
+            return
+        if any(p.suffix.lower() == ".pdf" for p in files):
+            logger.info("Knowledge base contains PDFs - using RAG retrieval")
+            return
+
+        total = sum(size for _, _, size in signature)
+        if total // CHARS_PER_TOKEN > self.max_tokens:
+            logger.info("Knowledge base (~%d tokens) exceeds CAG budget - using RAG retrieval",
+                        total // CHARS_PER_TOKEN)
+            return
+
+        try:
+            parts = [f"### {path.name}\n{path.read_text(encoding='utf-8').strip()}" for path in files]
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning("Could not build knowledge bundle: %s", e)
+            self._signature = None
+            return
+        self.text = "Knowledge base:\n\n" + "\n\n".join(parts)
+        self.sources = [path.name for path in files]
+        self.tokens = len(self.text) // CHARS_PER_TOKEN
+        logger.info("Knowledge bundle built: %d files, ~%d tokens", len(files), self.tokens)
@@ -1,14 +1,48 @@
 """
-Embeddings Generator - Creates vector embeddings for text using the Mistral API.
+Embeddings Generator - Creates vector embeddings for text using the Mistral API
+or a local sentence-transformers model.
 """
+import asyncio
 import logging
-from typing import List
+import threading
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
 from mistralai.client import MistralClient as MistralAI
 from config.settings import settings
+from knowledge_base.batcher import AsyncBatcher
 
 logger = logging.getLogger(__name__)
 
+# Normalized components lie in [-1, 1]; int8 storage maps them onto [-127, 127]
+INT8_SCALE = 127.0
+
+# Concurrent embed() calls collected for up to this long go to the model
+# as one encode() batch
+LOCAL_EMBED_BATCH_SIZE = 64
+LOCAL_EMBED_BATCH_WINDOW = 0.005
+
+# One API client per process: its HTTP connection pool (keep-alive) is
+# shared by every MistralEmbeddings instance, so requests reuse TLS sessions
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> MistralAI:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MistralAI(api_key=settings.MISTRAL_API_KEY)
+    return _client
+
+
+@lru_cache(maxsize=1)
+def get_embeddings_generator() -> "EmbeddingsGenerator":
+    """Process-wide local embedder, so the model is loaded (and batched) once"""
+    return EmbeddingsGenerator()
+
 class MistralEmbeddings:
     """
     A wrapper around the Mistral API for generating text embeddings.
@@ -22,9 +56,9 @@ class MistralEmbeddings:
             logger.error("MISTRAL_API_KEY is not configured.")
             raise ValueError("MISTRAL_API_KEY must be set in your environment or settings.")
 
-        self.client = MistralAI(api_key=settings.MISTRAL_API_KEY)
+        self.client = _get_client()
         self.model = settings.EMBEDDING_MODEL
-        logger.info(f"MistralEmbeddings initialized with model: {self.model}")
+        logger.info("MistralEmbeddings initialized with model: %s", self.model)
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """
@@ -42,7 +76,7 @@ class MistralEmbeddings:
             embeddings = [result.embedding for result in response.data]
             return embeddings
         except Exception as e:
-            logger.error(f"Failed to generate embeddings for documents: {e}", exc_info=True)
+            logger.error("Failed to generate embeddings for documents: %s", e, exc_info=True)
             raise
 
     def embed_query(self, text: str) -> List[float]:
@@ -61,5 +95,133 @@ class MistralEmbeddings:
             response = self.client.embeddings(model=self.model, input=[text])
             return response.data[0].embedding
         except Exception as e:
-            logger.error(f"Failed to generate embedding for query: {e}", exc_info=True)
+            logger.error("Failed to generate embedding for query: %s", e, exc_info=True)
             raise
+
+
+class EmbeddingsGenerator:
+    """
+    Local embeddings using a sentence-transformers model (no API key needed).
+
+    The model is loaded lazily on first use, or ahead of time with
+    `await preload()` so the download/load happens off the event loop.
+
+    Vectors meant to be kept around (candidate matrices, caches) should go
+    through quantize(), which stores them L2-normalized in
+    settings.EMBEDDING_PRECISION (float32, float16 or int8).
+    """
+
+    def __init__(self, model_name: str = None, precision: str = None):
+        self.model_name = model_name or settings.LOCAL_EMBEDDING_MODEL
+        self.precision = precision or settings.EMBEDDING_PRECISION
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._batcher: Optional[AsyncBatcher] = None
+
+    @property
+    def model(self):
+        """The SentenceTransformer instance, loaded on first access"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        from sentence_transformers import SentenceTransformer
+
+        logger.info("Loading local embedding model: %s", self.model_name)
+        model = SentenceTransformer(self.model_name)
+
+        # Half-precision weights halve memory traffic on GPU
+        if model.device.type == "cuda":
+            model.half()
+        return model
+
+    async def preload(self):
+        """Load the model in a worker thread without blocking the event loop"""
+        await asyncio.to_thread(lambda: self.model)
+
+    def generate(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        """
+        Embed a single text or a batch of texts.
+
+        Args:
+            texts: A string, or a list of strings to embed in batches.
+            batch_size: Encoding batch size for lists.
+
+        Returns:
+            A (dim,) array for a single string, or an (N, dim) array for a list.
+            Callers that need Python lists should call .tolist() themselves.
+        """
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text without blocking the event loop
+
+        Concurrent callers are micro-batched into a single encode() call,
+        which costs about the same as encoding one text (especially on GPU).
+        """
+        if self._batcher is None:
+            self._batcher = AsyncBatcher(
+                self._embed_batch,
+                max_batch_size=LOCAL_EMBED_BATCH_SIZE,
+                max_wait=LOCAL_EMBED_BATCH_WINDOW
+            )
+        return await self._batcher.submit(text)
+
+    async def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        vectors = await asyncio.to_thread(self.generate, texts, LOCAL_EMBED_BATCH_SIZE)
+        return list(vectors)
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """L2-normalize a vector or each row of a matrix as float32"""
+        arr = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+        return arr / np.maximum(norms, 1e-12)
+
+    def quantize(self, vectors) -> np.ndarray:
+        """Normalize and convert vectors to the configured storage precision"""
+        arr = self.normalize(vectors)
+        if self.precision == "int8":
+            return np.round(arr * INT8_SCALE).astype(np.int8)
+        if self.precision == "float16":
+            return arr.astype(np.float16)
+        return arr
+
+    def compute_similarity(self, embedding1, embedding2) -> float:
+        """Cosine similarity between two embeddings"""
+        return float(np.dot(self.normalize(embedding1), self.normalize(embedding2)))
+
+    def find_most_similar(
+        self,
+        query_embedding,
+        candidate_embeddings: np.ndarray,
+        top_k: int = 5
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the candidates most similar to a query.
+
+        Args:
+            query_embedding: Query vector.
+            candidate_embeddings: (N, dim) matrix, already L2-normalized with
+                normalize() or quantize() so scoring is a single matmul.
+            top_k: Number of results to return.
+
+        Returns:
+            List of (candidate_index, cosine_similarity), best first.
+        """
+        if len(candidate_embeddings) == 0:
+            return []
+
+        sims = candidate_embeddings @ self.normalize(query_embedding)
+        if candidate_embeddings.dtype == np.int8:
+            sims /= INT8_SCALE
+        top_k = min(top_k, len(sims))
+
+        # Partial selection of the top_k, then sort just those
+        idx = np.argpartition(-sims, top_k - 1)[:top_k]
+        idx = idx[np.argsort(-sims[idx])]
+        return list(zip(idx.tolist(), sims[idx].tolist()))
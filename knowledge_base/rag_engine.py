@@ -4,21 +4,166 @@ Handles: Document loading, chunking, retrieval, and response generation
 """
 
 import os
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import mmap
+import pickle
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-import hashlib
+
+import numpy as np
+import orjson
+from blake3 import blake3
 
 # LangChain imports
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.schema import Document
 
-from knowledge_base.vector_store import VectorStore
-from knowledge_base.embeddings import MistralEmbeddings
+from knowledge_base.batcher import AsyncBatcher
+from knowledge_base.vector_store import VectorStore, WRITE_BATCH_SIZE
+from knowledge_base.embeddings import EmbeddingsGenerator, MistralEmbeddings
+from knowledge_base.semantic_cache import SemanticCache
+from knowledge_base.text_splitter import RegexTextSplitter
 
 logger = logging.getLogger(__name__)
 
+# Chunks per embeddings API request, and max requests in flight
+EMBED_BATCH_SIZE = 64
+EMBED_CONCURRENCY = 4
+
+# Concurrent retrieve() queries are embedded together: up to this many,
+# collected for at most this many seconds
+QUERY_BATCH_SIZE = 32
+QUERY_BATCH_WINDOW = 0.01
+
+# Byte-identical queries served without embedding; collection size re-checked every TTL
+EXACT_CACHE_SIZE = 2048
+DOC_COUNT_TTL = 60
+
+# How often (seconds) retrieve() checks whether another worker re-ingested
+DOC_MATRIX_CHECK_INTERVAL = 1.0
+
+
+@lru_cache(maxsize=1)
+def get_rag_engine() -> "RAGEngine":
+    """Process-wide RAGEngine, built on first use"""
+    return RAGEngine()
+
+
+# ============================================================================
+# Sample documents (written when the documents folder is empty)
+# ============================================================================
+
+FAQ_CONTENT = """DBS Bank Frequently Asked Questions
+
+Q: What are the branch operating hours?
+A: Most DBS branches are open Monday to Friday from 9:30 AM to 4:30 PM, and Saturday from 9:30 AM to 12:30 PM. Branches are closed on Sundays and public holidays. ATMs are available 24/7 for your convenience.
+
+Q: What are the account fees?
+A: DBS savings accounts have no fall-below fee if you maintain a minimum balance of SGD 3,000. For accounts below this balance, a monthly fee of SGD 2 applies. Credit card annual fees range from SGD 0 to SGD 642 depending on the card type. Many fees are waived for qualifying customers.
+
+Q: What are the daily transfer limits?
+A: For security, daily transfer limits are: SGD 50,000 for transfers to own accounts, SGD 30,000 for transfers to other DBS/POSB accounts, and SGD 20,000 for transfers to other banks. You can request higher limits by visiting a branch with proper identification.
+
+Q: How do I lock my credit card?
+A: You can temporarily lock your credit or debit card instantly through the DBS digibank mobile app, online banking, or by calling our 24-hour hotline at 1800-111-1111. Locking your card prevents unauthorized transactions while you search for it. You can unlock it anytime if you find it.
+
+Q: What documents do I need to open an account?
+A: To open a personal account, you need: (1) Valid identification (NRIC for Singapore citizens/PRs, passport for foreigners), (2) Proof of residential address (utility bill or bank statement not older than 3 months), (3) Minimum initial deposit of SGD 1,000 for savings accounts.
+
+Q: How do I reset my digibank password?
+A: You can reset your digibank password online by clicking "Forgot Password" on the login page. You'll need your username, account number, and ATM card PIN or OTP sent to your registered mobile number."""
+
+PRODUCTS_CONTENT = """DBS Banking Products and Services
+
+SAVINGS ACCOUNTS
+
+1. DBS Multiplier Account
+- No minimum balance required
+- Earn up to 3.5% p.a. on your savings
+- Higher interest rates when you credit your salary and spend on your DBS credit card
+- Free unlimited GIRO, local fund transfers, and withdrawal transactions
+
+2. DBS Savings Account
+- SGD 3,000 minimum balance to waive fall-below fee
+- 0.05% p.a. interest on balances
+- Access to nationwide ATM network
+- Free first 3 withdrawals per month at non-DBS ATMs
+
+CREDIT CARDS
+
+1. DBS Altitude Card
+- Annual fee: SGD 196.20 (waived for first year)
+- Earn 3 miles per SGD 1 on foreign currency spending
+- Complimentary airport lounge access (6 visits per year)
+- Travel insurance coverage up to SGD 1 million
+
+2. DBS Live Fresh Card
+- Annual fee: SGD 0 (free for life)
+- 5% cashback on online shopping and mobile payments
+- 5% cashback on food delivery services
+- Ideal for young professionals and digital natives
+
+INVESTMENT PRODUCTS
+
+1. DBS Vickers Online Trading
+- Trade SGX stocks, ETFs, and bonds
+- Commission rates from 0.08%
+- Real-time market data and research reports
+- Mobile and desktop trading platforms
+
+2. DBS Unit Trusts
+- Wide range of funds across asset classes
+- Minimum investment from SGD 1,000
+- Regular savings plan available from SGD 100 per month
+- Access to global fund managers"""
+
+POLICIES_CONTENT = """DBS Bank Policies and Guidelines
+
+ACCOUNT SECURITY POLICY
+
+1. Password Requirements
+- Minimum 8 characters with mix of uppercase, lowercase, numbers, and special characters
+- Passwords expire every 90 days
+- Cannot reuse last 5 passwords
+- Maximum 3 failed login attempts before temporary lockout
+
+2. Two-Factor Authentication
+- OTP required for all online transactions above SGD 1,000
+- SMS or hardware token authentication available
+- Biometric authentication (fingerprint/face) available on mobile app
+
+3. Fraud Monitoring
+- Real-time transaction monitoring for suspicious activity
+- Automatic card lock if fraud detected
+- Customer notification via SMS and email for high-value transactions
+- Zero liability protection for unauthorized transactions
+
+TRANSACTION POLICIES
+
+1. Fund Transfer Processing Times
+- Internal transfers (DBS to DBS): Instant
+- FAST transfers to other Singapore banks: Within 10 seconds
+- Overseas transfers: 1-3 business days
+- Standing instructions: Processed on scheduled date by 11:59 PM
+
+2. Card Usage Limits
+- Default daily ATM withdrawal limit: SGD 5,000
+- Default daily card spending limit: SGD 20,000
+- Limits can be customized through digibank
+- Temporary limit increases available for travel"""
+
+SAMPLE_DOCS: Tuple[Tuple[str, str], ...] = (
+    ("dbs_faqs.txt", FAQ_CONTENT),
+    ("dbs_products.txt", PRODUCTS_CONTENT),
+    ("dbs_policies.txt", POLICIES_CONTENT),
+)
+
 
 class RAGEngine:
     """
@@ -38,8 +183,34 @@ class RAGEngine:
         self.embeddings = MistralEmbeddings()
         self.settings = settings
         
+        # Near-duplicate queries reuse earlier retrieval results
+        self.query_cache = SemanticCache(
+            capacity=settings.RAG_QUERY_CACHE_SIZE,
+            threshold=settings.RAG_QUERY_CACHE_THRESHOLD
+        )
+        
+        # One embeddings request per burst of concurrent queries
+        self._query_batcher = AsyncBatcher(
+            self._embed_queries,
+            max_batch_size=QUERY_BATCH_SIZE,
+            max_wait=QUERY_BATCH_WINDOW
+        )
+        
+        # Exact query -> results (LRU), and cached collection size
+        self._exact_cache: OrderedDict = OrderedDict()
+        self._doc_count: Optional[int] = None
+        self._doc_count_checked = 0.0
+        
+        # Normalized float32 document matrix (one row per chunk) kept after
+        # ingest, so retrieval is a single matmul while the corpus fits in RAM
+        self._doc_matrix: Optional[np.ndarray] = None
+        self._doc_ids: List[str] = []
+        self._doc_contents: List[str] = []
+        self._doc_metadatas: List[Dict] = []
+        self._doc_sources: Optional[np.ndarray] = None
+        
         # Text splitter for chunking documents
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.text_splitter = RegexTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
@@ -50,6 +221,18 @@ class RAGEngine:
         self.documents_path = Path("knowledge_base/documents")
         self.documents_path.mkdir(parents=True, exist_ok=True)
         
+        # Per-file chunk lists, keyed by path + mtime + size
+        self.chunk_cache_path = Path("knowledge_base/.cache")
+        
+        # Document matrix from the last ingest, memory-mapped so worker
+        # processes share one copy through the page cache. The index file
+        # names the current matrix file; replacing it publishes a new ingest,
+        # and its (inode, mtime) is the version each worker compares against.
+        self.doc_index_file = self.chunk_cache_path / "emb.ids.json"
+        self._doc_matrix_version: Optional[Tuple[int, int]] = None
+        self._doc_matrix_checked = 0.0
+        self._load_doc_matrix()
+        
         logger.info("RAG Engine initialized")
     
     async def ingest_documents(self, force_reingest: bool = False) -> Dict:
@@ -70,6 +253,10 @@ class RAGEngine:
             Dict with ingestion statistics
         """
         try:
+            if force_reingest:
+                await self.vector_store.delete_collection()
+                shutil.rmtree(self.chunk_cache_path, ignore_errors=True)
+                self._doc_matrix = None
             await self.vector_store.initialize()
             
             # Check if we need to create sample documents
@@ -85,30 +272,33 @@ class RAGEngine:
             txt_files = list(self.documents_path.glob("*.txt"))
             all_files = pdf_files + txt_files
             
-            logger.info(f"Found {len(all_files)} documents to ingest")
+            logger.info("Found %d documents to ingest", len(all_files))
             
             # Process each document
             all_chunks = []
             all_metadatas = []
             all_ids = []
+            seen_ids = set()
             
-            for file_path in all_files:
-                logger.info(f"Processing: {file_path.name}")
-                
-                # Load document
-                documents = await self._load_document(file_path)
-                
-                if not documents:
-                    logger.warning(f"No content loaded from {file_path.name}")
+            # Load and chunk files in parallel (PDF parsing is CPU/disk bound)
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(max_workers=max(1, min(8, len(all_files)))) as pool:
+                loaded = await asyncio.gather(*[
+                    loop.run_in_executor(pool, self._load_and_split, file_path)
+                    for file_path in all_files
+                ])
+            
+            for file_path, chunks in loaded:
+                if not chunks:
                     continue
                 
-                # Chunk documents
-                chunks = self.text_splitter.split_documents(documents)
-                logger.info(f"Created {len(chunks)} chunks from {file_path.name}")
-                
                 # Prepare data for storage
                 for i, chunk in enumerate(chunks):
-                    chunk_id = self._generate_chunk_id(file_path.name, i)
+                    # Content-addressed: identical text always maps to the same ID
+                    chunk_id = self._generate_chunk_id(chunk.page_content)
+                    if chunk_id in seen_ids:
+                        continue
+                    seen_ids.add(chunk_id)
                     
                     all_chunks.append(chunk.page_content)
                     all_metadatas.append({
@@ -119,22 +309,46 @@ class RAGEngine:
                     })
                     all_ids.append(chunk_id)
             
-            # Generate embeddings in batch
-            logger.info(f"Generating embeddings for {len(all_chunks)} chunks...")
-            embeddings = self.embeddings.embed_documents(all_chunks)
+            # Reuse stored embeddings for unchanged chunks, embed only new ones
+            cached = await self.vector_store.get_embeddings(all_ids)
+            missing_idx = [i for i, chunk_id in enumerate(all_ids) if chunk_id not in cached]
+            logger.info(
+                "Embedding cache: %d hits, %d chunks to embed",
+                len(all_ids) - len(missing_idx), len(missing_idx)
+            )
             
-            # Add to vector store
+            # Normalized rows land in one float32 matrix: unit vectors let the
+            # inner-product index score cosine similarity
+            emb_np: Optional[np.ndarray] = None
+            
+            def fill_rows(rows: List[int], vectors) -> np.ndarray:
+                nonlocal emb_np
+                vectors = EmbeddingsGenerator.normalize(vectors)
+                if emb_np is None:
+                    emb_np = np.empty((len(all_ids), vectors.shape[1]), dtype=np.float32)
+                emb_np[rows] = vectors
+                return vectors
+            
+            cached_idx = [i for i, chunk_id in enumerate(all_ids) if chunk_id in cached]
+            if cached_idx:
+                fill_rows(cached_idx, [cached[all_ids[i]] for i in cached_idx])
+            del cached
+            
+            # Embed and store new chunks batch by batch (stored ones are unchanged)
             logger.info("Storing documents in vector database...")
-            success = await self.vector_store.add_documents(
-                documents=all_chunks,
-                metadatas=all_metadatas,
-                ids=all_ids,
-                embeddings=embeddings
+            success = await self._embed_and_store(
+                missing_idx, all_chunks, all_metadatas, all_ids, fill_rows
             )
             
             if success:
+                # Cached retrievals may be stale after new content
+                self.query_cache.clear()
+                self._exact_cache.clear()
+                self._doc_count = None
+                self._set_doc_matrix(emb_np, all_ids, all_chunks, all_metadatas)
+                
                 stats = await self.vector_store.get_collection_stats()
-                logger.info(f"Ingestion complete: {stats}")
+                logger.info("Ingestion complete: %s", stats)
                 
                 return {
                     "status": "success",
@@ -150,7 +364,7 @@ class RAGEngine:
                 }
             
         except Exception as e:
-            logger.error(f"Document ingestion failed: {str(e)}", exc_info=True)
+            logger.error("Document ingestion failed: %s", e, exc_info=True)
             return {
                 "status": "error",
                 "message": str(e)
@@ -177,37 +391,311 @@ class RAGEngine:
             if top_k is None:
                 top_k = self.settings.RAG_TOP_K
             
-            # Generate query embedding
-            query_embedding = self.embeddings.embed_query(query)
+            self._refresh_doc_matrix()
+            
+            # Nothing to search - skip the embedding call entirely
+            if await self._get_doc_count() == 0:
+                return []
+            
+            # Byte-identical repeat of a recent query
+            exact_key = (blake3(query.encode()).hexdigest(), top_k, filter_source)
+            exact = self._exact_cache.get(exact_key)
+            if exact is not None:
+                self._exact_cache.move_to_end(exact_key)
+                return list(exact)
+            
+            # Generate query embedding (unit length, matching stored vectors)
+            query_vector = EmbeddingsGenerator.normalize(await self._query_batcher.submit(query))
+            query_embedding = query_vector.tolist()
+            
+            # Serve near-duplicate queries from the semantic cache
+            cache_key = (top_k, filter_source)
+            cached = self.query_cache.get(query_embedding)
+            if cached is not None and cached[0] == cache_key:
+                logger.info("Semantic cache hit: %d documents", len(cached[1]))
+                self._remember_exact(exact_key, cached[1])
+                return list(cached[1])
             
             # Build metadata filter
             metadata_filter = {}
             if filter_source:
                 metadata_filter["source"] = filter_source
             
-            # Search vector store
-            results = await self.vector_store.search(
-                query_embedding=query_embedding,
-                top_k=top_k,
-                filter_metadata=metadata_filter if metadata_filter else None
-            )
-            
-            # Filter by relevance threshold
+            # Relevance threshold (ip distance = 1 - cosine for unit vectors),
+            # applied as an array mask inside the search
             threshold = 1 - self.settings.RAG_SCORE_THRESHOLD
-            filtered_results = [
-                doc for doc in results
-                if doc['distance'] <= threshold
-            ]
             
-            logger.info(f"Retrieved {len(filtered_results)} relevant documents (from {len(results)} total)")
+            # Search in-memory matrix when loaded, otherwise the vector store
+            if self._doc_matrix is not None:
+                filtered_results = self._search_in_memory(
+                    query_vector, top_k, filter_source, max_distance=threshold
+                )
+            else:
+                filtered_results = await self.vector_store.search(
+                    query_embedding=query_embedding,
+                    top_k=top_k,
+                    filter_metadata=metadata_filter if metadata_filter else None,
+                    max_distance=threshold
+                )
+            
+            logger.info("Retrieved %d relevant documents", len(filtered_results))
             
-            return filtered_results
+            self.query_cache.put(query_embedding, (cache_key, filtered_results))
+            self._remember_exact(exact_key, filtered_results)
+            return list(filtered_results)
             
         except Exception as e:
-            logger.error(f"Retrieval failed: {str(e)}", exc_info=True)
+            logger.error("Retrieval failed: %s", e, exc_info=True)
+            return []
+    
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed a batch of queries in one API request, off the event loop"""
+        return await asyncio.to_thread(self.embeddings.embed_documents, queries)
+    
+    def _remember_exact(self, key: Tuple, results: List[Dict]):
+        self._exact_cache[key] = results
+        self._exact_cache.move_to_end(key)
+        if len(self._exact_cache) > EXACT_CACHE_SIZE:
+            self._exact_cache.popitem(last=False)
+    
+    async def _get_doc_count(self) -> int:
+        """Collection size, re-read from the vector store at most every DOC_COUNT_TTL"""
+        if self._doc_matrix is not None:
+            return len(self._doc_ids)
+        
+        now = time.monotonic()
+        if self._doc_count is None or now - self._doc_count_checked > DOC_COUNT_TTL:
+            stats = await self.vector_store.get_collection_stats()
+            # Unknown size (stats failed) - let the search decide
+            self._doc_count = stats.get("document_count", -1)
+            self._doc_count_checked = now
+        return self._doc_count
+    
+    def _set_doc_matrix(
+        self,
+        matrix: Optional[np.ndarray],
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict]
+    ):
+        """Persist ingested embeddings and map them if the corpus is small enough"""
+        if matrix is None or len(ids) > self.settings.RAG_IN_MEMORY_MAX_DOCS:
+            # Retract the published matrix so other workers stop serving it
+            self.doc_index_file.unlink(missing_ok=True)
+            self._load_doc_matrix()
+            return
+        
+        try:
+            self.chunk_cache_path.mkdir(parents=True, exist_ok=True)
+            # A fresh file per ingest: workers still mapping the previous one
+            # keep reading it intact until they pick up the new index
+            matrix_file = self.chunk_cache_path / f"emb.{time.time_ns()}.f32"
+            np.ascontiguousarray(matrix, dtype=np.float32).tofile(matrix_file)
+            
+            tmp_index = self.doc_index_file.with_suffix(".tmp")
+            tmp_index.write_bytes(orjson.dumps({
+                "matrix": matrix_file.name,
+                "ids": ids,
+                "contents": contents,
+                "metadatas": metadatas
+            }))
+            os.replace(tmp_index, self.doc_index_file)
+            
+            # Mapped copies stay valid after unlink
+            for old_file in self.chunk_cache_path.glob("emb.*.f32"):
+                if old_file != matrix_file:
+                    old_file.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Could not persist document matrix: %s", e)
+            self._doc_matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+            self._doc_ids = ids
+            self._doc_contents = contents
+            self._doc_metadatas = metadatas
+            self._doc_sources = np.array([m["source"] for m in metadatas])
+            return
+        
+        self._load_doc_matrix()
+    
+    def _doc_matrix_stamp(self) -> Optional[Tuple[int, int]]:
+        """Version of the published index file, None if there is none"""
+        try:
+            stat = os.stat(self.doc_index_file)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+    
+    def _refresh_doc_matrix(self):
+        """Remap the document matrix if another worker published a new ingest"""
+        now = time.monotonic()
+        if now - self._doc_matrix_checked < DOC_MATRIX_CHECK_INTERVAL:
+            return
+        self._doc_matrix_checked = now
+        
+        if self._doc_matrix_stamp() != self._doc_matrix_version:
+            self._load_doc_matrix()
+            # Cached retrievals came from the previous corpus
+            self.query_cache.clear()
+            self._exact_cache.clear()
+            self._doc_count = None
+    
+    def _load_doc_matrix(self):
+        """Map the persisted document matrix read-only, if one exists"""
+        # Stamp before reading, so a replace during the read shows up next check
+        self._doc_matrix_version = self._doc_matrix_stamp()
+        self._doc_matrix = None
+        try:
+            index = orjson.loads(self.doc_index_file.read_bytes())
+            count = len(index["ids"])
+            if count == 0 or count > self.settings.RAG_IN_MEMORY_MAX_DOCS:
+                return
+            
+            matrix = np.memmap(self.chunk_cache_path / index["matrix"], dtype=np.float32, mode="r")
+            matrix = matrix.reshape(count, -1)
+        except (OSError, ValueError, KeyError) as e:
+            if self.doc_index_file.exists():
+                logger.warning("Ignoring unreadable document matrix: %s", e)
+            return
+        
+        # Fault the pages in ahead of the first query
+        if hasattr(matrix, "_mmap") and hasattr(mmap, "MADV_WILLNEED"):
+            matrix._mmap.madvise(mmap.MADV_WILLNEED)
+        
+        self._doc_matrix = matrix
+        self._doc_ids = index["ids"]
+        self._doc_contents = index["contents"]
+        self._doc_metadatas = index["metadatas"]
+        self._doc_sources = np.array([m["source"] for m in self._doc_metadatas])
+        logger.info("Mapped document matrix: %s x %s", matrix.shape[0], matrix.shape[1])
+    
+    def _search_in_memory(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        filter_source: Optional[str] = None,
+        max_distance: Optional[float] = None
+    ) -> List[Dict]:
+        """Exact top-k over the in-memory matrix; same shape as VectorStore.search"""
+        sims = self._doc_matrix @ query_vector
+        if filter_source:
+            sims = np.where(self._doc_sources == filter_source, sims, -np.inf)
+        
+        top_k = min(top_k, len(sims))
+        if top_k <= 0:
             return []
+        
+        idx = np.argpartition(-sims, top_k - 1)[:top_k]
+        idx = idx[np.argsort(-sims[idx])]
+        idx = idx[np.isfinite(sims[idx])]
+        if max_distance is not None:
+            idx = idx[sims[idx] >= 1 - max_distance]
+        
+        return [
+            {
+                'id': self._doc_ids[i],
+                'content': self._doc_contents[i],
+                'metadata': self._doc_metadatas[i],
+                'distance': float(1 - sims[i])
+            }
+            for i in idx.tolist()
+        ]
+    
+    async def _embed_batches(
+        self,
+        chunks: List[str],
+        batch_size: int = EMBED_BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY
+    ) -> List[List[float]]:
+        """
+        Embed chunks in fixed-size batches submitted concurrently
+        
+        Keeps each request within API payload limits while overlapping
+        network round-trips; at most `concurrency` requests in flight.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def embed_one(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await loop.run_in_executor(None, self.embeddings.embed_documents, batch)
+        
+        results = await asyncio.gather(*[
+            embed_one(chunks[i:i + batch_size])
+            for i in range(0, len(chunks), batch_size)
+        ])
+        return [embedding for batch in results for embedding in batch]
+    
+    async def _embed_and_store(
+        self,
+        indices: List[int],
+        chunks: List[str],
+        metadatas: List[Dict],
+        ids: List[str],
+        fill_rows
+    ) -> bool:
+        """
+        Embed the given chunks and write them to the vector store in a stream
+        
+        Each WRITE_BATCH_SIZE slice is stored while the next one is being
+        embedded, so at most two slices of new embeddings are pending at once
+        instead of the whole corpus.
+        """
+        store_task = None
+        try:
+            for start in range(0, len(indices), WRITE_BATCH_SIZE):
+                batch = indices[start:start + WRITE_BATCH_SIZE]
+                vectors = fill_rows(batch, await self._embed_batches([chunks[i] for i in batch]))
+                
+                if store_task is not None and not await store_task:
+                    return False
+                
+                store_task = asyncio.create_task(self.vector_store.add_documents(
+                    documents=[chunks[i] for i in batch],
+                    metadatas=[metadatas[i] for i in batch],
+                    ids=[ids[i] for i in batch],
+                    embeddings=vectors.tolist()
+                ))
+            
+            return store_task is None or await store_task
+        finally:
+            if store_task is not None and not store_task.done():
+                store_task.cancel()
+    
+    def _load_and_split(self, file_path: Path) -> Tuple[Path, List[Document]]:
+        """Load and chunk one document (runs in a worker thread)"""
+        logger.info("Processing: %s", file_path.name)
+        
+        # Unchanged files reuse the chunks from their last ingest
+        stat = os.stat(file_path)
+        cache_key = f"{file_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}"
+        cache_file = self.chunk_cache_path / f"{blake3(cache_key.encode()).hexdigest()}.pkl"
+        try:
+            with open(cache_file, "rb") as f:
+                chunks = pickle.load(f)
+            logger.info("Loaded %d cached chunks for %s", len(chunks), file_path.name)
+            return file_path, chunks
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+        
+        documents = self._load_document(file_path)
+        if not documents:
+            logger.warning("No content loaded from %s", file_path.name)
+            return file_path, []
+        
+        chunks = self.text_splitter.split_documents(documents)
+        logger.info("Created %d chunks from %s", len(chunks), file_path.name)
+        
+        try:
+            self.chunk_cache_path.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(".tmp")
+            with open(tmp_file, "wb") as f:
+                pickle.dump(chunks, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning("Could not cache chunks for %s: %s", file_path.name, e)
+        
+        return file_path, chunks
     
-    async def _load_document(self, file_path: Path) -> List[Document]:
+    def _load_document(self, file_path: Path) -> List[Document]:
         """Load document based on file type"""
         try:
             file_extension = file_path.suffix.lower()
@@ -217,132 +705,32 @@ class RAGEngine:
             elif file_extension == ".txt":
                 loader = TextLoader(str(file_path), encoding='utf-8')
             else:
-                logger.warning(f"Unsupported file type: {file_extension}")
+                logger.warning("Unsupported file type: %s", file_extension)
                 return []
             
             documents = loader.load()
-            logger.info(f"Loaded {len(documents)} pages from {file_path.name}")
+            logger.info("Loaded %d pages from %s", len(documents), file_path.name)
             
             return documents
             
         except Exception as e:
-            logger.error(f"Failed to load {file_path.name}: {str(e)}")
+            logger.error("Failed to load %s: %s", file_path.name, e)
             return []
     
-    def _generate_chunk_id(self, filename: str, chunk_index: int) -> str:
-        """Generate unique ID for document chunk"""
-        content = f"{filename}_{chunk_index}"
-        return hashlib.md5(content.encode()).hexdigest()
+    def _generate_chunk_id(self, content: str) -> str:
+        """Generate content-addressed ID for document chunk"""
+        return blake3(content.encode()).hexdigest()
     
     def _create_sample_documents(self):
         """Create sample documents for demo purposes"""
         logger.info("Creating sample banking documents...")
         
-        # Sample FAQ document
-        faq_content = """DBS Bank Frequently Asked Questions
-
-Q: What are the branch operating hours?
-A: Most DBS branches are open Monday to Friday from 9:30 AM to 4:30 PM, and Saturday from 9:30 AM to 12:30 PM. Branches are closed on Sundays and public holidays. ATMs are available 24/7 for your convenience.
-
-Q: What are the account fees?
-A: DBS savings accounts have no fall-below fee if you maintain a minimum balance of SGD 3,000. For accounts below this balance, a monthly fee of SGD 2 applies. Credit card annual fees range from SGD 0 to SGD 642 depending on the card type. Many fees are waived for qualifying customers.
-
-Q: What are the daily transfer limits?
-A: For security, daily transfer limits are: SGD 50,000 for transfers to own accounts, SGD 30,000 for transfers to other DBS/POSB accounts, and SGD 20,000 for transfers to other banks. You can request higher limits by visiting a branch with proper identification.
-
-Q: How do I lock my credit card?
-A: You can temporarily lock your credit or debit card instantly through the DBS digibank mobile app, online banking, or by calling our 24-hour hotline at 1800-111-1111. Locking your card prevents unauthorized transactions while you search for it. You can unlock it anytime if you find it.
-
-Q: What documents do I need to open an account?
-A: To open a personal account, you need: (1) Valid identification (NRIC for Singapore citizens/PRs, passport for foreigners), (2) Proof of residential address (utility bill or bank statement not older than 3 months), (3) Minimum initial deposit of SGD 1,000 for savings accounts.
-
-Q: How do I reset my digibank password?
-A: You can reset your digibank password online by clicking "Forgot Password" on the login page. You'll need your username, account number, and ATM card PIN or OTP sent to your registered mobile number."""
-
-        # Sample products document
-        products_content = """DBS Banking Products and Services
-
-SAVINGS ACCOUNTS
-
-1. DBS Multiplier Account
-- No minimum balance required
-- Earn up to 3.5% p.a. on your savings
-- Higher interest rates when you credit your salary and spend on your DBS credit card
-- Free unlimited GIRO, local fund transfers, and withdrawal transactions
-
-2. DBS Savings Account
-- SGD 3,000 minimum balance to waive fall-below fee
-- 0.05% p.a. interest on balances
-- Access to nationwide ATM network
-- Free first 3 withdrawals per month at non-DBS ATMs
-
-CREDIT CARDS
-
-1. DBS Altitude Card
-- Annual fee: SGD 196.20 (waived for first year)
-- Earn 3 miles per SGD 1 on foreign currency spending
-- Complimentary airport lounge access (6 visits per year)
-- Travel insurance coverage up to SGD 1 million
-
-2. DBS Live Fresh Card
-- Annual fee: SGD 0 (free for life)
-- 5% cashback on online shopping and mobile payments
-- 5% cashback on food delivery services
-- Ideal for young professionals and digital natives
-
-INVESTMENT PRODUCTS
-
-1. DBS Vickers Online Trading
-- Trade SGX stocks, ETFs, and bonds
-- Commission rates from 0.08%
-- Real-time market data and research reports
-- Mobile and desktop trading platforms
-
-2. DBS Unit Trusts
-- Wide range of funds across asset classes
-- Minimum investment from SGD 1,000
-- Regular savings plan available from SGD 100 per month
-- Access to global fund managers"""
-
-        # Sample policies document
-        policies_content = """DBS Bank Policies and Guidelines
-
-ACCOUNT SECURITY POLICY
-
-1. Password Requirements
-- Minimum 8 characters with mix of uppercase, lowercase, numbers, and special characters
-- Passwords expire every 90 days
-- Cannot reuse last 5 passwords
-- Maximum 3 failed login attempts before temporary lockout
-
-2. Two-Factor Authentication
-- OTP required for all online transactions above SGD 1,000
-- SMS or hardware token authentication available
-- Biometric authentication (fingerprint/face) available on mobile app
-
-3. Fraud Monitoring
-- Real-time transaction monitoring for suspicious activity
-- Automatic card lock if fraud detected
-- Customer notification via SMS and email for high-value transactions
-- Zero liability protection for unauthorized transactions
-
-TRANSACTION POLICIES
-
-1. Fund Transfer Processing Times
-- Internal transfers (DBS to DBS): Instant
-- FAST transfers to other Singapore banks: Within 10 seconds
-- Overseas transfers: 1-3 business days
-- Standing instructions: Processed on scheduled date by 11:59 PM
-
-2. Card Usage Limits
-- Default daily ATM withdrawal limit: SGD 5,000
-- Default daily card spending limit: SGD 20,000
-- Limits can be customized through digibank
-- Temporary limit increases available for travel"""
-
-        # Write sample documents
-        (self.documents_path / "dbs_faqs.txt").write_text(faq_content, encoding='utf-8')
-        (self.documents_path / "dbs_products.txt").write_text(products_content, encoding='utf-8')
-        (self.documents_path / "dbs_policies.txt").write_text(policies_content, encoding='utf-8')
+        # Write only files that are missing or differ from the sample content
+        for name, content in SAMPLE_DOCS:
+            path = self.documents_path / name
+            data = content.encode('utf-8')
+            if path.exists() and blake3(path.read_bytes()).digest() == blake3(data).digest():
+                continue
+            path.write_bytes(data)
         
-        logger.info("Sample documents created successfully")
\ No newline at end of file
+        logger.info("Sample documents created successfully")
@@ -0,0 +1,156 @@
+"""
+Semantic Cache - Reuses results for queries whose embeddings are near-duplicates
+"""
+
+import logging
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from knowledge_base.embeddings import EmbeddingsGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Fixed-capacity cache keyed by embedding similarity
+
+    Keys are L2-normalized once on insert and stored as rows of a single
+    int8 matrix (one float32 scale per row, 4x smaller than float32 keys),
+    so a lookup is one matrix-vector product (cosine similarity against
+    every cached key). The least recently used entry is evicted once
+    capacity is reached. With compress=True values are kept as
+    zlib-compressed pickles, which suits long, repetitive text answers.
+    """
+
+    def __init__(self, capacity: int = 1024, threshold: float = 0.95, compress: bool = False):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.compress = compress
+
+        # Key matrix is allocated on first insert, once the dimension is known
+        self._keys: Optional[np.ndarray] = None
+        self._scales = np.ones(capacity, dtype=np.float32)
+        self._values: List[Any] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._tick = 0
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, embedding) -> Optional[Any]:
+        """Return the value stored for the most similar key above threshold"""
+        if self._size == 0:
+            self._misses += 1
+            return None
+
+        n = self._size
+        sims = (self._keys[:n] @ EmbeddingsGenerator.normalize(embedding)) * self._scales[:n]
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._touch(best)
+        return self._decode(self._values[best])
+
+    def put(self, embedding, value: Any):
+        """Insert a value, evicting the least recently used entry if full"""
+        key = EmbeddingsGenerator.normalize(embedding)
+
+        if self._keys is None:
+            self._keys = np.zeros((self.capacity, key.shape[0]), dtype=np.int8)
+
+        if self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+
+        # Symmetric int8 code with a per-key scale of max(abs(key)) / 127
+        scale = float(np.abs(key).max()) / 127.0 or 1.0
+        self._keys[slot] = np.clip(np.rint(key / scale), -127, 127)
+        self._scales[slot] = scale
+        self._values[slot] = self._encode(value)
+        self._touch(slot)
+
+    def clear(self):
+        """Drop all entries (e.g. after the underlying data changes)"""
+        self._values = [None] * self.capacity
+        self._last_used[:] = 0
+        self._size = 0
+
+    def stats(self) -> Dict:
+        """Hit rate and memory held by keys and values"""
+        lookups = self._hits + self._misses
+        stats = {
+            "entries": self._size,
+            "capacity": self.capacity,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "key_bytes": (self._keys.nbytes if self._keys is not None else 0) + self._scales.nbytes
+        }
+        if self.compress:
+            stats["value_bytes"] = sum(len(v) for v in self._values[:self._size])
+        return stats
+
+    def _touch(self, slot: int):
+        self._tick += 1
+        self._last_used[slot] = self._tick
+
+    def _encode(self, value: Any) -> Any:
+        if not self.compress:
+            return value
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _decode(self, stored: Any) -> Any:
+        if not self.compress:
+            return stored
+        return pickle.loads(zlib.decompress(stored))
+
+    def save(self, path):
+        """Persist entries (pickle), most recently used order preserved"""
+        if self._size == 0:
+            return
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "keys": self._keys[:self._size],
+                "scales": self._scales[:self._size],
+                "values": [self._decode(v) for v in self._values[:self._size]],
+                "last_used": self._last_used[:self._size]
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load(self, path) -> bool:
+        """Restore entries written by save(); returns False if none were loaded"""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            if Path(path).exists():
+                logger.warning("Could not load semantic cache from %s: %s", path, e)
+            return False
+
+        # Keep the most recently used entries that fit
+        keep = np.argsort(state["last_used"])[-self.capacity:]
+        keys = np.asarray(state["keys"], dtype=np.float32)
+        if "scales" in state:
+            keys *= np.asarray(state["scales"], dtype=np.float32)[:, None]
+        self.clear()
+        for i in keep.tolist():
+            self.put(keys[i], state["values"][i])
+        return True
+
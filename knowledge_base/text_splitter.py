@@ -0,0 +1,83 @@
+"""
+Text Splitter - Single-pass boundary scan for chunking documents
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import List
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+class RegexTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    Drop-in replacement for RecursiveCharacterTextSplitter on plain text
+
+    Instead of re-splitting each oversized piece with the next separator,
+    every paragraph / line / word boundary is located with one compiled
+    regex pass. Chunks are then cut at the furthest boundary of the highest
+    priority that fits in chunk_size, falling back to a hard cut.
+
+    The scan measures chunks in characters over the default separators.
+    With another length_function, other separators, or strip_whitespace
+    off, split_text defers to the recursive splitter. keep_separator is
+    not needed on this path: it only decides which side of a cut the
+    separator whitespace lands on, and stripping removes it either way.
+    """
+
+    # Alternation order is separator priority: paragraph, line, word
+    BOUNDARY_PATTERN = re.compile(r"\n\n|\n| ")
+    _RANK = {"\n\n": 0, "\n": 1, " ": 2}
+    SEPARATORS = ["\n\n", "\n", " ", ""]
+
+    def split_text(self, text: str) -> List[str]:
+        if (
+            self._length_function is not len
+            or self._separators != self.SEPARATORS
+            or not self._strip_whitespace
+        ):
+            return super().split_text(text)
+
+        # Boundary end offsets, per separator and combined (ascending)
+        ends_by_rank: List[List[int]] = [[], [], []]
+        all_ends: List[int] = []
+        for match in self.BOUNDARY_PATTERN.finditer(text):
+            ends_by_rank[self._RANK[match.group()]].append(match.end())
+            all_ends.append(match.end())
+
+        size, overlap = self._chunk_size, self._chunk_overlap
+        length = len(text)
+        chunks = []
+        start = 0
+
+        while start < length:
+            limit = start + size
+            end = length if limit >= length else None
+
+            # Furthest boundary inside the window, best separator first
+            for ends in ends_by_rank:
+                if end is not None:
+                    break
+                i = bisect_right(ends, limit) - 1
+                if i >= 0 and ends[i] > start:
+                    end = ends[i]
+            hard_cut = end is None
+            if hard_cut:
+                end = limit
+
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= length:
+                break
+
+            # Next chunk starts on the first boundary within the overlap;
+            # after a hard cut with none, the overlap starts mid-word
+            i = bisect_left(all_ends, end - overlap)
+            if i < len(all_ends) and all_ends[i] < end:
+                next_start = all_ends[i]
+            else:
+                next_start = end - overlap if hard_cut else end
+            start = max(next_start, start + 1)
+
+        return chunks
@@ -5,14 +5,39 @@ Vector Store - ChromaDB integration for document storage and retrieval
 import os
 os.environ["ANONYMIZED_TELEMETRY"] = "FALSE"
 
+import asyncio
+import fcntl
+import time
+from contextlib import contextmanager
+
 import chromadb
 from chromadb.config import Settings
 import logging
-from typing import List, Dict, Optional
+import shutil
+import threading
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# Chroma returns top_k * RESCORE_OVERSAMPLE candidates, re-ranked with int8 codes
+RESCORE_MIN_TOP_K = 5
+RESCORE_OVERSAMPLE = 4
+
+# HNSW search_ef, fixed when the collection is created: RAG_TOP_K candidates
+# (oversampled for rescoring) * SEARCH_EF_FACTOR, rounded up to a power of two
+MIN_SEARCH_EF = 64
+SEARCH_EF_FACTOR = 4
+
+# How often (seconds) search() picks up int8 rows written by other instances
+QUANT_SYNC_INTERVAL = 1.0
+
+# Max records per Chroma write call (bounds payload size and transaction length)
+WRITE_BATCH_SIZE = 512
+
 
 class VectorStore:
     """
@@ -23,6 +48,7 @@ class VectorStore:
     - Semantic similarity search
     - Metadata filtering
     - Batch operations
+    - int8 copy of each embedding (per-vector scale) for rescoring candidates
     """
     
     def __init__(self):
@@ -38,22 +64,44 @@ class VectorStore:
         self.client = chromadb.PersistentClient(path=self.persist_directory)
         self.collection = None
         
-        logger.info(f"Vector store initialized at: {self.persist_directory}")
+        # int8 embedding codes, memory-mapped from disk and addressed by chunk ID.
+        # The files are append-only and shared by every instance and worker
+        # process; writers hold _quant_lock (threads) and an flock on
+        # quant_lock_path (processes), and readers catch up from the file tails.
+        self.quant_directory = Path(self.persist_directory) / "int8"
+        self.quant_lock_path = Path(self.persist_directory) / "int8.lock"
+        self._quant_lock = threading.Lock()
+        self._quant_synced = 0.0
+        self._clear_quantized()
+        self.search_ef = self._sized_search_ef(settings.RAG_TOP_K)
+        
+        logger.info("Vector store initialized at: %s", self.persist_directory)
     
     async def initialize(self):
         """Initialize or load existing collection"""
         try:
             # Get or create collection
+            # Embeddings are L2-normalized by the RAG engine, so inner product
+            # ranks identically to cosine without the per-distance norm divide.
+            # Index parameters only apply when the collection is first created.
             self.collection = self.client.get_or_create_collection(
                 name=self.collection_name,
-                metadata={"description": "DBS Banking Knowledge Base"}
+                metadata={
+                    "description": "DBS Banking Knowledge Base",
+                    "hnsw:space": "ip",
+                    "hnsw:M": 32,
+                    "hnsw:construction_ef": 200,
+                    "hnsw:search_ef": self.search_ef
+                }
             )
             
+            self._load_quantized()
+            
             doc_count = self.collection.count()
-            logger.info(f"Vector store loaded: {doc_count} documents in collection '{self.collection_name}'")
+            logger.info("Vector store loaded: %s documents in collection '%s'", doc_count, self.collection_name)
             
         except Exception as e:
-            logger.error(f"Failed to initialize vector store: {str(e)}", exc_info=True)
+            logger.error("Failed to initialize vector store: %s", e, exc_info=True)
             raise
     
     async def add_documents(
@@ -64,7 +112,7 @@ class VectorStore:
         embeddings: List[List[float]]
     ) -> bool:
         """
-        Add documents to vector store
+        Add documents to vector store, skipping IDs that are already stored
         
         Args:
             documents: List of document texts
@@ -79,25 +127,87 @@ class VectorStore:
             if not self.collection:
                 await self.initialize()
             
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids,
-                embeddings=embeddings
+            # Skip IDs already stored or repeated in this call (IDs are content
+            # hashes, so a matching ID means matching text); upsert the rest so
+            # a concurrent insert of the same ID cannot fail the batch
+            existing = set(self.collection.get(ids=ids, include=[])['ids']) if ids else set()
+            keep = []
+            for i, doc_id in enumerate(ids):
+                if doc_id not in existing:
+                    existing.add(doc_id)
+                    keep.append(i)
+            
+            if keep:
+                documents = [documents[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+                embeddings = [embeddings[i] for i in keep]
+                ids = [ids[i] for i in keep]
+                
+                # Blocking SQLite/disk writes run off the event loop
+                await asyncio.to_thread(
+                    self._write_batches, self.collection.upsert, documents, metadatas, ids, embeddings
+                )
+                await asyncio.to_thread(self._store_quantized, ids, embeddings)
+            
+            logger.info("Added %d new documents to vector store", len(keep))
+            return True
+            
+        except Exception as e:
+            logger.error("Failed to add documents: %s", e, exc_info=True)
+            return False
+    
+    async def upsert_documents(
+        self,
+        documents: List[str],
+        metadatas: List[Dict],
+        ids: List[str],
+        embeddings: List[List[float]]
+    ) -> bool:
+        """
+        Insert documents, overwriting any existing entries with the same IDs
+        
+        Returns:
+            True if successful
+        """
+        try:
+            if not self.collection:
+                await self.initialize()
+            
+            # Blocking SQLite/disk writes run off the event loop
+            await asyncio.to_thread(
+                self._write_batches, self.collection.upsert, documents, metadatas, ids, embeddings
             )
+            await asyncio.to_thread(self._store_quantized, ids, embeddings)
             
-            logger.info(f"Added {len(documents)} documents to vector store")
+            logger.info("Upserted %d documents to vector store", len(documents))
             return True
             
         except Exception as e:
-            logger.error(f"Failed to add documents: {str(e)}", exc_info=True)
+            logger.error("Failed to upsert documents: %s", e, exc_info=True)
             return False
     
+    async def get_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Get stored embeddings for whichever of the given IDs exist"""
+        try:
+            if not self.collection:
+                await self.initialize()
+            
+            if not ids:
+                return {}
+            
+            result = self.collection.get(ids=ids, include=["embeddings"])
+            return dict(zip(result['ids'], result['embeddings']))
+            
+        except Exception as e:
+            logger.error("Failed to get embeddings: %s", e)
+            return {}
+    
     async def search(
         self,
         query_embedding: List[float],
         top_k: int = 5,
-        filter_metadata: Optional[Dict] = None
+        filter_metadata: Optional[Dict] = None,
+        max_distance: Optional[float] = None
     ) -> List[Dict]:
         """
         Search for similar documents using embedding similarity
@@ -106,6 +216,7 @@ class VectorStore:
             query_embedding: Query vector
             top_k: Number of results to return
             filter_metadata: Optional metadata filters
+            max_distance: Optional cutoff; farther results are dropped
             
         Returns:
             List of document dicts with content, metadata, and distance
@@ -114,29 +225,50 @@ class VectorStore:
             if not self.collection:
                 await self.initialize()
             
+            self._refresh_quantized()
+            
+            # Oversample when the int8 rescore will re-rank the candidates
+            rescore = top_k >= RESCORE_MIN_TOP_K and self._codes is not None
+            n_results = top_k * RESCORE_OVERSAMPLE if rescore else top_k
+            
             # Query the collection
             results = self.collection.query(
                 query_embeddings=[query_embedding],
-                n_results=top_k,
+                n_results=n_results,
                 where=filter_metadata
             )
             
+            if not (results and results['ids'] and results['ids'][0]):
+                return []
+            
+            # Rank and cut off on the distance array; dicts are only built
+            # for the results that survive
+            ids = results['ids'][0]
+            distances = np.asarray(results['distances'][0], dtype=np.float32)
+            if rescore:
+                distances = self._rescore(query_embedding, ids, distances)
+                order = np.argsort(distances, kind="stable")[:top_k]
+            else:
+                order = np.arange(len(ids))
+            if max_distance is not None:
+                order = order[distances[order] <= max_distance]
+            
             # Format results
-            documents = []
-            if results and results['ids'] and len(results['ids']) > 0:
-                for i in range(len(results['ids'][0])):
-                    documents.append({
-                        'id': results['ids'][0][i],
-                        'content': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'distance': results['distances'][0][i]
-                    })
-            
-            logger.info(f"Search returned {len(documents)} documents")
+            documents = [
+                {
+                    'id': ids[i],
+                    'content': results['documents'][0][i],
+                    'metadata': results['metadatas'][0][i],
+                    'distance': float(distances[i])
+                }
+                for i in order.tolist()
+            ]
+            
+            logger.info("Search returned %d documents", len(documents))
             return documents
             
         except Exception as e:
-            logger.error(f"Search failed: {str(e)}", exc_info=True)
+            logger.error("Search failed: %s", e, exc_info=True)
             return []
     
     async def get_document(self, doc_id: str) -> Optional[Dict]:
@@ -157,7 +289,7 @@ class VectorStore:
             return None
             
         except Exception as e:
-            logger.error(f"Failed to get document {doc_id}: {str(e)}")
+            logger.error("Failed to get document %s: %s", doc_id, e)
             return None
     
     async def delete_document(self, doc_id: str) -> bool:
@@ -166,12 +298,13 @@ class VectorStore:
             if not self.collection:
                 await self.initialize()
             
-            self.collection.delete(ids=[doc_id])
-            logger.info(f"Deleted document: {doc_id}")
+            await asyncio.to_thread(self.collection.delete, ids=[doc_id])
+            await asyncio.to_thread(self._drop_quantized, [doc_id])
+            logger.info("Deleted document: %s", doc_id)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to delete document {doc_id}: {str(e)}")
+            logger.error("Failed to delete document %s: %s", doc_id, e)
             return False
     
     async def delete_collection(self) -> bool:
@@ -179,11 +312,13 @@ class VectorStore:
         try:
             self.client.delete_collection(name=self.collection_name)
             self.collection = None
-            logger.info(f"Deleted collection: {self.collection_name}")
+            
+            await asyncio.to_thread(self._delete_quantized)
+            logger.info("Deleted collection: %s", self.collection_name)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to delete collection: {str(e)}")
+            logger.error("Failed to delete collection: %s", e)
             return False
     
     async def get_collection_stats(self) -> Dict:
@@ -201,7 +336,7 @@ class VectorStore:
             }
             
         except Exception as e:
-            logger.error(f"Failed to get collection stats: {str(e)}")
+            logger.error("Failed to get collection stats: %s", e)
             return {}
     
     async def update_document(
@@ -216,16 +351,265 @@ class VectorStore:
             if not self.collection:
                 await self.initialize()
             
-            self.collection.update(
+            # Blocking SQLite/disk writes run off the event loop
+            await asyncio.to_thread(
+                self.collection.update,
                 ids=[doc_id],
                 documents=[document],
                 metadatas=[metadata],
                 embeddings=[embedding]
             )
+            await asyncio.to_thread(self._store_quantized, [doc_id], [embedding])
             
-            logger.info(f"Updated document: {doc_id}")
+            logger.info("Updated document: %s", doc_id)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to update document {doc_id}: {str(e)}")
-            return False
\ No newline at end of file
+            logger.error("Failed to update document %s: %s", doc_id, e)
+            return False
+    
+    @staticmethod
+    def _sized_search_ef(top_k: int) -> int:
+        """HNSW candidate list size for queries of up to top_k (oversampled) results"""
+        n_results = top_k * RESCORE_OVERSAMPLE
+        return max(MIN_SEARCH_EF, 1 << (n_results * SEARCH_EF_FACTOR - 1).bit_length())
+    
+    @staticmethod
+    def _write_batches(write, documents, metadatas, ids, embeddings):
+        """Call a collection write method in WRITE_BATCH_SIZE slices"""
+        for i in range(0, len(ids), WRITE_BATCH_SIZE):
+            end = i + WRITE_BATCH_SIZE
+            write(
+                documents=documents[i:end],
+                metadatas=metadatas[i:end],
+                ids=ids[i:end],
+                embeddings=embeddings[i:end]
+            )
+    
+    @staticmethod
+    def _quantize_int8(vectors) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric int8 codes with a float16 scale of max(abs(v)) / 127 per vector"""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        scales = (np.abs(vectors).max(axis=1) / 127.0).astype(np.float16)
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales.astype(np.float32)[:, None])
+        return np.clip(codes, -127, 127).astype(np.int8), scales
+    
+    def _load_quantized(self):
+        """Memory-map the int8 codes persisted alongside the collection"""
+        with self._quant_lock:
+            self._sync_quantized()
+    
+    def _refresh_quantized(self):
+        """Pick up other instances' writes, at most every QUANT_SYNC_INTERVAL"""
+        now = time.monotonic()
+        if now - self._quant_synced < QUANT_SYNC_INTERVAL:
+            return
+        # A writer thread holding the lock is syncing anyway
+        if self._quant_lock.acquire(blocking=False):
+            try:
+                self._sync_quantized()
+            finally:
+                self._quant_lock.release()
+    
+    @contextmanager
+    def _quant_write_lock(self):
+        """Exclusive access to the int8 files across threads and processes"""
+        with self._quant_lock:
+            self.quant_lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.quant_lock_path, "a") as lock_file:
+                # Released when the file is closed
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+    
+    def _clear_quantized(self):
+        """Forget all mapped int8 state (the files are left alone)"""
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._row_of: Dict[str, int] = {}
+        self._rows = 0
+        self._dim: Optional[int] = None
+        self._files_id: Optional[int] = None
+        self._ids_offset = 0
+        self._deleted_offset = 0
+    
+    def _sync_quantized(self, repair: bool = False):
+        """
+        Catch up with rows appended and deleted since the last sync
+        
+        Files are appended codes, scales, then ID, so a torn append leaves
+        a partial trailing row; it is never mapped, and with repair (only
+        under _quant_write_lock, where no append is in flight) it is cut
+        off so later appends stay aligned. Caller holds _quant_lock.
+        """
+        self._quant_synced = time.monotonic()
+        ids_path = self.quant_directory / "ids.txt"
+        try:
+            files_id = os.stat(ids_path).st_ino
+            dim = orjson.loads((self.quant_directory / "meta.json").read_bytes())["dim"]
+            codes_size = os.stat(self.quant_directory / "codes.i8").st_size
+            scales_size = os.stat(self.quant_directory / "scales.f16").st_size
+            with open(ids_path, "rb") as f:
+                f.seek(self._ids_offset)
+                tail = f.read()
+        except (OSError, ValueError, KeyError):
+            # No int8 files (yet), or replaced mid-read - nothing to map
+            self._clear_quantized()
+            return
+        
+        if files_id != self._files_id or dim != self._dim:
+            # Files were recreated - start over from the top
+            self._clear_quantized()
+            self._files_id, self._dim = files_id, dim
+            return self._sync_quantized(repair)
+        
+        lines = tail.split(b"\n")[:-1]
+        rows = min(self._rows + len(lines), scales_size // 2, codes_size // dim)
+        if rows < self._rows:
+            # Shorter than what is mapped: only a recreation does that
+            self._clear_quantized()
+            return
+        lines = lines[:rows - self._rows]
+        ids_end = self._ids_offset + sum(len(line) + 1 for line in lines)
+        new_ids = [line.decode() for line in lines]
+        
+        if repair:
+            if codes_size > rows * dim:
+                os.truncate(self.quant_directory / "codes.i8", rows * dim)
+            if scales_size > rows * 2:
+                os.truncate(self.quant_directory / "scales.f16", rows * 2)
+            if len(tail) > ids_end - self._ids_offset:
+                os.truncate(ids_path, ids_end)
+        
+        # Map the new rows before publishing their IDs to _rescore
+        start = self._rows
+        self._map_quantized(rows, dim)
+        self._row_of.update((doc_id, start + n) for n, doc_id in enumerate(new_ids) if doc_id)
+        self._ids_offset = ids_end
+        
+        # Deletions are logged as "doc_id row"; a later re-add has a new row
+        try:
+            with open(self.quant_directory / "deleted.txt", "rb") as f:
+                f.seek(self._deleted_offset)
+                tail = f.read()
+        except OSError:
+            return
+        tail = tail[:tail.rfind(b"\n") + 1]
+        for line in tail.split(b"\n")[:-1]:
+            doc_id, row = line.decode().rsplit(" ", 1)
+            if self._row_of.get(doc_id) == int(row):
+                del self._row_of[doc_id]
+        self._deleted_offset += len(tail)
+    
+    def _map_quantized(self, rows: int, dim: int):
+        """(Re)map the first rows of the code and scale files"""
+        if rows:
+            self._codes = np.memmap(self.quant_directory / "codes.i8", dtype=np.int8, mode="r", shape=(rows, dim))
+            self._scales = np.memmap(self.quant_directory / "scales.f16", dtype=np.float16, mode="r", shape=(rows,))
+        self._rows = rows
+    
+    def _create_quantized(self, dim: int):
+        """
+        Start empty int8 files for dim-sized embeddings; caller holds
+        _quant_write_lock
+        
+        Each file is replaced, not truncated, so other processes' mappings
+        of the old files stay valid; ids.txt goes last, and its new inode
+        tells them to start over.
+        """
+        self.quant_directory.mkdir(parents=True, exist_ok=True)
+        for name, data in (
+            ("codes.i8", b""),
+            ("scales.f16", b""),
+            ("deleted.txt", b""),
+            ("meta.json", orjson.dumps({"dim": dim})),
+            ("ids.txt", b"")
+        ):
+            tmp_path = self.quant_directory / f"{name}.tmp"
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, self.quant_directory / name)
+        self._sync_quantized()
+    
+    def _delete_quantized(self):
+        """Remove all int8 codes"""
+        with self._quant_write_lock():
+            shutil.rmtree(self.quant_directory, ignore_errors=True)
+            self._clear_quantized()
+    
+    def _store_quantized(self, ids: List[str], embeddings: List[List[float]]):
+        """
+        Write int8 codes for the given IDs
+        
+        Existing rows are overwritten in place and new IDs appended, so each
+        call costs O(len(ids)) regardless of how many rows are stored.
+        """
+        if not ids or embeddings is None or len(embeddings) == 0:
+            return
+        
+        new_codes, new_scales = self._quantize_int8(embeddings)
+        dim = new_codes.shape[1]
+        
+        with self._quant_write_lock():
+            # Appends go after every row on disk, including other writers'
+            self._sync_quantized(repair=True)
+            if self._files_id is None or self._dim != dim:
+                # No files yet, or the embedding model changed (old codes
+                # are meaningless)
+                self._create_quantized(dim)
+            
+            # Last occurrence wins for IDs repeated in one call
+            last = {doc_id: i for i, doc_id in enumerate(ids)}
+            updates = [(self._row_of[doc_id], i) for doc_id, i in last.items() if doc_id in self._row_of]
+            appends = [(doc_id, i) for doc_id, i in last.items() if doc_id not in self._row_of]
+            
+            if updates:
+                with open(self.quant_directory / "codes.i8", "r+b") as codes_file, \
+                        open(self.quant_directory / "scales.f16", "r+b") as scales_file:
+                    for row, i in updates:
+                        codes_file.seek(row * dim)
+                        codes_file.write(new_codes[i].tobytes())
+                        scales_file.seek(row * 2)
+                        scales_file.write(new_scales[i].tobytes())
+            
+            if appends:
+                index = [i for _, i in appends]
+                with open(self.quant_directory / "codes.i8", "ab") as f:
+                    f.write(new_codes[index].tobytes())
+                with open(self.quant_directory / "scales.f16", "ab") as f:
+                    f.write(new_scales[index].tobytes())
+                with open(self.quant_directory / "ids.txt", "a") as f:
+                    f.write("".join(f"{doc_id}\n" for doc_id, _ in appends))
+                self._sync_quantized()
+    
+    def _drop_quantized(self, ids: List[str]):
+        """Forget the int8 rows of deleted IDs (the rows themselves stay as dead space)"""
+        with self._quant_write_lock():
+            self._sync_quantized(repair=True)
+            dropped = [(doc_id, self._row_of[doc_id]) for doc_id in ids if doc_id in self._row_of]
+            if not dropped:
+                return
+            
+            with open(self.quant_directory / "deleted.txt", "a") as f:
+                f.write("".join(f"{doc_id} {row}\n" for doc_id, row in dropped))
+            self._sync_quantized()
+    
+    def _rescore(self, query_embedding: List[float], ids: List[str], distances: np.ndarray) -> np.ndarray:
+        """Distances recomputed from int8 codes for the candidates that have them"""
+        known = [i for i, doc_id in enumerate(ids) if doc_id in self._row_of]
+        if not known:
+            return distances
+        
+        rows = np.array([self._row_of[ids[i]] for i in known])
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        # Gather candidate rows in ascending file order so the memmap is read
+        # front-to-back (OS readahead) instead of hopping between pages
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        scores = np.empty(len(rows), dtype=np.float32)
+        scores[order] = (self._codes[sorted_rows] @ query) * self._scales[sorted_rows].astype(np.float32)
+        
+        # Inner-product distance, as reported by the "ip" collection
+        distances = distances.copy()
+        distances[known] = 1.0 - scores
+        return distances
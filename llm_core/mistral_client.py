@@ -4,13 +4,187 @@ Supports: Chat completion, Function calling, Mock mode for testing
 """
 
 import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Optional, Union
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple, Union
 
+import orjson
 from mistralai.models.chat_completion import ChatMessage
 
+from llm_core.prompts import BANKING_SYSTEM_PROMPT
+
+if TYPE_CHECKING:
+    from orchestration.conversation_manager import Message
+
 logger = logging.getLogger(__name__)
 
+# Built once so every request starts with byte-identical leading tokens,
+# which lets the provider's prompt-prefix cache serve the system prompt
+DEFAULT_SYSTEM_MESSAGE = ChatMessage(role="system", content=BANKING_SYSTEM_PROMPT)
+
+# Keyword rules for offline intent classification, in priority order:
+# when several rules match, the earliest one wins
+INTENT_KEYWORDS: Tuple[Tuple[str, float, Tuple[str, ...]], ...] = (
+    ("check_balance", 0.90, ("balance",)),
+    ("lock_card", 0.88, ("lock", "freeze", "block", "lost", "stolen")),
+    ("transfer_funds", 0.85, ("transfer", "send money")),
+    ("transaction_history", 0.82, ("transaction", "history", "statement")),
+    ("pay_bill", 0.80, ("pay", "bill", "payment")),
+    ("faq", 0.75, ("hour", "open", "fee", "charge", "limit")),
+)
+
+# Canned replies for demo mode, same priority convention: (keywords, reply)
+MOCK_RESPONSES: Tuple[Tuple[Tuple[str, ...], str], ...] = (
+    (("balance",), "Your accounts:\\n• Savings (****7890): SGD 15,420.50\\n• Current (****4321): SGD 8,250.00\\n\\nAll balances updated in real-time."),
+    (("hour", "open", "timing"), "Most DBS branches are open:\\n• Mon-Fri: 9:30 AM - 4:30 PM\\n• Saturday: 9:30 AM - 12:30 PM\\n• Sunday: Closed\\n\\nATMs available 24/7."),
+    (("fee", "charge", "cost"), "DBS account fees:\\n• Savings: No fee if balance above SGD 3,000\\n• Credit cards: SGD 0-642 annually (varies by card)\\n• Many fees waived for qualifying customers."),
+    (("transfer", "limit"), "Daily transfer limits:\\n• Own accounts: SGD 50,000\\n• DBS/POSB: SGD 30,000\\n• Other banks: SGD 20,000\\n\\nHigher limits available at branches."),
+    (("lock", "card"), "You can lock your card instantly through:\\n• DBS digibank mobile app\\n• Online banking\\n• This chatbot\\n• Call 1800-111-1111\\n\\nLocking prevents all transactions but you can unlock anytime."),
+)
+MOCK_DEFAULT_RESPONSE = "I'm running in demo mode (MISTRAL_API_KEY not configured). I can help with:\\n• Account balances\\n• Opening hours\\n• Fees and limits\\n• Card management\\n\\nWhat would you like to know?"
+
+
+def _compile_rules(keyword_sets) -> "re.Pattern":
+    """
+    Every keyword in one case-insensitive alternation, a named group r<rank>
+    per rule, so a message is scanned once instead of once per keyword
+    """
+    return re.compile("|".join(
+        f"(?P<r{rank}>{'|'.join(map(re.escape, words))})"
+        for rank, words in enumerate(keyword_sets)
+    ), re.IGNORECASE)
+
+
+def _match_rank(pattern: "re.Pattern", message: str) -> Optional[int]:
+    """Rank of the highest-priority rule with a keyword in the message"""
+    return min(
+        (int(match.lastgroup[1:]) for match in pattern.finditer(message)),
+        default=None
+    )
+
+
+INTENT_PATTERN = _compile_rules(words for _, _, words in INTENT_KEYWORDS)
+MOCK_RESPONSE_PATTERN = _compile_rules(words for words, _ in MOCK_RESPONSES)
+
+
+@lru_cache(maxsize=8)
+def _classify_system_message(intents: Tuple[str, ...], taxonomy: Optional[str]) -> ChatMessage:
+    """
+    Static part of the classification prompt (instructions + taxonomy),
+    built once per intent list so every call starts with the same prefix
+    """
+    content = f"Classify this banking query into one of these intents: {', '.join(intents)}"
+    if taxonomy:
+        content = f"{content}\n\n{taxonomy}"
+    return ChatMessage(role="system", content=f"{content}\n\nReply with the intent name only.")
+
+
+# One '<n>: <intent>' line of a batched classification reply
+BATCH_ANSWER_PATTERN = re.compile(r"^\s*(\d+)\s*[:.)-]\s*(.+)$", re.MULTILINE)
+
+
+@lru_cache(maxsize=16)
+def _intent_name_pattern(intents: Tuple[str, ...]) -> "re.Pattern":
+    """One alternation over intent names, longest first"""
+    return re.compile("|".join(map(re.escape, sorted(intents, key=len, reverse=True))))
+
+
+@lru_cache(maxsize=2)
+def _knowledge_message(knowledge_context: str) -> ChatMessage:
+    """System message carrying the knowledge base, reused while it is unchanged"""
+    return ChatMessage(role="system", content=knowledge_context)
+
+
+@lru_cache(maxsize=2)
+def _knowledge_digest(knowledge_context: str) -> str:
+    """Short stand-in for the knowledge base in cache keys"""
+    return hashlib.sha256(knowledge_context.encode()).hexdigest()
+
+
+def _context_digest(context_docs: Optional[List[Dict]]) -> Optional[str]:
+    """Short stand-in for the retrieved chunks in cache scopes"""
+    if not context_docs:
+        return None
+    payload = orjson.dumps([doc.get('content', '') for doc in context_docs])
+    return hashlib.sha256(payload).hexdigest()
+
+
+# Retrieved chunks whose word 5-gram sets overlap at least this much are
+# treated as duplicates; only the highest-ranked one reaches the prompt
+CONTEXT_SHINGLE_SIZE = 5
+CONTEXT_DEDUP_THRESHOLD = 0.85
+
+
+def _shingles(text: str) -> frozenset:
+    """Word n-grams of a chunk, lowercased"""
+    words = text.lower().split()
+    n = CONTEXT_SHINGLE_SIZE
+    if len(words) <= n:
+        return frozenset((tuple(words),))
+    return frozenset(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+
+
+def _dedupe_docs(docs: List[Dict]) -> List[Dict]:
+    """Drop near-duplicate chunks, keeping retrieval order"""
+    kept, kept_shingles = [], []
+    dropped_words = 0
+    for doc in docs:
+        shingles = _shingles(doc.get('content', ''))
+        if any(
+            len(shingles & other) >= CONTEXT_DEDUP_THRESHOLD * len(shingles | other)
+            for other in kept_shingles
+        ):
+            dropped_words += len(doc.get('content', '').split())
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+
+    if dropped_words:
+        logger.info("Context dedup dropped %d of %d docs (~%d words)",
+                    len(docs) - len(kept), len(docs), dropped_words)
+    return kept
+
+
+# Exact-key completion cache, shared by all client instances in the process:
+# sha256(request) -> (stored_at, content), least recently used evicted first
+_response_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+# Semantic cache for rephrased questions, built on first use:
+# message embedding -> (scope, content)
+_semantic_cache = None
+_embedder = None
+_semantic_cache_available = True
+
+
+def _get_semantic_cache():
+    global _semantic_cache, _embedder
+    if _semantic_cache is None:
+        from config.settings import settings
+        from knowledge_base.embeddings import get_embeddings_generator
+        from knowledge_base.semantic_cache import SemanticCache
+        
+        _embedder = get_embeddings_generator()
+        _semantic_cache = SemanticCache(
+            capacity=settings.LLM_CACHE_SIZE,
+            threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+            compress=True
+        )
+        if _semantic_cache.load(settings.LLM_SEMANTIC_CACHE_PATH):
+            logger.info("Loaded %d semantic cache entries", len(_semantic_cache))
+    return _semantic_cache
+
+
+@lru_cache(maxsize=1)
+def get_mistral_client() -> "MistralClient":
+    """Process-wide MistralClient, built on first use"""
+    return MistralClient()
+
+
 class MistralClient:
     def __init__(self):
         from config.settings import settings
@@ -19,15 +193,24 @@ class MistralClient:
         self.model = settings.MISTRAL_MODEL
         self.temperature = settings.MISTRAL_TEMPERATURE
         self.max_tokens = settings.MISTRAL_MAX_TOKENS
+        self.request_timeout = settings.MISTRAL_TIMEOUT
+        
+        # Bounds API calls in flight across every caller of this (shared) client
+        self._semaphore = asyncio.Semaphore(settings.MISTRAL_MAX_CONCURRENCY)
+        
+        # Only near-deterministic completions are worth replaying
+        self.cache_enabled = self.temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
+        self.cache_size = settings.LLM_CACHE_SIZE
+        self.cache_ttl = settings.LLM_CACHE_TTL
         
         # Initialize Mistral client if API key available
         if self.api_key and self.api_key != "your_mistral_api_key_here":
             try:
-                from mistralai.client import MistralClient as MistralAI
-                self.client = MistralAI(api_key=self.api_key)
+                from mistralai.async_client import MistralAsyncClient
+                self.client = MistralAsyncClient(api_key=self.api_key)
                 logger.info("Mistral API client initialized")
             except Exception as e:
-                logger.warning(f"Mistral API initialization failed: {e}. Using mock mode.")
+                logger.warning("Mistral API initialization failed: %s. Using mock mode.", e)
                 self.client = None
         else:
             logger.warning("MISTRAL_API_KEY not set - using mock responses")
@@ -37,108 +220,380 @@ class MistralClient:
         self,
         message: str,
         context_documents: List[Dict] = None,
-        conversation_history: List[Dict] = None,
-        system_prompt: Optional[str] = None
+        conversation_history: Optional[List["Message"]] = None,
+        system_prompt: Optional[str] = None,
+        knowledge_context: Optional[str] = None
     ) -> str:
         """
         Generate response using Mistral API with RAG context
+        (or the whole knowledge base as knowledge_context)
         Falls back to mock responses if API unavailable
         """
         try:
             if not self.client:
                 return self._mock_response(message, context_documents)
             
+            cached, cache_key, query_vector, scope = await self._cache_lookup(
+                message, context_documents, conversation_history, system_prompt,
+                knowledge_context
+            )
+            if cached is not None:
+                return cached
+            
             # Build messages for Mistral
             messages = self._build_messages(
                 message, 
                 context_documents, 
                 conversation_history,
-                system_prompt
+                system_prompt,
+                knowledge_context
             )
             
             # Call Mistral API
-            response = self.client.chat(
+            response = await self._chat(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
             
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            self._cache_store(cache_key, query_vector, scope, content)
+            return content
             
         except Exception as e:
-            logger.error(f"Mistral API error: {str(e)}", exc_info=True)
+            logger.error("Mistral API error: %s", e, exc_info=True)
             return self._mock_response(message, context_documents)
     
+    async def generate_response_stream(
+        self,
+        message: str,
+        context_documents: List[Dict] = None,
+        conversation_history: Optional[List["Message"]] = None,
+        system_prompt: Optional[str] = None,
+        knowledge_context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Same as generate_response, but yields text as the model produces it
+        Cache hits and mock responses arrive as a single chunk
+        """
+        if not self.client:
+            yield self._mock_response(message, context_documents)
+            return
+        
+        chunks = []
+        try:
+            cached, cache_key, query_vector, scope = await self._cache_lookup(
+                message, context_documents, conversation_history, system_prompt,
+                knowledge_context
+            )
+            if cached is not None:
+                yield cached
+                return
+            
+            messages = self._build_messages(
+                message,
+                context_documents,
+                conversation_history,
+                system_prompt,
+                knowledge_context
+            )
+            
+            stream = self.client.chat_stream(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            try:
+                while True:
+                    # A concurrency slot is held only while fetching, never
+                    # while the consumer (e.g. a slow SSE client) has the
+                    # chunk; the wait for each chunk is bounded, not the
+                    # whole answer
+                    async with self._semaphore:
+                        try:
+                            chunk = await asyncio.wait_for(anext(stream), self.request_timeout)
+                        except StopAsyncIteration:
+                            break
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+            finally:
+                await stream.aclose()
+            
+        except Exception as e:
+            logger.error("Mistral streaming error: %s", e, exc_info=True)
+            if not chunks:
+                yield self._mock_response(message, context_documents)
+            return
+        
+        self._cache_store(cache_key, query_vector, scope, "".join(chunks))
+    
+    async def _cache_lookup(
+        self,
+        message: str,
+        context_documents: Optional[List[Dict]],
+        conversation_history: Optional[List["Message"]],
+        system_prompt: Optional[str],
+        knowledge_context: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str], Optional[object], Tuple]:
+        """
+        Cached completion for this request, if any, plus the exact key,
+        message embedding and scope needed to store a fresh one
+        """
+        # Identical request seen recently - replay the stored completion
+        cache_key = None
+        if self.cache_enabled:
+            cache_key = self._cache_key(
+                message, context_documents, conversation_history, system_prompt,
+                knowledge_context
+            )
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("LLM response cache hit")
+                return cached, cache_key, None, ()
+        
+        # Rephrasing of a recent question - reuse its answer. Only turns with
+        # no history are shared: history can carry one user's account replies,
+        # and follow-ups only make sense within their own conversation.
+        query_vector = None
+        scope = (
+            self.model, self.temperature, system_prompt,
+            knowledge_context and _knowledge_digest(knowledge_context),
+            _context_digest(context_documents)
+        )
+        if self.cache_enabled and _semantic_cache_available and not conversation_history:
+            query_vector = await self._embed_for_cache(message)
+            if query_vector is not None:
+                hit = _get_semantic_cache().get(query_vector)
+                if hit is not None and hit[0] == scope:
+                    logger.info("LLM semantic cache hit")
+                    self._cache_put(cache_key, hit[1])
+                    return hit[1], cache_key, query_vector, scope
+        
+        return None, cache_key, query_vector, scope
+    
+    def _cache_store(self, cache_key: Optional[str], query_vector, scope: Tuple, content: str):
+        """Remember a fresh completion in both caches"""
+        if cache_key is not None:
+            self._cache_put(cache_key, content)
+        if query_vector is not None:
+            _get_semantic_cache().put(query_vector, (scope, content))
+    
+    async def _chat(self, **kwargs):
+        """Non-blocking chat call, concurrency-limited and time-bounded"""
+        async with self._semaphore:
+            async with asyncio.timeout(self.request_timeout):
+                return await self.client.chat(**kwargs)
+    
+    @staticmethod
+    def cache_clear():
+        """Drop all cached completions"""
+        _response_cache.clear()
+        if _semantic_cache is not None:
+            _semantic_cache.clear()
+    
+    @staticmethod
+    def save_semantic_cache():
+        """Persist the semantic cache (called on shutdown)"""
+        if _semantic_cache is not None:
+            from config.settings import settings
+            try:
+                _semantic_cache.save(settings.LLM_SEMANTIC_CACHE_PATH)
+            except OSError as e:
+                logger.warning("Could not save semantic cache: %s", e)
+    
+    async def _embed_for_cache(self, message: str):
+        """Local embedding of the message, or None if the model is unavailable"""
+        global _semantic_cache_available
+        try:
+            _get_semantic_cache()
+            return await _embedder.embed(message)
+        except Exception as e:
+            logger.warning("Semantic cache disabled: %s", e)
+            _semantic_cache_available = False
+            return None
+    
+    def _cache_key(
+        self,
+        message: str,
+        context_docs: Optional[List[Dict]],
+        history: Optional[List["Message"]],
+        system_prompt: Optional[str],
+        knowledge_context: Optional[str] = None
+    ) -> str:
+        """SHA-256 over everything that shapes the completion"""
+        payload = orjson.dumps({
+            "m": message.strip(),
+            "c": [doc.get('content', '') for doc in context_docs or []],
+            "h": [(msg.role, msg.content) for msg in (history or [])[-6:]],
+            "s": system_prompt,
+            "k": knowledge_context and _knowledge_digest(knowledge_context),
+            "mdl": self.model,
+            "t": self.temperature,
+            "mt": self.max_tokens
+        }, default=str, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.cache_ttl:
+            del _response_cache[key]
+            return None
+        _response_cache.move_to_end(key)
+        return entry[1]
+    
+    def _cache_put(self, key: str, content: str):
+        _response_cache[key] = (time.monotonic(), content)
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > self.cache_size:
+            _response_cache.popitem(last=False)
+    
     async def classify_intent(
         self,
         message: str,
         intents: List[str],
-        context: str = None
+        context: str = None,
+        taxonomy: Optional[str] = None
     ) -> Dict:
-        """Classify intent - fallback to keyword matching"""
+        """
+        Classify intent - fallback to keyword matching
+        
+        Prompt contract: intents and taxonomy (static descriptions/examples)
+        form the system message, identical on every call so the provider's
+        prefix cache covers it; context and message (per turn) go in the
+        user message after it.
+        """
         try:
             if not self.client:
                 return self._mock_intent(message, intents)
             
             # Simple prompt-based classification (no function calling)
-            prompt = f"Classify this banking query into one of these intents: {', '.join(intents)}\n\nQuery: {message}\n\nIntent:"
+            intents_key = tuple(intents)
+            prompt = f"Query: {message}\n\nIntent:"
+            if context:
+                prompt = f"Context: {context}\n\n{prompt}"
             
-            response = self.client.chat(
+            response = await self._chat(
                 model=self.model,
-                messages=[ChatMessage(role="user", content=prompt)],
+                messages=[
+                    _classify_system_message(intents_key, taxonomy),
+                    ChatMessage(role="user", content=prompt)
+                ],
                 temperature=0.1,
                 max_tokens=50
             )
             
-            intent_text = response.choices[0].message.content.strip().lower()
-            
-            # Find matching intent
-            for intent in intents:
-                if intent in intent_text:
-                    return {"intent": intent, "confidence": 0.85, "entities": {}}
-            
-            # Fallback to keyword
-            return self._mock_intent(message, intents)
+            intent_text = response.choices[0].message.content
+            return self._parse_intent(intent_text, message, intents)
                 
         except Exception as e:
-            logger.error(f"Intent classification error: {str(e)}")
+            logger.error("Intent classification error: %s", e)
             return self._mock_intent(message, intents)
     
+    async def classify_intent_batch(
+        self,
+        items: List[Tuple[str, Optional[str]]],
+        intents: List[str],
+        taxonomy: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Classify several (message, context) pairs with one API call
+        
+        Same system message as classify_intent; the user message numbers
+        the queries and asks for one '<n>: <intent>' line each. Items the
+        reply does not cover fall back to keyword matching.
+        """
+        if not self.client:
+            return [self._mock_intent(message, intents) for message, _ in items]
+        
+        try:
+            intents_key = tuple(intents)
+            lines = [
+                "Classify each numbered query separately. "
+                "Reply with one line per query in the form '<number>: <intent>'."
+            ]
+            for i, (message, context) in enumerate(items, 1):
+                lines.append(f"\n{i}. Query: {message}")
+                if context:
+                    lines.append(f"   Context: {context}")
+            
+            response = await self._chat(
+                model=self.model,
+                messages=[
+                    _classify_system_message(intents_key, taxonomy),
+                    ChatMessage(role="user", content="\n".join(lines))
+                ],
+                temperature=0.1,
+                max_tokens=20 * len(items)
+            )
+            
+            answers = {}
+            for match in BATCH_ANSWER_PATTERN.finditer(response.choices[0].message.content):
+                answers.setdefault(int(match.group(1)), match.group(2))
+            
+            return [
+                self._parse_intent(answers.get(i, ""), message, intents)
+                for i, (message, _) in enumerate(items, 1)
+            ]
+        
+        except Exception as e:
+            logger.error("Batch intent classification error: %s", e)
+            return [self._mock_intent(message, intents) for message, _ in items]
+    
+    def _parse_intent(self, intent_text: str, message: str, intents: List[str]) -> Dict:
+        """Intent named in an LLM reply, or the keyword fallback if none is"""
+        # Find matching intent (first in list order among those mentioned)
+        found = set(_intent_name_pattern(tuple(intents)).findall(intent_text.strip().lower()))
+        for intent in intents:
+            if intent in found:
+                return {"intent": intent, "confidence": 0.85, "entities": {}}
+        
+        # Fallback to keyword
+        return self._mock_intent(message, intents)
+    
     def _build_messages(
         self,
         message: str,
         context_docs: Optional[List[Dict]],
-        history: Optional[List[Dict]],
-        system_prompt: Optional[str]
+        history: Optional[List["Message"]],
+        system_prompt: Optional[str],
+        knowledge_context: Optional[str] = None
     ) -> List:
-        """Build message array for Mistral API"""
-        messages = []
+        """
+        Build message array for Mistral API
         
+        Order is stable prefix first: system prompt, then history, then the
+        per-request part. RAG context rides in the final user turn so it never
+        shifts the tokens of anything before it.
+        """
         # System prompt
-        if not system_prompt:
-            from llm_core.prompts import BANKING_SYSTEM_PROMPT
-            system_prompt = BANKING_SYSTEM_PROMPT
+        if system_prompt:
+            messages = [ChatMessage(role="system", content=system_prompt)]
+        else:
+            messages = [DEFAULT_SYSTEM_MESSAGE]
         
-        messages.append(ChatMessage(role="system", content=system_prompt))
+        # Whole knowledge base, right after the system prompt so both form
+        # one long prefix the provider can cache across requests
+        if knowledge_context:
+            messages.append(_knowledge_message(knowledge_context))
         
         # Add conversation history (last 6 messages)
         if history:
             for msg in history[-6:]:
                 messages.append(ChatMessage(
-                    role=msg["role"],
-                    content=msg["content"]
+                    role=msg.role,
+                    content=msg.content
                 ))
         
-        # Add RAG context if available
+        # Current message, preceded by RAG context if available
         if context_docs:
             context_text = self._format_context(context_docs)
-            messages.append(ChatMessage(
-                role="system",
-                content=f"Relevant information:\\n\\n{context_text}"
-            ))
-        
-        # Current message
+            message = f"Relevant information:\\n\\n{context_text}\\n\\nQuestion: {message}"
         messages.append(ChatMessage(role="user", content=message))
         
         return messages
@@ -146,7 +601,7 @@ class MistralClient:
     def _format_context(self, docs: List[Dict]) -> str:
         """Format retrieved documents as context"""
         parts = []
-        for i, doc in enumerate(docs, 1):
+        for i, doc in enumerate(_dedupe_docs(docs), 1):
             content = doc.get('content', '')
             source = doc.get('metadata', {}).get('source', 'Unknown')
             parts.append(f"[{i}] {content}\\n(Source: {source})")
@@ -157,8 +612,6 @@ class MistralClient:
         Mock response when API unavailable
         Uses context from RAG if available
         """
-        msg_lower = message.lower()
-        
         # If we have context documents, use them
         if context_docs and len(context_docs) > 0:
             # Extract content from first document
@@ -169,39 +622,16 @@ class MistralClient:
                 return f"Based on our knowledge base: {summary}\\n\\nIs there anything specific you'd like to know?"
         
         # Fallback to keyword-based responses
-        if "balance" in msg_lower:
-            return "Your accounts:\\n• Savings (****7890): SGD 15,420.50\\n• Current (****4321): SGD 8,250.00\\n\\nAll balances updated in real-time."
-        
-        elif any(word in msg_lower for word in ["hour", "open", "timing"]):
-            return "Most DBS branches are open:\\n• Mon-Fri: 9:30 AM - 4:30 PM\\n• Saturday: 9:30 AM - 12:30 PM\\n• Sunday: Closed\\n\\nATMs available 24/7."
-        
-        elif any(word in msg_lower for word in ["fee", "charge", "cost"]):
-            return "DBS account fees:\\n• Savings: No fee if balance above SGD 3,000\\n• Credit cards: SGD 0-642 annually (varies by card)\\n• Many fees waived for qualifying customers."
-        
-        elif any(word in msg_lower for word in ["transfer", "limit"]):
-            return "Daily transfer limits:\\n• Own accounts: SGD 50,000\\n• DBS/POSB: SGD 30,000\\n• Other banks: SGD 20,000\\n\\nHigher limits available at branches."
-        
-        elif "lock" in msg_lower or "card" in msg_lower:
-            return "You can lock your card instantly through:\\n• DBS digibank mobile app\\n• Online banking\\n• This chatbot\\n• Call 1800-111-1111\\n\\nLocking prevents all transactions but you can unlock anytime."
-        
-        else:
-            return "I'm running in demo mode (MISTRAL_API_KEY not configured). I can help with:\\n• Account balances\\n• Opening hours\\n• Fees and limits\\n• Card management\\n\\nWhat would you like to know?"
+        rank = _match_rank(MOCK_RESPONSE_PATTERN, message)
+        if rank is None:
+            return MOCK_DEFAULT_RESPONSE
+        return MOCK_RESPONSES[rank][1]
     
     def _mock_intent(self, message: str, intents: List[str]) -> Dict:
         """Mock intent classification using keywords"""
-        msg_lower = message.lower()
-        
-        if "balance" in msg_lower:
-            return {"intent": "check_balance", "confidence": 0.90, "entities": {}}
-        elif any(word in msg_lower for word in ["lock", "freeze", "block", "lost", "stolen"]):
-            return {"intent": "lock_card", "confidence": 0.88, "entities": {}}
-        elif "transfer" in msg_lower or "send money" in msg_lower:
-            return {"intent": "transfer_funds", "confidence": 0.85, "entities": {}}
-        elif any(word in msg_lower for word in ["transaction", "history", "statement"]):
-            return {"intent": "transaction_history", "confidence": 0.82, "entities": {}}
-        elif any(word in msg_lower for word in ["pay", "bill", "payment"]):
-            return {"intent": "pay_bill", "confidence": 0.80, "entities": {}}
-        elif any(word in msg_lower for word in ["hour", "open", "fee", "charge", "limit"]):
-            return {"intent": "faq", "confidence": 0.75, "entities": {}}
-        else:
-            return {"intent": "general_query", "confidence": 0.60, "entities": {}}
\ No newline at end of file
+        rank = _match_rank(INTENT_PATTERN, message)
+        if rank is None:
+            return {"intent": "general_query", "confidence": 0.60, "entities": {}}
+        
+        intent, confidence, _ = INTENT_KEYWORDS[rank]
+        return {"intent": intent, "confidence": confidence, "entities": {}}
\ No newline at end of file
@@ -2,14 +2,30 @@
 DBS AI Chatbot - Main Entry Point
 """
 
+import atexit
+import queue
 import uvicorn
 import logging
+import logging.handlers
 from pathlib import Path
 
-# Setup logging
+from config.settings import settings
+
+
+# Setup logging: callers render the message and traceback into the record
+# (so mutable args are captured as they were, and frames are released) and
+# enqueue it; timestamping and console writes happen on a listener thread
+# (per worker process)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    level=settings.LOG_LEVEL,
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 
 logger = logging.getLogger(__name__)
@@ -22,11 +38,16 @@ if __name__ == "__main__":
     Path("logs").mkdir(parents=True, exist_ok=True)
     Path("knowledge_base/documents").mkdir(parents=True, exist_ok=True)
     
-    # Run FastAPI app
+    # Run FastAPI app: auto-reload in development, one uvloop worker
+    # per core otherwise (sessions live in Redis, so workers share them)
+    development = settings.ENVIRONMENT == "development"
     uvicorn.run(
         "api_gateway.gateway:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        reload=development,
+        workers=1 if development else settings.API_WORKERS,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
\ No newline at end of file
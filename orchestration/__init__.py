@@ -16,11 +16,15 @@ def __getattr__(name):
     elif name == 'ResponseGenerator':
         from orchestration.response_generator import ResponseGenerator
         return ResponseGenerator
+    elif name == 'RedisSessionStore':
+        from orchestration.session_store import RedisSessionStore
+        return RedisSessionStore
     raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 __all__ = [
     'ConversationManager',
     'ConversationSession',
     'IntentRouter',
-    'ResponseGenerator'
+    'ResponseGenerator',
+    'RedisSessionStore'
 ]
\ No newline at end of file
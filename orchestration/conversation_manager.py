@@ -3,14 +3,30 @@ Conversation Manager - Orchestrates the entire conversation flow
 Manages: Session, Context, Intent Routing, Response Generation
 """
 
+import asyncio
 import uuid
 import logging
-from typing import Dict, Optional, List
+import time
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, Dict, Optional, List
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
+def _order_like_previous(docs: List[Dict], previous_ids: List[str]) -> List[Dict]:
+    """Repeated chunks in their previous order, then new chunks by rank"""
+    if not previous_ids:
+        return docs
+    position = {doc_id: i for i, doc_id in enumerate(previous_ids)}
+    repeated = sorted(
+        (doc for doc in docs if doc.get("id") in position),
+        key=lambda doc: position[doc["id"]]
+    )
+    return repeated + [doc for doc in docs if doc.get("id") not in position]
+
+
 class ConversationManager:
     """
     Main orchestrator for conversation flow
@@ -27,20 +43,25 @@ class ConversationManager:
         # Import here to avoid circular imports
         from orchestration.intent_router import IntentRouter
         from orchestration.response_generator import ResponseGenerator
-        from security.audit_logger import AuditLogger
+        from security.audit_logger import get_audit_logger
         
         self.intent_router = IntentRouter()
         self.response_generator = ResponseGenerator()
-        self.audit = AuditLogger()
+        self.audit = get_audit_logger()
+        
+        # Session store (Redis once connected at startup, in-process until then)
+        from config.settings import settings
+        from orchestration.session_store import RedisSessionStore
         
-        # In-memory session store (use Redis in production)
-        self.sessions: Dict[str, 'ConversationSession'] = {}
+        self.sessions = RedisSessionStore(ttl_seconds=settings.SESSION_TTL)
+        self.ragboost_enabled = settings.RAGBOOST_ENABLED
     
     async def process_message(
         self, 
         message: str, 
         session_id: Optional[str] = None,
-        user_context: Optional[Dict] = None
+        user_context: Optional[Dict] = None,
+        stream: bool = False
     ) -> Dict:
         """
         Main orchestration method - coordinates entire conversation flow
@@ -57,19 +78,21 @@ class ConversationManager:
             message: User's input message
             session_id: Optional session identifier
             user_context: Optional authenticated user context
+            stream: Stream FAQ answers as they are generated
             
         Returns:
-            Dict with response, intent, metadata
+            Dict with response, intent, metadata. A streamed answer comes
+            as "message_stream" (async iterator of text) instead of
+            "message"; steps 5-6 then run once the stream is exhausted.
         """
         try:
             # Step 1: Session Management
             if not session_id:
                 session_id = str(uuid.uuid4())
             
-            session = self.sessions.get(session_id)
+            session = await self.sessions.get(session_id)
             if not session:
                 session = ConversationSession(session_id, user_context)
-                self.sessions[session_id] = session
             
             # If session exists, check if we need to update its context
             # (e.g., user just logged in)
@@ -85,12 +108,12 @@ class ConversationManager:
                 context=session.get_context()
             )
             
-            logger.info(f"Intent classified: {intent_result['intent']} "
-                       f"(confidence: {intent_result['confidence']:.2f})")
+            logger.info("Intent classified: %s (confidence: %.2f)",
+                        intent_result['intent'], intent_result['confidence'])
             
             # Step 4: Route & Generate Response based on intent
             if intent_result["intent"] in ["faq", "general_query"]:
-                response = await self._handle_faq(message, session)
+                response = await self._handle_faq(message, session, stream=stream)
             
             elif intent_result["intent"] in ["check_balance", "transaction_history"]:
                 response = await self._handle_account_query(message, session, user_context)
@@ -106,40 +129,95 @@ class ConversationManager:
             else:
                 response = await self._handle_fallback(message, session)
             
-            # Step 5: Update Session
-            session.add_message("assistant", response["message"])
-            session.last_intent = intent_result["intent"]
-            
-            # Step 6: Audit Logging
-            self.audit.log_interaction(
-                session_id=session_id,
-                user_id=user_context.get("user_id") if user_context else None,
-                intent=intent_result["intent"],
-                message=message,
-                response=response["message"]
-            )
+            # Steps 5-6: now, or once a streamed reply has been sent
+            user_id = user_context.get("user_id") if user_context else None
+            if "message_stream" in response:
+                reply = {"message_stream": self._stream_then_finish(
+                    response["message_stream"], session, user_id, intent_result["intent"], message
+                )}
+            else:
+                await self._finish_turn(
+                    session, user_id, intent_result["intent"], message, response["message"]
+                )
+                reply = {"message": response["message"]}
             
             return {
                 "session_id": session_id,
-                "message": response["message"],
+                **reply,
                 "intent": intent_result["intent"],
                 "confidence": intent_result["confidence"],
                 "requires_auth": response.get("requires_auth", False),
                 "requires_confirmation": response.get("requires_confirmation", False),
                 "metadata": response.get("metadata", {}),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now()
             }
             
         except Exception as e:
-            logger.error(f"Error in conversation processing: {str(e)}", exc_info=True)
+            logger.error("Error in conversation processing: %s", e, exc_info=True)
             return {
                 "session_id": session_id or str(uuid.uuid4()),
                 "message": "I apologize, but I encountered an error processing your request. Please try again or contact support if the issue persists.",
                 "error": True,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now()
             }
     
-    async def _handle_faq(self, message: str, session: 'ConversationSession') -> Dict:
+    async def _finish_turn(
+        self,
+        session: 'ConversationSession',
+        user_id: Optional[str],
+        intent: str,
+        message: str,
+        reply: str
+    ):
+        """Steps 5-6: record the reply in the session and audit the turn"""
+        # Step 5: Update Session
+        session.add_message("assistant", reply)
+        session.last_intent = intent
+        await self.sessions.set(session)
+        
+        # Step 6: Audit Logging (queued, written in the background)
+        self.audit.log_interaction(
+            session_id=session.session_id,
+            user_id=user_id,
+            intent=intent,
+            message=message,
+            response=reply
+        )
+    
+    async def _stream_then_finish(
+        self,
+        stream: AsyncIterator[str],
+        session: 'ConversationSession',
+        user_id: Optional[str],
+        intent: str,
+        message: str
+    ) -> AsyncIterator[str]:
+        """
+        Pass a streamed reply through, then finish the turn with its text
+
+        If the client disconnects mid-stream, the turn is still recorded
+        and audited, with the text sent so far.
+        """
+        chunks = []
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            # Shielded so a cancelled response still saves the session
+            try:
+                await stream.aclose()
+            finally:
+                await asyncio.shield(
+                    self._finish_turn(session, user_id, intent, message, "".join(chunks))
+                )
+    
+    async def _handle_faq(
+        self,
+        message: str,
+        session: 'ConversationSession',
+        stream: bool = False
+    ) -> Dict:
         """
         Handle FAQ queries using RAG (Retrieval Augmented Generation)
         
@@ -147,34 +225,72 @@ class ConversationManager:
         1. Retrieve relevant documents from vector store
         2. Generate response using LLM + RAG context
         3. Return response with sources
+        
+        When the whole knowledge base fits in the prompt (and the LLM is
+        live), it is sent instead and retrieval is skipped.
         """
         try:
-            from knowledge_base.rag_engine import RAGEngine
-            from llm_core.mistral_client import MistralClient
+            from knowledge_base.cag_bundle import get_knowledge_bundle
+            from knowledge_base.rag_engine import get_rag_engine
+            from llm_core.mistral_client import get_mistral_client
+            
+            mistral = get_mistral_client()
+            
+            bundle = get_knowledge_bundle()
+            knowledge = bundle.current() if mistral.client else None
+            if knowledge is not None:
+                request = dict(
+                    message=message,
+                    conversation_history=session.get_history(),
+                    knowledge_context=knowledge
+                )
+                if stream:
+                    return {
+                        "message_stream": mistral.generate_response_stream(**request),
+                        "sources": bundle.sources,
+                        "type": "faq"
+                    }
+                return {
+                    "message": await mistral.generate_response(**request),
+                    "sources": bundle.sources,
+                    "type": "faq"
+                }
             
-            rag = RAGEngine()
-            mistral = MistralClient()
+            rag = get_rag_engine()
             
             # Retrieve relevant documents
             context_docs = await rag.retrieve(query=message, top_k=3)
             
-            logger.info(f"Retrieved {len(context_docs)} documents for context")
+            logger.info("Retrieved %d documents for context", len(context_docs))
+            
+            # Chunks seen last turn go first, in last turn's order, so
+            # follow-ups send (and cache) the same context prefix
+            if self.ragboost_enabled:
+                context_docs = _order_like_previous(context_docs, session.last_rag_ids)
+                session.last_rag_ids = [doc.get("id") for doc in context_docs]
             
             # Generate response using LLM + RAG context
-            response = await mistral.generate_response(
+            request = dict(
                 message=message,
                 context_documents=context_docs,
                 conversation_history=session.get_history()
             )
+            sources = [doc.get("metadata", {}).get("source", "Unknown") for doc in context_docs]
+            if stream:
+                return {
+                    "message_stream": mistral.generate_response_stream(**request),
+                    "sources": sources,
+                    "type": "faq"
+                }
             
             return {
-                "message": response,
-                "sources": [doc.get("metadata", {}).get("source", "Unknown") for doc in context_docs],
+                "message": await mistral.generate_response(**request),
+                "sources": sources,
                 "type": "faq"
             }
             
         except Exception as e:
-            logger.error(f"FAQ handling error: {str(e)}", exc_info=True)
+            logger.error("FAQ handling error: %s", e, exc_info=True)
             return {
                 "message": "I can help with general banking questions. What would you like to know about accounts, cards, transfers, or branch services?",
                 "type": "faq"
@@ -198,9 +314,9 @@ class ConversationManager:
             }
         
         try:
-            from transaction_engine.core_banking_client import CoreBankingClient
+            from transaction_engine.core_banking_client import get_core_banking_client
             
-            banking = CoreBankingClient()
+            banking = get_core_banking_client()
             account_data = await banking.get_account_info(user_context["user_id"])
             
             # Generate natural language response
@@ -215,7 +331,7 @@ class ConversationManager:
             }
             
         except Exception as e:
-            logger.error(f"Account query error: {str(e)}", exc_info=True)
+            logger.error("Account query error: %s", e, exc_info=True)
             return {
                 "message": "I'm having trouble retrieving your account information. Please try again in a moment.",
                 "type": "account_query",
@@ -241,9 +357,9 @@ class ConversationManager:
             }
         
         try:
-            from transaction_engine.workflow_engine import TransactionEngine
+            from transaction_engine.workflow_engine import get_transaction_engine
             
-            tx_engine = TransactionEngine()
+            tx_engine = get_transaction_engine()
             result = await tx_engine.initiate(
                 intent=intent,
                 message=message,
@@ -254,7 +370,7 @@ class ConversationManager:
             return result
             
         except Exception as e:
-            logger.error(f"Transaction handling error: {str(e)}", exc_info=True)
+            logger.error("Transaction handling error: %s", e, exc_info=True)
             return {
                 "message": "I'm unable to process this transaction at the moment. Please try again or visit a branch for assistance.",
                 "type": "transaction",
@@ -288,28 +404,38 @@ class ConversationManager:
             "type": "fallback"
         }
     
-    def clear_session(self, session_id: str) -> bool:
+    async def clear_session(self, session_id: str) -> bool:
         """Clear a specific session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            logger.info(f"Cleared session: {session_id}")
+        if await self.sessions.delete(session_id):
+            logger.info("Cleared session: %s", session_id)
             return True
         return False
     
-    def get_session_info(self, session_id: str) -> Optional[Dict]:
+    async def get_session_info(self, session_id: str) -> Optional[Dict]:
         """Get information about a session"""
-        session = self.sessions.get(session_id)
+        session = await self.sessions.get(session_id)
         if session:
             return {
                 "session_id": session.session_id,
                 "message_count": len(session.messages),
-                "created_at": session.created_at.isoformat(),
-                "last_activity": session.last_activity.isoformat(),
+                "created_at": datetime.fromtimestamp(session.created_at),
+                "last_activity": datetime.fromtimestamp(session.last_activity),
                 "last_intent": session.last_intent
             }
         return None
 
 
+class Message:
+    """One conversation turn (slotted: sessions hold many of these)"""
+    
+    __slots__ = ("role", "content", "ts")
+    
+    def __init__(self, role: str, content: str, ts: float):
+        self.role = role
+        self.content = content
+        self.ts = ts
+
+
 class ConversationSession:
     """
     Manages conversation state and context for a single session
@@ -321,28 +447,38 @@ class ConversationSession:
     - Intent history
     """
     
+    __slots__ = (
+        "session_id", "user_context", "messages", "created_at",
+        "last_activity", "last_intent", "transaction_state", "last_rag_ids"
+    )
+    
     def __init__(self, session_id: str, user_context: Optional[Dict] = None):
+        from config.settings import settings
+        
         self.session_id = session_id
         self.user_context = user_context or {}
-        self.messages: List[Dict] = []
-        self.created_at = datetime.now()
-        self.last_activity = datetime.now()
+        # Bounded ring buffer: oldest turns drop off in O(1)
+        self.messages: Deque[Message] = deque(maxlen=settings.SESSION_HISTORY_MAX)
+        # Epoch seconds; formatted to ISO only where a client needs it
+        self.created_at = time.time()
+        self.last_activity = self.created_at
         self.last_intent: Optional[str] = None
         self.transaction_state: Optional[Dict] = None
+        # Chunk IDs sent as RAG context on the previous FAQ turn
+        self.last_rag_ids: List[str] = []
     
     def add_message(self, role: str, content: str):
         """Add a message to the conversation history"""
-        self.messages.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
-        self.last_activity = datetime.now()
-        logger.debug(f"Session {self.session_id}: Added {role} message")
+        now = time.time()
+        self.messages.append(Message(role, content, now))
+        self.last_activity = now
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Session %s: Added %s message", self.session_id, role)
     
-    def get_history(self, last_n: int = 10) -> List[Dict]:
+    def get_history(self, last_n: int = 10) -> List[Message]:
         """Get last N messages from history"""
-        return self.messages[-last_n:] if self.messages else []
+        start = max(0, len(self.messages) - last_n)
+        return list(islice(self.messages, start, None))
     
     def get_context(self) -> Dict:
         """Get current session context for intent classification"""
@@ -352,15 +488,44 @@ class ConversationSession:
             "last_intent": self.last_intent,
             "message_count": len(self.messages),
             "transaction_state": self.transaction_state,
-            "session_duration": (datetime.now() - self.created_at).total_seconds()
+            "session_duration": time.time() - self.created_at
         }
     
     def update_user_context(self, updates: Dict):
         """Update user context (e.g., after authentication)"""
         self.user_context.update(updates)
-        logger.info(f"Session {self.session_id}: Updated user context")
+        logger.info("Session %s: Updated user context", self.session_id)
+    
+    def to_dict(self) -> Dict:
+        """Serializable snapshot for the session store"""
+        return {
+            "session_id": self.session_id,
+            "user_context": self.user_context,
+            # [role, content, ts] triples - compact and order-preserving
+            "messages": [[m.role, m.content, m.ts] for m in self.messages],
+            "created_at": self.created_at,
+            "last_activity": self.last_activity,
+            "last_intent": self.last_intent,
+            "transaction_state": self.transaction_state,
+            "last_rag_ids": self.last_rag_ids
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConversationSession':
+        """Rebuild a session from to_dict() output"""
+        session = cls(data["session_id"], data.get("user_context"))
+        session.messages.extend(
+            # Older snapshots stored each message as a dict
+            Message(m["role"], m["content"], m.get("ts", 0.0)) if isinstance(m, dict) else Message(*m)
+            for m in data.get("messages", [])
+        )
+        session.created_at = data["created_at"]
+        session.last_activity = data["last_activity"]
+        session.last_intent = data.get("last_intent")
+        session.transaction_state = data.get("transaction_state")
+        session.last_rag_ids = data.get("last_rag_ids", [])
+        return session
     
     def is_expired(self, timeout_minutes: int = 30) -> bool:
         """Check if session has expired"""
-        elapsed = datetime.now() - self.last_activity
-        return elapsed.total_seconds() > (timeout_minutes * 60)
\ No newline at end of file
+        return time.time() - self.last_activity > (timeout_minutes * 60)
\ No newline at end of file
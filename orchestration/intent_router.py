@@ -4,12 +4,35 @@ Uses: Mistral function calling for structured intent extraction
 Falls back to keyword matching if LLM unavailable
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 import re
 
+from knowledge_base.batcher import AsyncBatcher
+
 logger = logging.getLogger(__name__)
 
+# Classifications arriving within this window share one LLM call
+CLASSIFY_BATCH_SIZE = 16
+CLASSIFY_BATCH_WINDOW = 0.01
+
+# Entity patterns, compiled once
+AMOUNT_RE = re.compile(r'\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)')
+CARD_RE = re.compile(r'\b\d{4}\b')
+
+# Keyword entities: (entity, keywords in priority order). All are found in
+# one scan; per entity the highest-priority keyword present wins
+KEYWORD_ENTITIES = (
+    ("account_type", ("savings", "checking", "current", "credit")),
+    ("date_reference", ("today", "yesterday", "last week", "last month")),
+)
+KEYWORD_ENTITY_RANK = {
+    keyword: (entity, rank)
+    for entity, keywords in KEYWORD_ENTITIES
+    for rank, keyword in enumerate(keywords)
+}
+KEYWORD_ENTITY_RE = re.compile("|".join(map(re.escape, KEYWORD_ENTITY_RANK)))
+
 
 class IntentRouter:
     """
@@ -94,6 +117,55 @@ class IntentRouter:
                 "keywords": ["change", "update", "cancel", "modify", "help"]
             }
         }
+        
+        # Keyword scanner for the fallback classifier, built once
+        self._intent_names = tuple(self.intents)
+        self._keyword_pattern, self._keyword_hits = self._compile_keywords()
+        
+        # Intent descriptions and examples for the LLM, built once so the
+        # static part of every classification prompt is byte-identical
+        self._taxonomy = "\n".join(
+            f"- {name}: {info['description']} (e.g. {'; '.join(info['examples'])})"
+            for name, info in self.intents.items()
+        )
+        
+        # Shared LLM client, looked up on first classification
+        self._mistral = None
+        
+        # Concurrent classify() calls are coalesced into batched LLM requests;
+        # batches run side by side up to the client's own concurrency limit,
+        # so a chat turn never waits for an unrelated batch to finish
+        from config.settings import settings
+        self._batcher = AsyncBatcher(
+            self._classify_batch,
+            max_batch_size=CLASSIFY_BATCH_SIZE,
+            max_wait=CLASSIFY_BATCH_WINDOW,
+            max_concurrency=settings.MISTRAL_MAX_CONCURRENCY
+        )
+    
+    def _compile_keywords(self):
+        """
+        One regex that reports, at every position of the message, the
+        longest keyword starting there; plus, per such keyword, the intent
+        indices credited (once per keyword owner) for every keyword that is
+        a prefix of it - i.e. every keyword that also starts at that position
+        """
+        owners: Dict[str, List[int]] = {}
+        for i, intent_info in enumerate(self.intents.values()):
+            for keyword in intent_info.get("keywords", []):
+                owners.setdefault(keyword, []).append(i)
+        
+        keywords = sorted(owners, key=len, reverse=True)
+        pattern = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))")
+        hits = {
+            longest: tuple(
+                (keyword, owner)
+                for keyword in keywords if longest.startswith(keyword)
+                for owner in owners[keyword]
+            )
+            for longest in keywords
+        }
+        return pattern, hits
     
     async def classify(self, message: str, context: Dict) -> Dict:
         """
@@ -108,24 +180,47 @@ class IntentRouter:
         """
         try:
             # Try LLM-based classification first
-            from llm_core.mistral_client import MistralClient
+            mistral = self._get_mistral()
+            context_string = self._build_context_string(message, context)
+            if mistral.client is None:
+                # Mock mode answers locally - nothing to batch
+                result = await mistral.classify_intent(
+                    message=message,
+                    intents=self._intent_names,
+                    context=context_string
+                )
+            else:
+                result = await self._batcher.submit((message, context_string))
             
-            mistral = MistralClient()
-            result = await mistral.classify_intent(
-                message=message,
-                intents=list(self.intents.keys()),
-                context=self._build_context_string(message, context)
-            )
-            
-            logger.info(f"LLM classification: {result['intent']} "
-                       f"(confidence: {result['confidence']:.2f})")
+            logger.info("LLM classification: %s (confidence: %.2f)",
+                        result['intent'], result['confidence'])
             return result
             
         except Exception as e:
-            logger.warning(f"LLM classification failed: {str(e)}. Using fallback.")
+            logger.warning("LLM classification failed: %s. Using fallback.", e)
             # Fallback to keyword-based classification
             return self._keyword_classify(message, context)
     
+    def _get_mistral(self):
+        """Process-wide MistralClient, imported lazily (keeps module import light)"""
+        if self._mistral is None:
+            from llm_core.mistral_client import get_mistral_client
+            self._mistral = get_mistral_client()
+        return self._mistral
+    
+    async def _classify_batch(self, items: List[Tuple[str, str]]) -> List[Dict]:
+        """AsyncBatcher callback: one LLM request for all pending classifications"""
+        mistral = self._get_mistral()
+        if len(items) == 1:
+            message, context_string = items[0]
+            return [await mistral.classify_intent(
+                message=message,
+                intents=self._intent_names,
+                context=context_string,
+                taxonomy=self._taxonomy
+            )]
+        return await mistral.classify_intent_batch(items, self._intent_names, self._taxonomy)
+    
     def _keyword_classify(self, message: str, context: Dict) -> Dict:
         """
         Fallback keyword-based classification
@@ -133,27 +228,24 @@ class IntentRouter:
         """
         msg_lower = message.lower()
         
-        # Score each intent based on keyword matches
-        scores = {}
-        for intent_name, intent_info in self.intents.items():
-            score = 0
-            keywords = intent_info.get("keywords", [])
-            
-            for keyword in keywords:
-                if keyword in msg_lower:
-                    # Exact keyword match
-                    score += 1
+        # Score each intent based on keyword matches (one regex pass)
+        scores = [0] * len(self._intent_names)
+        seen = set()
+        for match in self._keyword_pattern.finditer(msg_lower):
+            for keyword, owner in self._keyword_hits[match.group(1)]:
+                if (keyword, owner) not in seen:
+                    # Exact keyword match, counted once per keyword
+                    seen.add((keyword, owner))
+                    scores[owner] += 1
                     
-                    # Bonus for keyword at start of message
-                    if msg_lower.startswith(keyword):
-                        score += 0.5
-            
-            scores[intent_name] = score
+                # Bonus for keyword at start of message
+                if match.start() == 0:
+                    scores[owner] += 0.5
         
         # Find highest scoring intent
         if scores:
-            best_intent = max(scores.items(), key=lambda x: x[1])
-            intent_name, score = best_intent
+            best = max(range(len(scores)), key=scores.__getitem__)
+            intent_name, score = self._intent_names[best], scores[best]
             
             if score > 0:
                 # Normalize confidence (max out at 3 keywords = 0.9 confidence)
@@ -162,8 +254,8 @@ class IntentRouter:
                 # Extract entities
                 entities = self._extract_entities(message, intent_name)
                 
-                logger.info(f"Keyword classification: {intent_name} "
-                          f"(confidence: {confidence:.2f}, score: {score})")
+                logger.info("Keyword classification: %s (confidence: %.2f, score: %s)",
+                            intent_name, confidence, score)
                 
                 return {
                     "intent": intent_name,
@@ -195,50 +287,36 @@ class IntentRouter:
         entities = {}
         
         # Extract monetary amounts
-        amount_pattern = r'\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-        amounts = re.findall(amount_pattern, message)
-        if amounts:
-            entities["amount"] = amounts[0].replace(',', '')
+        amount = AMOUNT_RE.search(message)
+        if amount:
+            entities["amount"] = amount.group(1).replace(',', '')
         
         # Extract last 4 digits (card numbers)
-        card_pattern = r'\b\d{4}\b'
-        card_matches = re.findall(card_pattern, message)
-        if card_matches:
-            entities["card_last_four"] = card_matches[0]
-        
-        # Extract account types
-        account_types = ["savings", "checking", "current", "credit"]
-        msg_lower = message.lower()
-        for acc_type in account_types:
-            if acc_type in msg_lower:
-                entities["account_type"] = acc_type
-                break
+        card = CARD_RE.search(message)
+        if card:
+            entities["card_last_four"] = card.group()
         
-        # Extract dates (simple patterns)
-        date_keywords = ["today", "yesterday", "last week", "last month"]
-        for date_kw in date_keywords:
-            if date_kw in msg_lower:
-                entities["date_reference"] = date_kw
-                break
+        # Extract account types and dates (simple patterns) in one pass
+        best_rank = {}
+        for match in KEYWORD_ENTITY_RE.finditer(message.lower()):
+            entity, rank = KEYWORD_ENTITY_RANK[match.group()]
+            if rank < best_rank.get(entity, len(KEYWORD_ENTITY_RANK)):
+                best_rank[entity] = rank
+                entities[entity] = match.group()
         
         return entities
     
     def _build_context_string(self, message: str, context: Dict) -> str:
         """
         Build a context string for LLM classification
-        Includes conversation history and state
+        Includes conversation state, always as the same fields in the same
+        order (absent values shown as 'none') so the prompt layout is stable
         """
-        parts = [f"Current message: {message}"]
-        
-        if context.get("last_intent"):
-            parts.append(f"Previous intent: {context['last_intent']}")
-        
-        if context.get("transaction_state"):
-            parts.append("User is in the middle of a transaction")
-        
-        if context.get("message_count", 0) > 1:
-            parts.append(f"Message {context['message_count']} in conversation")
-        
+        parts = [
+            f"Previous intent: {context.get('last_intent') or 'none'}",
+            f"Transaction state: {'active' if context.get('transaction_state') else 'none'}",
+            f"Turn: {context.get('message_count', 1)}"
+        ]
         return " | ".join(parts)
     
     def get_intent_description(self, intent_name: str) -> Optional[str]:
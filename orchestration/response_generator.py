@@ -5,10 +5,20 @@ Handles templating, formatting, and response composition
 
 from typing import Dict, List, Optional
 import logging
+import time
 from datetime import datetime
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+DISPLAY_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@lru_cache(maxsize=1)
+def _display_time(second: int) -> str:
+    """Current time for display, formatted at most once per wall-clock second"""
+    return datetime.fromtimestamp(second).strftime(DISPLAY_TIME_FORMAT)
+
 
 class ResponseGenerator:
     """
@@ -40,12 +50,37 @@ class ResponseGenerator:
             "transfer_complete": {
                 "default": "✅ **Transfer Completed**\n\n**Amount:** {currency} ${amount:,.2f}\n**From:** {from_account}\n**To:** {to_account}\n**Reference:** {reference}\n**Time:** {timestamp}\n\nYour transfer has been processed successfully."
             },
+            "confirmation": {
+                "lock_card": "⚠️ **Confirm Card Lock**\n\nYou're about to lock your {card_type} ending in {last_four}.\n\n**This will:**\n• Prevent all new transactions\n• Block ATM withdrawals\n• Stop online purchases\n\nYou can unlock it anytime through the app.\n\n**Do you want to proceed?**",
+                "transfer": "⚠️ **Confirm Transfer**\n\n**Amount:** {currency} ${amount:,.2f}\n**From:** {from_account}\n**To:** {to_account}\n\n**Do you want to proceed with this transfer?**",
+                "default": "⚠️ **Confirmation Required**\n\nPlease confirm you want to proceed with this action.\n\n**Details:** {details}"
+            },
             "error": {
                 "generic": "I apologize, but I'm unable to process your request at the moment. Please try again or contact our support team.",
                 "timeout": "The request took too long to process. Please try again.",
                 "unauthorized": "For security, you need to authenticate before I can help with this request."
             }
         }
+        
+        # Bound format methods keyed by (section, variant): one flat lookup
+        # per response instead of two nested ones plus the attribute fetch
+        self._render = {
+            (section, variant): template.format
+            for section, variants in self.templates.items()
+            for variant, template in variants.items()
+        }
+        
+        # Values used for fields missing from a confirmation's details;
+        # merged under the details once so the template reads plain keys
+        self._confirmation_defaults = {
+            "lock_card": {"card_type": "card", "last_four": "****"},
+            "transfer": {
+                "currency": "SGD",
+                "amount": 0,
+                "from_account": "Source account",
+                "to_account": "Destination account"
+            }
+        }
     
     async def format_account_info(self, account_data: Dict, original_query: str) -> str:
         """
@@ -67,21 +102,19 @@ class ResponseGenerator:
             if len(accounts) == 1:
                 # Single account - simple format
                 acc = accounts[0]
-                return self.templates["balance"]["single"].format(
+                return self._render["balance", "single"](
                     account_type=acc.get("type", "Account"),
                     last_four=acc.get("number", "")[-4:],
                     currency=acc.get("currency", "SGD"),
                     balance=acc.get("balance", 0.0)
                 )
             else:
-                # Multiple accounts - list format
-                account_lines = []
-                for acc in accounts:
-                    line = f"• **{acc['type']}** (****{acc['number'][-4:]}): {acc['currency']} ${acc['balance']:,.2f}"
-                    account_lines.append(line)
-                
-                account_list = "\n".join(account_lines)
-                return self.templates["balance"]["multiple"].format(
+                # Multiple accounts - list format, one line per account
+                account_list = "\n".join([
+                    f"• **{acc['type']}** (****{acc['number'][-4:]}): {acc['currency']} ${acc['balance']:,.2f}"
+                    for acc in accounts
+                ])
+                return self._render["balance", "multiple"](
                     account_list=account_list
                 )
                 
@@ -104,8 +137,7 @@ class ResponseGenerator:
             
             # Select appropriate template
             if transaction_type == "card_lock":
-                template = self.templates["card_locked"]["default"]
-                return template.format(
+                return self._render["card_locked", "default"](
                     card_type=result.get("card_type", "Card"),
                     last_four=result.get("last_four", "****"),
                     reference=result.get("reference", "N/A"),
@@ -113,16 +145,14 @@ class ResponseGenerator:
                 )
             
             elif transaction_type == "card_unlock":
-                template = self.templates["card_unlocked"]["default"]
-                return template.format(
+                return self._render["card_unlocked", "default"](
                     card_type=result.get("card_type", "Card"),
                     last_four=result.get("last_four", "****"),
                     reference=result.get("reference", "N/A")
                 )
             
             elif transaction_type == "transfer":
-                template = self.templates["transfer_complete"]["default"]
-                return template.format(
+                return self._render["transfer_complete", "default"](
                     currency=result.get("currency", "SGD"),
                     amount=result.get("amount", 0.0),
                     from_account=result.get("from_account", "Source"),
@@ -134,7 +164,7 @@ class ResponseGenerator:
             else:
                 # Generic success message
                 details = self._format_transaction_details(result)
-                return self.templates["transaction_success"]["default"].format(
+                return self._render["transaction_success", "default"](
                     transaction_details=details
                 )
                 
@@ -172,34 +202,10 @@ class ResponseGenerator:
         Returns:
             Formatted confirmation request
         """
-        if action == "lock_card":
-            return (
-                f"⚠️ **Confirm Card Lock**\n\n"
-                f"You're about to lock your {details.get('card_type', 'card')} "
-                f"ending in {details.get('last_four', '****')}.\n\n"
-                f"**This will:**\n"
-                f"• Prevent all new transactions\n"
-                f"• Block ATM withdrawals\n"
-                f"• Stop online purchases\n\n"
-                f"You can unlock it anytime through the app.\n\n"
-                f"**Do you want to proceed?**"
-            )
-        
-        elif action == "transfer":
-            return (
-                f"⚠️ **Confirm Transfer**\n\n"
-                f"**Amount:** {details.get('currency', 'SGD')} ${details.get('amount', 0):,.2f}\n"
-                f"**From:** {details.get('from_account', 'Source account')}\n"
-                f"**To:** {details.get('to_account', 'Destination account')}\n\n"
-                f"**Do you want to proceed with this transfer?**"
-            )
-        
-        else:
-            return (
-                f"⚠️ **Confirmation Required**\n\n"
-                f"Please confirm you want to proceed with this action.\n\n"
-                f"**Details:** {details}"
-            )
+        defaults = self._confirmation_defaults.get(action)
+        if defaults is None:
+            return self._render["confirmation", "default"](details=details)
+        return self.templates["confirmation"][action].format_map({**defaults, **details})
     
     def format_suggestion_list(self, suggestions: List[str]) -> str:
         """
@@ -241,13 +247,13 @@ class ResponseGenerator:
         if isinstance(timestamp, str):
             try:
                 dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                return dt.strftime("%Y-%m-%d %H:%M:%S")
+                return dt.strftime(DISPLAY_TIME_FORMAT)
             except:
                 return timestamp
         elif isinstance(timestamp, datetime):
-            return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+            return timestamp.strftime(DISPLAY_TIME_FORMAT)
         else:
-            return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            return _display_time(int(time.time()))
     
     def add_friendly_closing(self, message: str, intent: Optional[str] = None) -> str:
         """
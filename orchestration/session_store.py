@@ -0,0 +1,108 @@
+"""
+Session Store - Persists conversation sessions in Redis with an in-process fallback
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import orjson
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class InMemorySessionStore:
+    """
+    Process-local session store with idle expiry and a size cap
+
+    Sessions idle longer than ttl_seconds are dropped on access; beyond
+    max_sessions the least recently used session is evicted.
+    """
+
+    def __init__(self, ttl_seconds: int, max_sessions: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict = OrderedDict()
+
+    async def get(self, session_id: str):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+
+        stored_at, session = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        return session
+
+    async def set(self, session) -> None:
+        self._sessions[session.session_id] = (time.monotonic(), session)
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+class RedisSessionStore:
+    """
+    Redis-backed session store shared by all worker processes
+
+    Each session is one JSON value under sess:{session_id} whose TTL is
+    refreshed on every write, so idle sessions expire server-side. Falls
+    back to InMemorySessionStore while Redis is not connected or unreachable.
+    """
+
+    KEY_PREFIX = "sess:"
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.fallback = InMemorySessionStore(ttl_seconds)
+        self.redis = None
+
+    def connect(self, redis_client) -> None:
+        """Attach a redis.asyncio client"""
+        self.redis = redis_client
+
+    async def get(self, session_id: str):
+        from orchestration.conversation_manager import ConversationSession
+
+        if self.redis is None:
+            return await self.fallback.get(session_id)
+
+        try:
+            data = await self.redis.get(self.KEY_PREFIX + session_id)
+        except RedisError as e:
+            logger.warning("Redis session read failed: %s. Using in-process store.", e)
+            return await self.fallback.get(session_id)
+
+        if data is None:
+            return None
+        return ConversationSession.from_dict(orjson.loads(data))
+
+    async def set(self, session) -> None:
+        if self.redis is None:
+            return await self.fallback.set(session)
+
+        try:
+            await self.redis.set(
+                self.KEY_PREFIX + session.session_id,
+                orjson.dumps(session.to_dict()),
+                ex=self.ttl_seconds
+            )
+        except RedisError as e:
+            logger.warning("Redis session write failed: %s. Using in-process store.", e)
+            await self.fallback.set(session)
+
+    async def delete(self, session_id: str) -> bool:
+        if self.redis is None:
+            return await self.fallback.delete(session_id)
+
+        try:
+            return await self.redis.delete(self.KEY_PREFIX + session_id) > 0
+        except RedisError as e:
+            logger.warning("Redis session delete failed: %s", e)
+            return await self.fallback.delete(session_id)
@@ -2,20 +2,48 @@
 Audit Logger - Compliance logging for all transactions and security events
 """
 
+import asyncio
 import logging
-import json
+import threading
 from datetime import datetime
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional
 from pathlib import Path
 
+import orjson
+
 from transaction_engine.workflow_engine import Transaction
 
 logger = logging.getLogger(__name__)
 
+# Pending records (oldest interaction dropped when full), records per file
+# write, and the audit file's write buffer
+AUDIT_QUEUE_SIZE = 10_000
+AUDIT_WRITE_BATCH = 100
+AUDIT_BUFFER_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=1)
+def get_audit_logger() -> "AuditLogger":
+    """Process-wide AuditLogger (one queue, writer task and file handle)"""
+    return AuditLogger()
+
+
 class AuditLogger:
     def __init__(self):
         self.audit_file = Path("logs/audit.log")
         self.audit_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Records are written by a background task, off the request path
+        # (started on first use, on the running loop)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.dropped = 0
+        
+        # One append handle for the process, opened on first write; the
+        # lock keeps writer-thread and write-through batches whole
+        self._file = None
+        self._file_lock = threading.Lock()
     
     def log_interaction(
         self,
@@ -27,7 +55,7 @@ class AuditLogger:
     ):
         """Log user interaction"""
         audit_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": datetime.now(),
             "type": "interaction",
             "session_id": session_id,
             "user_id": user_id,
@@ -35,9 +63,9 @@ class AuditLogger:
             "message_length": len(message),
             "response_length": len(response)
         }
-        self._write_audit(audit_entry)
+        self._enqueue(audit_entry)
     
-    async def log_transaction(
+    def log_transaction(
         self,
         user_id: str,
         transaction: 'Transaction',
@@ -45,7 +73,7 @@ class AuditLogger:
     ):
         """Log transaction execution"""
         audit_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": datetime.now(),
             "type": "transaction",
             "user_id": user_id,
             "transaction_id": transaction.tx_id,
@@ -53,9 +81,9 @@ class AuditLogger:
             "result": result,
             "reference": transaction.reference
         }
-        self._write_audit(audit_entry)
+        self._enqueue(audit_entry, droppable=False)
     
-    async def log_security_alert(
+    def log_security_alert(
         self,
         user_id: str,
         transaction_id: str,
@@ -63,19 +91,101 @@ class AuditLogger:
     ):
         """Log security alert"""
         audit_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": datetime.now(),
             "type": "security_alert",
             "user_id": user_id,
             "transaction_id": transaction_id,
             "reason": reason,
             "severity": "high"
         }
-        self._write_audit(audit_entry)
+        self._enqueue(audit_entry, droppable=False)
         
         # In production: Send to SIEM, alert SOC team
-        logger.warning(f"SECURITY ALERT: {reason} - User: {user_id}")
+        logger.warning("SECURITY ALERT: %s - User: %s", reason, user_id)
+    
+    async def warmup(self):
+        """Open the audit file and start the writer before the first record"""
+        await asyncio.to_thread(self._open_file)
+        self._ensure_worker()
+    
+    async def close(self):
+        """Flush queued records, stop the background writer and close the file"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+            
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            if pending:
+                await asyncio.to_thread(self._write_batch, pending)
+        
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _enqueue(self, entry: Dict, droppable: bool = True):
+        """
+        Hand a record to the background writer without blocking
+        
+        When the queue is full the oldest record is dropped to make room,
+        except for non-droppable (transaction / security) records, which
+        are then written through instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, tests) - write through
+            self._write_audit(entry)
+            return
+        
+        self._ensure_worker()
+        
+        if self._queue.full():
+            if not droppable:
+                self._write_audit(entry)
+                return
+            self._queue.get_nowait()
+            self.dropped += 1
+            logger.warning("Audit queue full - dropped oldest record (%d so far)", self.dropped)
+        self._queue.put_nowait(entry)
+    
+    def _ensure_worker(self):
+        """Start the background writer on the running loop if it is not running"""
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+            self._worker = asyncio.create_task(self._run_writer())
+    
+    async def _run_writer(self):
+        """Background task: write queued records in batches"""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < AUDIT_WRITE_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except OSError as e:
+                logger.error("Failed to write %d audit records: %s", len(batch), e)
+    
+    def _write_batch(self, entries: List[Dict]):
+        """Append several audit entries with one write and one flush"""
+        data = b"".join(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE) for entry in entries)
+        with self._file_lock:
+            if self._file is None:
+                self._open_file_locked()
+            self._file.write(data)
+            self._file.flush()
+    
+    def _open_file(self):
+        with self._file_lock:
+            if self._file is None:
+                self._open_file_locked()
+    
+    def _open_file_locked(self):
+        self._file = open(self.audit_file, "ab", buffering=AUDIT_BUFFER_SIZE)
     
     def _write_audit(self, entry: Dict):
         """Write audit entry to file"""
-        with open(self.audit_file, "a") as f:
-            f.write(json.dumps(entry) + "\n")
\ No newline at end of file
+        self._write_batch([entry])
\ No newline at end of file
@@ -2,67 +2,229 @@
 Authentication Service - JWT tokens, OTP, session management
 """
 
-import jwt
+import hashlib
+import hmac
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, Dict
-import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Dict, Tuple
+
+from redis.exceptions import RedisError
+
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
+def _jwt():
+    """PyJWT, imported on first token operation rather than at startup"""
+    import jwt
+    return jwt
+
+@lru_cache(maxsize=1)
+def get_auth_service() -> "AuthService":
+    """Process-wide AuthService, so the token cache and OTP store are shared"""
+    return AuthService()
+
 class AuthService:
+    # Max verified tokens kept in memory
+    TOKEN_CACHE_SIZE = 10_000
+    # OTP lifetime (seconds), and how many OTPs are issued between sweeps
+    # of expired ones
+    OTP_TTL = 300
+    OTP_SWEEP_INTERVAL = 1000
+    # Login attempts allowed per user in each OTP_TTL window
+    OTP_MAX_ATTEMPTS = 5
+    OTP_KEY_PREFIX = "otp:"
+    OTP_ATTEMPTS_KEY_PREFIX = "otp_attempts:"
+    
     def __init__(self):
         self.secret_key = settings.JWT_SECRET_KEY
         self.algorithm = settings.JWT_ALGORITHM
         self.expiry_minutes = settings.JWT_EXPIRY_MINUTES
+        self._expiry_seconds = self.expiry_minutes * 60
+        
+        # OTPs live in Redis once connect() is called, so any worker can
+        # verify an OTP issued by another. Until then (or if Redis fails),
+        # in-process: user_id -> (otp, monotonic expiry), and
+        # user_id -> (attempts, monotonic window end)
+        self.redis = None
+        self.otp_store: Dict[str, Tuple[str, float]] = {}
+        self._otp_attempts: Dict[str, Tuple[int, float]] = {}
+        self._otps_issued = 0
         
-        # In-memory OTP store (use Redis in production)
-        self.otp_store: Dict[str, str] = {}
+        # Verified token cache: blake2b(token) -> payload, LRU bounded and
+        # honouring each token's exp (verify_token runs in a threadpool)
+        self._token_cache: OrderedDict[bytes, Dict] = OrderedDict()
+        self._token_cache_lock = threading.Lock()
     
-    def generate_otp(self, user_id: str) -> str:
+    def connect(self, redis_client) -> None:
+        """Attach a redis.asyncio client for the shared OTP store"""
+        self.redis = redis_client
+    
+    async def generate_otp(self, user_id: str) -> str:
         """Generate 6-digit OTP"""
-        otp = 987123#str(random.randint(100000, 999999))
-        self.otp_store[user_id] = otp
+        otp = str(secrets.randbelow(900000) + 100000)
+        
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.OTP_KEY_PREFIX + user_id, otp, ex=self.OTP_TTL)
+                logger.info("OTP generated for %s: %s", user_id, otp)
+                return otp
+            except RedisError as e:
+                logger.warning("Redis OTP write failed: %s. Using in-process store.", e)
         
-        logger.info(f"OTP generated for {user_id}: {otp}")
+        now = time.monotonic()
+        self.otp_store[user_id] = (otp, now + self.OTP_TTL)
+        
+        # Drop OTPs and attempt windows that have expired
+        self._otps_issued += 1
+        if self._otps_issued % self.OTP_SWEEP_INTERVAL == 0:
+            self.otp_store = {
+                uid: entry for uid, entry in self.otp_store.items() if entry[1] > now
+            }
+            self._otp_attempts = {
+                uid: entry for uid, entry in self._otp_attempts.items() if entry[1] > now
+            }
+        
+        logger.info("OTP generated for %s: %s", user_id, otp)
         return otp
     
-    def verify_otp(self, user_id: str, otp: str) -> bool:
-        """Verify OTP"""
-        stored_otp = self.otp_store.get(user_id)
-        
-        # For demo: Accept any 6-digit OTP
-        if len(otp) == 6 and otp.isdigit():
-            if user_id in self.otp_store:
-                del self.otp_store[user_id]
+    async def verify_otp(self, user_id: str, otp: str) -> bool:
+        """
+        Verify OTP (single use, expires after OTP_TTL seconds)
+        
+        At most OTP_MAX_ATTEMPTS tries per user in each OTP_TTL window;
+        further tries fail and discard the pending OTP.
+        """
+        if len(otp) != 6 or not (otp.isascii() and otp.isdigit()):
+            return False
+        
+        if self.redis is not None:
+            try:
+                return await self._verify_otp_redis(user_id, otp)
+            except RedisError as e:
+                logger.warning("Redis OTP check failed: %s. Using in-process store.", e)
+        
+        now = time.monotonic()
+        attempts, window_end = self._otp_attempts.get(user_id, (0, now + self.OTP_TTL))
+        if window_end <= now:
+            attempts, window_end = 0, now + self.OTP_TTL
+        attempts += 1
+        self._otp_attempts[user_id] = (attempts, window_end)
+        if attempts > self.OTP_MAX_ATTEMPTS:
+            self.otp_store.pop(user_id, None)
+            logger.warning("Too many OTP attempts for %s", user_id)
+            return False
+        
+        entry = self.otp_store.get(user_id)
+        if entry is None:
+            return False
+        
+        stored_otp, expiry = entry
+        if now >= expiry:
+            del self.otp_store[user_id]
+            return False
+        
+        if hmac.compare_digest(stored_otp.encode(), otp.encode()):
+            del self.otp_store[user_id]
+            self._otp_attempts.pop(user_id, None)
             return True
+        return False
+    
+    async def _verify_otp_redis(self, user_id: str, otp: str) -> bool:
+        otp_key = self.OTP_KEY_PREFIX + user_id
+        attempts_key = self.OTP_ATTEMPTS_KEY_PREFIX + user_id
+        
+        # Counter created with the window's TTL; INCR keeps that TTL
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(attempts_key, 0, ex=self.OTP_TTL, nx=True)
+            pipe.incr(attempts_key)
+            pipe.get(otp_key)
+            _, attempts, stored_otp = await pipe.execute()
+        
+        if attempts > self.OTP_MAX_ATTEMPTS:
+            await self.redis.delete(otp_key)
+            logger.warning("Too many OTP attempts for %s", user_id)
+            return False
+        
+        if stored_otp is None or not hmac.compare_digest(stored_otp, otp.encode()):
+            return False
         
-        return stored_otp == otp
+        # Single use: of concurrent logins with the right OTP, only the one
+        # whose DEL removes the key succeeds
+        if not await self.redis.delete(otp_key):
+            return False
+        await self.redis.delete(attempts_key)
+        return True
     
     def create_token(self, user_id: str) -> str:
         """Create JWT token"""
+        now = int(time.time())
         payload = {
             "user_id": user_id,
             "authenticated": True,
-            "exp": datetime.utcnow() + timedelta(minutes=self.expiry_minutes),
-            "iat": datetime.utcnow()
+            "exp": now + self._expiry_seconds,
+            "iat": now
         }
         
-        token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        token = _jwt().encode(payload, self.secret_key, algorithm=self.algorithm)
         return token
     
+    def cached_token(self, token: str) -> Optional[Dict]:
+        """
+        Payload of a token verified earlier and not yet expired, else None
+        
+        Only a hash and dict lookup, cheap enough to call on the event loop
+        before falling back to verify_token in a threadpool.
+        """
+        if token.startswith("Bearer "):
+            token = token[7:]
+        return self._cache_lookup(self._token_cache_key(token))
+    
     def verify_token(self, token: str) -> Optional[Dict]:
         """Verify and decode JWT token"""
+        if token.startswith("Bearer "):
+            token = token[7:]
+        
+        # Skip signature check for tokens already verified and not expired
+        cache_key = self._token_cache_key(token)
+        payload = self._cache_lookup(cache_key)
+        if payload is not None:
+            return payload
+        
+        jwt = _jwt()
         try:
-            if token.startswith("Bearer "):
-                token = token[7:]
-            
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except jwt.ExpiredSignatureError:
             logger.warning("Token expired")
             return None
         except jwt.InvalidTokenError:
             logger.warning("Invalid token")
-            return None
\ No newline at end of file
+            return None
+        
+        with self._token_cache_lock:
+            self._token_cache[cache_key] = payload
+            if len(self._token_cache) > self.TOKEN_CACHE_SIZE:
+                self._token_cache.popitem(last=False)
+        
+        return dict(payload)
+    
+    @staticmethod
+    def _token_cache_key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
+    def _cache_lookup(self, cache_key: bytes) -> Optional[Dict]:
+        """Copy of a cached payload whose exp has not passed (expired ones are dropped)"""
+        with self._token_cache_lock:
+            payload = self._token_cache.get(cache_key)
+            if payload is None:
+                return None
+            if payload.get("exp", 0) > time.time():
+                self._token_cache.move_to_end(cache_key)
+                return dict(payload)
+            del self._token_cache[cache_key]
+            return None
@@ -3,21 +3,27 @@ Fraud Detection - Anomaly detection and risk scoring
 """
 
 import logging
+import time
 from typing import Dict
-from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, deque
 from config.settings import settings
 from transaction_engine.workflow_engine import Transaction
 
 logger = logging.getLogger(__name__)
 
+# Window for the velocity check, in seconds
+VELOCITY_WINDOW = 3600
+
 class FraudDetector:
     def __init__(self):
-        # Track transaction velocity per user
-        self.user_transactions = defaultdict(list)
-        
         self.velocity_limit = settings.FRAUD_VELOCITY_LIMIT
         self.amount_threshold = settings.FRAUD_AMOUNT_THRESHOLD
+        
+        # Track transaction velocity per user: (monotonic time, tx_id),
+        # oldest first; only the last few are ever needed for the check
+        self.user_transactions = defaultdict(
+            lambda: deque(maxlen=4 * self.velocity_limit)
+        )
     
     async def check(self, transaction: 'Transaction', user_context: Dict) -> Dict:
         """
@@ -30,7 +36,11 @@ class FraudDetector:
         user_id = user_context["user_id"]
         
         # Check 1: Velocity - too many transactions in short time
-        recent_txs = self._get_recent_transactions(user_id, hours=1)
+        now = time.monotonic()
+        recent_txs = self.user_transactions[user_id]
+        cutoff = now - VELOCITY_WINDOW
+        while recent_txs and recent_txs[0][0] <= cutoff:
+            recent_txs.popleft()
         if len(recent_txs) >= self.velocity_limit:
             risk_score += 0.4
             reasons.append("High transaction velocity")
@@ -47,27 +57,15 @@ class FraudDetector:
         # For demo, skip this check
         
         # Record this transaction
-        self.user_transactions[user_id].append({
-            "timestamp": datetime.now(),
-            "transaction_id": transaction.tx_id
-        })
+        recent_txs.append((now, transaction.tx_id))
         
         is_suspicious = risk_score >= 0.5
         
         if is_suspicious:
-            logger.warning(f"Suspicious transaction detected: {transaction.tx_id}")
+            logger.warning("Suspicious transaction detected: %s", transaction.tx_id)
         
         return {
             "is_suspicious": is_suspicious,
             "reason": "; ".join(reasons) if reasons else "No issues detected",
             "risk_score": risk_score
         }
-    
-    def _get_recent_transactions(self, user_id: str, hours: int = 1) -> list:
-        """Get transactions from last N hours"""
-        cutoff = datetime.now() - timedelta(hours=hours)
-        
-        return [
-            tx for tx in self.user_transactions.get(user_id, [])
-            if tx["timestamp"] > cutoff
-        ]
\ No newline at end of file
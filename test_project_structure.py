@@ -4,11 +4,102 @@ DBS AI Chatbot - Project Structure Verification Test
 Tests all modules, imports, and directory structure
 """
 
+import argparse
+import asyncio
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import importlib
+import importlib.util
+
+# Expected project layout
+REQUIRED_DIRS = (
+    "config",
+    "api_gateway",
+    "orchestration",
+    "llm_core",
+    "knowledge_base",
+    "knowledge_base/documents",
+    "transaction_engine",
+    "security",
+    "frontend",
+    "tests",
+    "data",
+    "data/chroma",
+    "logs"
+)
+
+REQUIRED_FILES = (
+    "main.py",
+    "requirements.txt",
+    ".env",
+    "README.md"
+)
+
+OPTIONAL_FILES = (
+    ".gitignore",
+    "Dockerfile",
+    "docker-compose.yml"
+)
+
+MODULES = {
+    "config": ("__init__.py", "settings.py"),
+    "api_gateway": ("__init__.py", "gateway.py", "middleware.py"),
+    "orchestration": ("__init__.py", "conversation_manager.py", "intent_router.py", "response_generator.py"),
+    "llm_core": ("__init__.py", "mistral_client.py", "prompts.py"),
+    "knowledge_base": ("__init__.py", "vector_store.py", "rag_engine.py", "embeddings.py"),
+    "transaction_engine": ("__init__.py", "workflow_engine.py", "validators.py", "core_banking_client.py"),
+    "security": ("__init__.py", "auth_service.py", "fraud_detector.py", "audit_logger.py")
+}
+
+IMPORTS_TO_TEST = (
+    # Config
+    ("config.settings", "settings"),
+    
+    # API Gateway
+    ("api_gateway", "app"),
+    
+    # Orchestration
+    ("orchestration", "ConversationManager"),
+    ("orchestration", "IntentRouter"),
+    ("orchestration", "ResponseGenerator"),
+    
+    # LLM Core
+    ("llm_core", "MistralClient"),
+    ("llm_core.prompts", "BANKING_SYSTEM_PROMPT"),
+    
+    # Knowledge Base
+    ("knowledge_base", "VectorStore"),
+    ("knowledge_base", "EmbeddingsGenerator"),
+    ("knowledge_base", "RAGEngine"),
+    
+    # Transaction Engine
+    ("transaction_engine", "TransactionEngine"),
+    ("transaction_engine", "TransactionValidator"),
+    ("transaction_engine", "CoreBankingClient"),
+    
+    # Security
+    ("security", "AuthService"),
+    ("security", "FraudDetector"),
+    ("security", "AuditLogger")
+)
+
+# Import names (not distribution names) - these are what find_spec resolves
+REQUIRED_PACKAGES = (
+    "fastapi",
+    "uvicorn",
+    "pydantic",
+    "pydantic_settings",
+    "langchain",
+    "langchain_community",
+    "chromadb",
+    "sentence_transformers",
+    "mistralai",
+    "jwt",  # PyJWT
+    "jose"  # python-jose
+)
 
 # ANSI color codes for pretty output
 class Colors:
@@ -19,23 +110,65 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
+_HEADER = f"{Colors.BOLD}{Colors.BLUE}"
+_RULE = f"{_HEADER}{'='*80}{Colors.END}"
+_SUMMARY_RULE = f"{Colors.BOLD}{'='*80}{Colors.END}"
+_SUCCESS = f"{Colors.GREEN}✓ "
+_ERROR = f"{Colors.RED}✗ "
+_WARNING = f"{Colors.YELLOW}⚠ "
+_END = f"{Colors.END}\n"
+
+# Lines of the current section, written out in one go by flush_output()
+_buf: List[str] = []
+
+def flush_output():
+    """Write buffered lines to stdout"""
+    if _buf:
+        sys.stdout.write("".join(_buf))
+        _buf.clear()
+    sys.stdout.flush()
+
 def print_header(text: str):
-    """Print formatted header"""
-    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.END}")
-    print(f"{Colors.BOLD}{Colors.BLUE}{text.center(80)}{Colors.END}")
-    print(f"{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.END}\n")
+    """Print formatted header (flushing the previous section first)"""
+    _buf.append(f"\n{_RULE}\n{_HEADER}{text:^80}{Colors.END}\n{_RULE}\n\n")
+    flush_output()
 
 def print_success(text: str):
     """Print success message"""
-    print(f"{Colors.GREEN}✓ {text}{Colors.END}")
+    _buf.append(_SUCCESS + text + _END)
 
 def print_error(text: str):
     """Print error message"""
-    print(f"{Colors.RED}✗ {text}{Colors.END}")
+    _buf.append(_ERROR + text + _END)
 
 def print_warning(text: str):
     """Print warning message"""
-    print(f"{Colors.YELLOW}⚠ {text}{Colors.END}")
+    _buf.append(_WARNING + text + _END)
+
+@lru_cache(maxsize=None)
+def _dir_entries(directory: str) -> Dict[str, os.DirEntry]:
+    """Entries of a directory by name, from one scandir (empty if missing)"""
+    try:
+        with os.scandir(directory) as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return {}
+
+def _entry(path: str) -> Optional[os.DirEntry]:
+    """Cached DirEntry for a relative path, or None if it does not exist"""
+    parent, _, name = path.rpartition("/")
+    return _dir_entries(parent or ".").get(name)
+
+def _count_lines(path: str) -> int:
+    """Number of lines in a file, counted on raw bytes without decoding"""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(1 << 16), b""):
+            lines += buf.count(b"\n")
+            last = buf[-1:]
+    # An unterminated last line still counts, as with str.splitlines()
+    return lines + (last != b"\n")
 
 def check_directory_structure() -> Tuple[int, int]:
     """
@@ -44,28 +177,12 @@ def check_directory_structure() -> Tuple[int, int]:
     """
     print_header("DIRECTORY STRUCTURE VERIFICATION")
     
-    required_dirs = [
-        "config",
-        "api_gateway",
-        "orchestration",
-        "llm_core",
-        "knowledge_base",
-        "knowledge_base/documents",
-        "transaction_engine",
-        "security",
-        "frontend",
-        "tests",
-        "data",
-        "data/chroma",
-        "logs"
-    ]
-    
     passed = 0
     failed = 0
     
-    for directory in required_dirs:
-        path = Path(directory)
-        if path.exists() and path.is_dir():
+    for directory in REQUIRED_DIRS:
+        entry = _entry(directory)
+        if entry is not None and entry.is_dir():
             print_success(f"Directory exists: {directory}/")
             passed += 1
         else:
@@ -81,36 +198,22 @@ def check_root_files() -> Tuple[int, int]:
     """
     print_header("ROOT FILES VERIFICATION")
     
-    required_files = [
-        "main.py",
-        "requirements.txt",
-        ".env",
-        "README.md"
-    ]
-    
-    optional_files = [
-        ".gitignore",
-        "Dockerfile",
-        "docker-compose.yml"
-    ]
-    
     passed = 0
     failed = 0
     
-    for file in required_files:
-        path = Path(file)
-        if path.exists() and path.is_file():
-            size = path.stat().st_size
+    for file in REQUIRED_FILES:
+        entry = _entry(file)
+        if entry is not None and entry.is_file():
+            size = entry.stat().st_size
             print_success(f"File exists: {file} ({size} bytes)")
             passed += 1
         else:
             print_error(f"File missing: {file}")
             failed += 1
     
-    print("\nOptional files:")
-    for file in optional_files:
-        path = Path(file)
-        if path.exists():
+    _buf.append("\nOptional files:\n")
+    for file in OPTIONAL_FILES:
+        if _entry(file) is not None:
             print_success(f"File exists: {file}")
         else:
             print_warning(f"File missing (optional): {file}")
@@ -124,31 +227,17 @@ def check_module_files() -> Tuple[int, int]:
     """
     print_header("MODULE FILES VERIFICATION")
     
-    modules = {
-        "config": ["__init__.py", "settings.py"],
-        "api_gateway": ["__init__.py", "gateway.py", "middleware.py"],
-        "orchestration": ["__init__.py", "conversation_manager.py", "intent_router.py", "response_generator.py"],
-        "llm_core": ["__init__.py", "mistral_client.py", "prompts.py"],
-        "knowledge_base": ["__init__.py", "vector_store.py", "rag_engine.py", "embeddings.py"],
-        "transaction_engine": ["__init__.py", "workflow_engine.py", "validators.py", "core_banking_client.py"],
-        "security": ["__init__.py", "auth_service.py", "fraud_detector.py", "audit_logger.py"]
-    }
-    
     passed = 0
     failed = 0
     
-    for module, files in modules.items():
-        print(f"\n{Colors.BOLD}Module: {module}/{Colors.END}")
+    for module, files in MODULES.items():
+        _buf.append(f"\n{Colors.BOLD}Module: {module}/{Colors.END}\n")
         for file in files:
-            path = Path(module) / file
-            if path.exists() and path.is_file():
-                size = path.stat().st_size
-                try:
-                    lines = len(path.read_text(encoding='utf-8').splitlines())
-                    print_success(f"  {file} ({lines} lines, {size} bytes)")
-                except UnicodeDecodeError:
-                    # If UTF-8 fails, just show size
-                    print_success(f"  {file} ({size} bytes)")
+            entry = _dir_entries(module).get(file)
+            if entry is not None and entry.is_file():
+                size = entry.stat().st_size
+                lines = _count_lines(entry.path)
+                print_success(f"  {file} ({lines} lines, {size} bytes)")
                 passed += 1
             else:
                 print_error(f"  {file} - MISSING")
@@ -163,56 +252,42 @@ def check_imports() -> Tuple[int, int]:
     """
     print_header("MODULE IMPORT VERIFICATION")
     
-    # Add current directory to Python path
-    sys.path.insert(0, str(Path.cwd()))
-    
-    imports_to_test = [
-        # Config
-        ("config.settings", "settings"),
-        
-        # API Gateway
-        ("api_gateway", "app"),
-        
-        # Orchestration
-        ("orchestration", "ConversationManager"),
-        ("orchestration", "IntentRouter"),
-        ("orchestration", "ResponseGenerator"),
-        
-        # LLM Core
-        ("llm_core", "MistralClient"),
-        ("llm_core.prompts", "BANKING_SYSTEM_PROMPT"),
-        
-        # Knowledge Base
-        ("knowledge_base", "VectorStore"),
-        ("knowledge_base", "EmbeddingsGenerator"),
-        ("knowledge_base", "RAGEngine"),
-        
-        # Transaction Engine
-        ("transaction_engine", "TransactionEngine"),
-        ("transaction_engine", "TransactionValidator"),
-        ("transaction_engine", "CoreBankingClient"),
-        
-        # Security
-        ("security", "AuthService"),
-        ("security", "FraudDetector"),
-        ("security", "AuditLogger")
-    ]
+    # Add current directory to Python path (once, if called repeatedly)
+    cwd = str(Path.cwd())
+    if cwd not in sys.path:
+        sys.path.insert(0, cwd)
     
     passed = 0
     failed = 0
     
-    for module_name, object_name in imports_to_test:
-        try:
-            module = importlib.import_module(module_name)
-            if hasattr(module, object_name):
-                print_success(f"Import OK: from {module_name} import {object_name}")
-                passed += 1
-            else:
-                print_error(f"Import FAILED: {object_name} not found in {module_name}")
+    # Group the names by module so each module is resolved once
+    by_module: Dict[str, List[str]] = {}
+    for module_name, object_name in IMPORTS_TO_TEST:
+        by_module.setdefault(module_name, []).append(object_name)
+    
+    for module_name, object_names in by_module.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            try:
+                module = importlib.import_module(module_name)
+            except Exception as e:
+                for _ in object_names:
+                    print_error(f"Import FAILED: {module_name} - {str(e)}")
+                failed += len(object_names)
+                continue
+        
+        for object_name in object_names:
+            # Lazy package exports import their submodule here
+            try:
+                if hasattr(module, object_name):
+                    print_success(f"Import OK: from {module_name} import {object_name}")
+                    passed += 1
+                else:
+                    print_error(f"Import FAILED: {object_name} not found in {module_name}")
+                    failed += 1
+            except Exception as e:
+                print_error(f"Import FAILED: {module_name} - {str(e)}")
                 failed += 1
-        except Exception as e:
-            print_error(f"Import FAILED: {module_name} - {str(e)}")
-            failed += 1
     
     return passed, failed
 
@@ -223,29 +298,20 @@ def check_dependencies() -> Tuple[int, int]:
     """
     print_header("DEPENDENCY VERIFICATION")
     
-    required_packages = [
-        "fastapi",
-        "uvicorn",
-        "pydantic",
-        "pydantic_settings",
-        "langchain",
-        "langchain_community",
-        "chromadb",
-        "sentence_transformers",
-        "mistralai",
-        "pyjwt",
-        "python_jose"
-    ]
-    
     passed = 0
     failed = 0
     
-    for package in required_packages:
+    for package in REQUIRED_PACKAGES:
+        # find_spec locates the package without running it, so torch and
+        # friends are not initialised just to prove they are installed
         try:
-            importlib.import_module(package)
+            installed = importlib.util.find_spec(package) is not None
+        except (ImportError, ValueError):
+            installed = False
+        if installed:
             print_success(f"Package installed: {package}")
             passed += 1
-        except ImportError:
+        else:
             print_error(f"Package missing: {package}")
             failed += 1
     
@@ -299,22 +365,25 @@ def check_sample_documents() -> Tuple[int, int]:
     """
     print_header("SAMPLE DOCUMENTS VERIFICATION")
     
-    docs_path = Path("knowledge_base/documents")
+    docs_path = "knowledge_base/documents"
     expected_docs = ["dbs_faqs.txt", "dbs_products.txt", "dbs_policies.txt"]
     
     passed = 0
     failed = 0
     
-    if not docs_path.exists():
+    if _entry(docs_path) is None:
         print_warning("Documents directory doesn't exist yet (will be created)")
         return 0, 0
     
-    existing_docs = list(docs_path.glob("*.txt")) + list(docs_path.glob("*.pdf"))
+    existing_docs = [
+        entry for entry in _dir_entries(docs_path).values()
+        if entry.name.endswith((".txt", ".pdf")) and entry.is_file()
+    ]
     
     if len(existing_docs) > 0:
         print_success(f"Found {len(existing_docs)} document(s) in knowledge_base/documents/")
         for doc in existing_docs:
-            size = doc.stat().st_size
+            size = doc.stat().st_size  # cached by scandir
             print_success(f"  - {doc.name} ({size} bytes)")
             passed += 1
     else:
@@ -347,42 +416,42 @@ def run_functional_tests() -> Tuple[int, int]:
         print_error(f"Embeddings test failed: {str(e)}")
         failed += 1
     
-    # Test 2: Intent classification
-    try:
-        from orchestration.intent_router import IntentRouter
-        router = IntentRouter()
-        import asyncio
-        result = asyncio.run(router.classify("What's my balance?", {}))
-        if result['intent'] == 'check_balance':
-            print_success(f"Intent classification OK: {result['intent']} (confidence: {result['confidence']:.2f})")
-            passed += 1
-        else:
-            print_warning(f"Intent classification unexpected: {result['intent']}")
-            passed += 1  # Still counts as working
-    except Exception as e:
-        print_error(f"Intent classification test failed: {str(e)}")
-        failed += 1
-    
-    # Test 3: Response generation
-    try:
-        from orchestration.response_generator import ResponseGenerator
-        generator = ResponseGenerator()
-        account_data = {
-            "accounts": [
-                {"type": "Savings", "number": "1234567890", "balance": 10000.00, "currency": "SGD"}
-            ]
-        }
-        import asyncio
-        response = asyncio.run(generator.format_account_info(account_data, "check balance"))
-        if "Savings" in response and "10,000.00" in response:
-            print_success("Response generation OK")
-            passed += 1
-        else:
-            print_error("Response generation unexpected output")
+    # The async tests share one event loop instead of one asyncio.run each
+    with asyncio.Runner() as runner:
+        # Test 2: Intent classification
+        try:
+            from orchestration.intent_router import IntentRouter
+            router = IntentRouter()
+            result = runner.run(router.classify("What's my balance?", {}))
+            if result['intent'] == 'check_balance':
+                print_success(f"Intent classification OK: {result['intent']} (confidence: {result['confidence']:.2f})")
+                passed += 1
+            else:
+                print_warning(f"Intent classification unexpected: {result['intent']}")
+                passed += 1  # Still counts as working
+        except Exception as e:
+            print_error(f"Intent classification test failed: {str(e)}")
+            failed += 1
+        
+        # Test 3: Response generation
+        try:
+            from orchestration.response_generator import ResponseGenerator
+            generator = ResponseGenerator()
+            account_data = {
+                "accounts": [
+                    {"type": "Savings", "number": "1234567890", "balance": 10000.00, "currency": "SGD"}
+                ]
+            }
+            response = runner.run(generator.format_account_info(account_data, "check balance"))
+            if "Savings" in response and "10,000.00" in response:
+                print_success("Response generation OK")
+                passed += 1
+            else:
+                print_error("Response generation unexpected output")
+                failed += 1
+        except Exception as e:
+            print_error(f"Response generation test failed: {str(e)}")
             failed += 1
-    except Exception as e:
-        print_error(f"Response generation test failed: {str(e)}")
-        failed += 1
     
     return passed, failed
 
@@ -405,7 +474,7 @@ def generate_summary_report(results: Dict[str, Tuple[int, int]]):
         total_passed += passed
         total_failed += failed
     
-    print(f"\n{Colors.BOLD}{'='*80}{Colors.END}")
+    print(f"\n{_SUMMARY_RULE}")
     grand_total = total_passed + total_failed
     if grand_total > 0:
         success_rate = (total_passed / grand_total) * 100
@@ -426,7 +495,7 @@ def generate_summary_report(results: Dict[str, Tuple[int, int]]):
         print(f"{Colors.BOLD}Total: {total_passed}/{grand_total} checks passed ({success_rate:.1f}%){Colors.END}")
         print(f"{status_color}{Colors.BOLD}Status: {status_text}{Colors.END}")
     
-    print(f"{Colors.BOLD}{'='*80}{Colors.END}\n")
+    print(f"{_SUMMARY_RULE}\n")
     
     # Recommendations
     if total_failed > 0:
@@ -439,8 +508,24 @@ def generate_summary_report(results: Dict[str, Tuple[int, int]]):
             print(f"{Colors.YELLOW}  → Fix import errors before running the application{Colors.END}")
         print()
 
+CHECKS = (
+    ("Directories", check_directory_structure),
+    ("Root Files", check_root_files),
+    ("Module Files", check_module_files),
+    ("Dependencies", check_dependencies),
+    ("Configuration", check_configuration),
+    ("Sample Documents", check_sample_documents),
+    ("Module Imports", check_imports),
+    ("Functional Tests", run_functional_tests)
+)
+
 def main():
     """Main test execution"""
+    parser = argparse.ArgumentParser(description="Verify the DBS AI Chatbot project structure")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="stop at the first check with failures")
+    args = parser.parse_args()
+    
     print(f"\n{Colors.BOLD}{Colors.BLUE}")
     print("  ____  ____  ____    _    ___    ____ _           _   _           _   ")
     print(" |  _ \\| __ )/ ___|  / \\  |_ _|  / ___| |__   __ _| |_| |__   ___ | |_ ")
@@ -453,15 +538,13 @@ def main():
     
     results = {}
     
-    # Run all verification checks
-    results["Directories"] = check_directory_structure()
-    results["Root Files"] = check_root_files()
-    results["Module Files"] = check_module_files()
-    results["Dependencies"] = check_dependencies()
-    results["Configuration"] = check_configuration()
-    results["Module Imports"] = check_imports()
-    results["Sample Documents"] = check_sample_documents()
-    results["Functional Tests"] = run_functional_tests()
+    # Run all verification checks, cheapest first: imports and functional
+    # tests load the ML stack, so --fail-fast stops before reaching them
+    for category, check in CHECKS:
+        results[category] = check()
+        if args.fail_fast and results[category][1]:
+            print_warning(f"Stopping after failed check: {category} (--fail-fast)")
+            break
     
     # Generate summary
     generate_summary_report(results)
@@ -3,27 +3,28 @@ Transaction Engine - Handles banking transactions with state machine workflow
 Manages transaction validation, execution, and core banking integration
 """
 
-# Import classes only when explicitly requested to avoid circular imports
+import importlib
+
+# Public name -> defining module, imported only when explicitly requested
+# to avoid circular imports
+_LAZY = {
+    'TransactionEngine': 'transaction_engine.workflow_engine',
+    'Transaction': 'transaction_engine.workflow_engine',
+    'TransactionState': 'transaction_engine.workflow_engine',
+    'TransactionType': 'transaction_engine.workflow_engine',
+    'TransactionValidator': 'transaction_engine.validators',
+    'CoreBankingClient': 'transaction_engine.core_banking_client',
+    'RedisTransactionStore': 'transaction_engine.transaction_store'
+}
+
 def __getattr__(name):
-    if name == 'TransactionEngine':
-        from transaction_engine.workflow_engine import TransactionEngine
-        return TransactionEngine
-    elif name == 'Transaction':
-        from transaction_engine.workflow_engine import Transaction
-        return Transaction
-    elif name == 'TransactionState':
-        from transaction_engine.workflow_engine import TransactionState
-        return TransactionState
-    elif name == 'TransactionType':
-        from transaction_engine.workflow_engine import TransactionType
-        return TransactionType
-    elif name == 'TransactionValidator':
-        from transaction_engine.validators import TransactionValidator
-        return TransactionValidator
-    elif name == 'CoreBankingClient':
-        from transaction_engine.core_banking_client import CoreBankingClient
-        return CoreBankingClient
-    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module_name), name)
+    # Later lookups find the name directly and skip __getattr__
+    globals()[name] = value
+    return value
 
 __all__ = [
     'TransactionEngine',
@@ -31,5 +32,6 @@ __all__ = [
     'TransactionState',
     'TransactionType',
     'TransactionValidator',
-    'CoreBankingClient'
-]
\ No newline at end of file
+    'CoreBankingClient',
+    'RedisTransactionStore'
+]
@@ -4,12 +4,44 @@ Mock implementation for demo, replace with real APIs in production
 """
 
 import logging
-from typing import Dict, List
+import secrets
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple
 import asyncio
 from datetime import datetime
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Shared (immutable) result for users with no accounts or cards
+_NO_ITEMS = ()
+
+# Random suffix bytes per reference: 40 bits keeps references from all
+# worker processes (and hosts) distinct within the same second
+_REFERENCE_SUFFIX_BYTES = 5
+
+
+@lru_cache(maxsize=1)
+def _reference_stamp(second: int) -> str:
+    """YYYYMMDDHHMMSS for a wall-clock second, formatted once per second"""
+    return datetime.fromtimestamp(second).strftime("%Y%m%d%H%M%S")
+
+
+def _new_reference(prefix: str) -> Tuple[str, datetime]:
+    """(reference, timestamp) read from a single clock call"""
+    now = time.time()
+    suffix = secrets.token_hex(_REFERENCE_SUFFIX_BYTES).upper()
+    reference = f"{prefix}{_reference_stamp(int(now))}{suffix}"
+    return reference, datetime.fromtimestamp(now)
+
+
+@lru_cache(maxsize=1)
+def get_core_banking_client() -> "CoreBankingClient":
+    """Process-wide CoreBankingClient"""
+    return CoreBankingClient()
+
+
 class CoreBankingClient:
     """
     Mock core banking client
@@ -53,41 +85,51 @@ class CoreBankingClient:
         }
     }
     
+    # Per-user views of MOCK_USERS, so a read is a single lookup
+    _ACCOUNTS_BY_USER = {uid: user["accounts"] for uid, user in MOCK_USERS.items()}
+    _CARDS_BY_USER = {uid: user["cards"] for uid, user in MOCK_USERS.items()}
+    
+    def __init__(self):
+        self._simulate_latency = settings.CORE_BANKING_SIMULATE_LATENCY
+    
+    async def _latency(self, seconds: float):
+        """Pretend to wait on the core banking system (only when enabled)"""
+        if self._simulate_latency:
+            await asyncio.sleep(seconds)
+    
     async def get_account_info(self, user_id: str) -> Dict:
         """Get user account information"""
-        await asyncio.sleep(0.1)  # Simulate API latency
+        await self._latency(0.1)  # Simulate API latency
         
-        user_data = self.MOCK_USERS.get(user_id, {})
         return {
             "user_id": user_id,
-            "accounts": user_data.get("accounts", [])
+            "accounts": self._ACCOUNTS_BY_USER.get(user_id, _NO_ITEMS)
         }
     
     async def get_user_cards(self, user_id: str) -> Dict:
         """Get user's cards"""
-        await asyncio.sleep(0.1)
+        await self._latency(0.1)
         
-        user_data = self.MOCK_USERS.get(user_id, {})
         return {
             "user_id": user_id,
-            "cards": user_data.get("cards", [])
+            "cards": self._CARDS_BY_USER.get(user_id, _NO_ITEMS)
         }
     
     async def lock_card(self, user_id: str, card_id: str) -> Dict:
         """Lock a credit/debit card"""
-        await asyncio.sleep(0.2)  # Simulate processing
+        await self._latency(0.2)  # Simulate processing
         
         # In production: Make API call to core banking
         # POST /api/cards/{card_id}/lock
         
-        reference = f"REF{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        reference, timestamp = _new_reference("REF")
         
         logger.info(f"Card {card_id} locked for user {user_id}")
         
         return {
             "success": True,
             "reference": reference,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
     
     async def transfer_funds(
@@ -98,15 +140,33 @@ class CoreBankingClient:
         to_account: str
     ) -> Dict:
         """Transfer funds between accounts"""
-        await asyncio.sleep(0.3)
+        await self._latency(0.3)
+        return self._transfer(amount, from_account, to_account)
+    
+    async def transfer_funds_batch(self, transfers: List[Dict]) -> List[Dict]:
+        """
+        Submit several transfers in one request
         
-        reference = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        Args:
+            transfers: transfer_funds keyword arguments, one dict per transfer
+            
+        Returns:
+            One transfer_funds-style result per transfer, in order
+        """
+        await self._latency(0.3)  # One round trip for the whole batch
+        return [
+            self._transfer(t["amount"], t["from_account"], t["to_account"])
+            for t in transfers
+        ]
+    
+    def _transfer(self, amount: float, from_account: str, to_account: str) -> Dict:
+        reference, timestamp = _new_reference("TXN")
         
-        logger.info(f"Transfer: {amount} from {from_account} to {to_account}")
+        logger.info("Transfer: %s from %s to %s", amount, from_account, to_account)
         
         return {
             "success": True,
             "reference": reference,
             "amount": amount,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
\ No newline at end of file
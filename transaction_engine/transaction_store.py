@@ -0,0 +1,148 @@
+"""
+Transaction Store - Persists in-flight transactions in Redis with an in-process fallback
+"""
+
+import logging
+import time
+from typing import Optional, Tuple
+
+import orjson
+from redis.exceptions import RedisError, WatchError
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryTransactionStore:
+    """
+    Process-local transaction store with expiry
+
+    Transactions older than ttl_seconds are dropped on access and swept
+    every SWEEP_INTERVAL writes. Only one coroutine runs between awaits,
+    so claim() is atomic without a lock.
+    """
+
+    SWEEP_INTERVAL = 1000
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._transactions = {}
+        self._writes = 0
+
+    async def get(self, tx_id: str):
+        entry = self._transactions.get(tx_id)
+        if entry is None:
+            return None
+
+        expires_at, transaction = entry
+        if time.monotonic() > expires_at:
+            del self._transactions[tx_id]
+            return None
+        return transaction
+
+    async def save(self, transaction) -> None:
+        now = time.monotonic()
+        self._transactions[transaction.tx_id] = (now + self.ttl_seconds, transaction)
+
+        self._writes += 1
+        if self._writes % self.SWEEP_INTERVAL == 0:
+            self._transactions = {
+                tx_id: entry for tx_id, entry in self._transactions.items()
+                if entry[0] > now
+            }
+
+    async def claim(self, tx_id: str, expected, new) -> Tuple[Optional[object], bool]:
+        transaction = await self.get(tx_id)
+        if transaction is None or transaction.state != expected:
+            return transaction, False
+        transaction.state = new
+        return transaction, True
+
+
+class RedisTransactionStore:
+    """
+    Redis-backed transaction store shared by all worker processes
+
+    Each transaction is one JSON value under tx:{tx_id} with a TTL, so
+    abandoned confirmations expire server-side. claim() moves a transaction
+    between states with WATCH/MULTI, so a confirmation replayed against two
+    workers executes once. Falls back to InMemoryTransactionStore while
+    Redis is not connected or unreachable.
+    """
+
+    KEY_PREFIX = "tx:"
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.fallback = InMemoryTransactionStore(ttl_seconds)
+        self.redis = None
+
+    def connect(self, redis_client) -> None:
+        """Attach a redis.asyncio client"""
+        self.redis = redis_client
+
+    async def get(self, tx_id: str):
+        from transaction_engine.workflow_engine import Transaction
+
+        if self.redis is None:
+            return await self.fallback.get(tx_id)
+
+        try:
+            data = await self.redis.get(self.KEY_PREFIX + tx_id)
+        except RedisError as e:
+            logger.warning("Redis transaction read failed: %s. Using in-process store.", e)
+            return await self.fallback.get(tx_id)
+
+        if data is None:
+            return None
+        return Transaction.from_dict(orjson.loads(data))
+
+    async def save(self, transaction) -> None:
+        if self.redis is None:
+            return await self.fallback.save(transaction)
+
+        try:
+            await self.redis.set(
+                self.KEY_PREFIX + transaction.tx_id,
+                orjson.dumps(transaction.to_dict()),
+                ex=self.ttl_seconds
+            )
+        except RedisError as e:
+            logger.warning("Redis transaction write failed: %s. Using in-process store.", e)
+            await self.fallback.save(transaction)
+
+    async def claim(self, tx_id: str, expected, new) -> Tuple[Optional[object], bool]:
+        """
+        Atomically move a transaction from state expected to new
+
+        Returns (transaction, claimed); transaction is None if unknown,
+        and claimed is False if it was not in the expected state (or
+        another worker changed it concurrently).
+        """
+        from transaction_engine.workflow_engine import Transaction
+
+        if self.redis is None:
+            return await self.fallback.claim(tx_id, expected, new)
+
+        key = self.KEY_PREFIX + tx_id
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(key)
+                data = await pipe.get(key)
+                if data is None:
+                    return None, False
+
+                transaction = Transaction.from_dict(orjson.loads(data))
+                if transaction.state != expected:
+                    return transaction, False
+
+                transaction.state = new
+                pipe.multi()
+                pipe.set(key, orjson.dumps(transaction.to_dict()), ex=self.ttl_seconds)
+                await pipe.execute()
+                return transaction, True
+        except WatchError:
+            logger.warning("Transaction %s changed while being claimed", tx_id)
+            return await self.get(tx_id), False
+        except RedisError as e:
+            logger.warning("Redis transaction claim failed: %s. Using in-process store.", e)
+            return await self.fallback.claim(tx_id, expected, new)
@@ -5,9 +5,35 @@ Validates transactions against business rules and constraints
 
 import logging
 from typing import Dict
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Business rules per transaction type:
+# (required params, error if one is missing,
+#  daily amount limit or None, error for amount <= 0, error over the limit)
+_RULES = {
+    "transfer_funds": (
+        ("from_account", "to_account"),
+        "Both source and destination accounts are required",
+        50000,
+        "Transfer amount must be greater than zero",
+        "Transfer amount exceeds daily limit of SGD 50,000"
+    ),
+    "lock_card": (
+        ("card_id",),
+        "Card ID is required",
+        None, None, None
+    ),
+    "pay_bill": (
+        ("payee",),
+        "Payee information is required",
+        20000,
+        "Payment amount must be greater than zero",
+        "Bill payment exceeds daily limit of SGD 20,000"
+    )
+}
+
 
 class TransactionValidator:
     """
@@ -20,10 +46,9 @@ class TransactionValidator:
     """
     
     def __init__(self):
-        from config.settings import settings
         self.settings = settings
     
-    async def validate(
+    def validate(
         self,
         tx_type: str,  # Using string instead of enum to avoid circular import
         params: Dict,
@@ -47,91 +72,25 @@ class TransactionValidator:
                 "error": "Please specify which card to lock"
             }
         
-        # Validate based on transaction type
-        if tx_type == "transfer_funds":
-            return await self._validate_transfer(params, user_context)
-        
-        elif tx_type == "lock_card":
-            return await self._validate_card_lock(params, user_context)
-        
-        elif tx_type == "pay_bill":
-            return await self._validate_bill_payment(params, user_context)
-        
-        # Default: allow transaction
-        return {"valid": True}
-    
-    async def _validate_transfer(self, params: Dict, user_context: Dict) -> Dict:
-        """Validate fund transfer"""
-        amount = params.get("amount", 0)
-        
-        # Check daily limit
-        if amount > 50000:
-            return {
-                "valid": False,
-                "error": "Transfer amount exceeds daily limit of SGD 50,000"
-            }
-        
-        # Check minimum amount
-        if amount <= 0:
-            return {
-                "valid": False,
-                "error": "Transfer amount must be greater than zero"
-            }
-        
-        # Validate accounts exist
-        from_account = params.get("from_account")
-        to_account = params.get("to_account")
-        
-        if not from_account or not to_account:
-            return {
-                "valid": False,
-                "error": "Both source and destination accounts are required"
-            }
-        
-        # Check sufficient balance (would query core banking in production)
-        # For now, assume validation passes
-        
-        return {"valid": True}
-    
-    async def _validate_card_lock(self, params: Dict, user_context: Dict) -> Dict:
-        """Validate card locking request"""
-        card_id = params.get("card_id")
-        
-        if not card_id:
-            return {
-                "valid": False,
-                "error": "Card ID is required"
-            }
-        
-        # Check if card belongs to user (would verify with core banking)
-        # For now, assume validation passes
-        
-        return {"valid": True}
-    
-    async def _validate_bill_payment(self, params: Dict, user_context: Dict) -> Dict:
-        """Validate bill payment"""
-        amount = params.get("amount", 0)
-        payee = params.get("payee")
-        
-        if not payee:
-            return {
-                "valid": False,
-                "error": "Payee information is required"
-            }
-        
-        if amount <= 0:
-            return {
-                "valid": False,
-                "error": "Payment amount must be greater than zero"
-            }
-        
-        # Check daily payment limit
-        if amount > 20000:
-            return {
-                "valid": False,
-                "error": "Bill payment exceeds daily limit of SGD 20,000"
-            }
-        
+        rule = _RULES.get(tx_type)
+        if rule is None:
+            # Default: allow transaction
+            return {"valid": True}
+        
+        required, missing_error, limit, non_positive_error, limit_error = rule
+        for field in required:
+            if not params.get(field):
+                return {"valid": False, "error": missing_error}
+        
+        if limit is not None:
+            amount = params.get("amount", 0)
+            if amount <= 0:
+                return {"valid": False, "error": non_positive_error}
+            if amount > limit:
+                return {"valid": False, "error": limit_error}
+        
+        # Balance and card ownership would be checked against core banking
+        # in production; for now validation passes
         return {"valid": True}
     
     def validate_amount(self, amount: float, min_amount: float = 0, max_amount: float = None) -> Dict:
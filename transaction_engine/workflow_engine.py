@@ -4,10 +4,14 @@ Handles: Validation, Confirmation, Execution, Rollback
 """
 
 import logging
-from typing import Dict, Optional
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional
 from enum import Enum
 from datetime import datetime
-import uuid
+import secrets
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +39,11 @@ class TransactionType(Enum):
 
 class Transaction:
     """Transaction data model"""
+    __slots__ = (
+        "tx_id", "tx_type", "user_id", "state", "params",
+        "reference", "error", "initiated_at", "completed_at"
+    )
+    
     def __init__(self, tx_id: str, tx_type: TransactionType, user_id: str, initiated_at: datetime):
         self.tx_id = tx_id
         self.tx_type = tx_type
@@ -45,6 +54,98 @@ class Transaction:
         self.error: Optional[str] = None
         self.initiated_at = initiated_at
         self.completed_at: Optional[datetime] = None
+    
+    def to_dict(self) -> Dict:
+        """Serialize transaction for the transaction store"""
+        return {
+            "tx_id": self.tx_id,
+            "tx_type": self.tx_type.value,
+            "user_id": self.user_id,
+            "state": self.state.value,
+            "params": self.params,
+            "reference": self.reference,
+            "error": self.error,
+            "initiated_at": self.initiated_at,
+            "completed_at": self.completed_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Transaction":
+        """Rebuild transaction from stored dict"""
+        transaction = cls(
+            tx_id=data["tx_id"],
+            tx_type=TransactionType(data["tx_type"]),
+            user_id=data["user_id"],
+            initiated_at=datetime.fromisoformat(data["initiated_at"])
+        )
+        transaction.state = TransactionState(data["state"])
+        transaction.params = data["params"]
+        transaction.reference = data["reference"]
+        transaction.error = data["error"]
+        if data["completed_at"]:
+            transaction.completed_at = datetime.fromisoformat(data["completed_at"])
+        return transaction
+
+
+# Seconds a user's card list is reused between initiations, and how many
+# users' lists are kept
+CARDS_CACHE_TTL = 30.0
+CARDS_CACHE_SIZE = 10_000
+
+# User-facing messages; the lock-card confirmation has no parameters
+CONFIRM_LOCK_CARD = (
+    "You're about to lock your card. This will:\n"
+    "• Prevent all new transactions\n"
+    "• Block ATM withdrawals\n"
+    "• Stop online purchases\n\n"
+    "You can unlock it anytime. Proceed?"
+)
+CONFIRM_TRANSFER = (
+    "Confirm transfer:\n"
+    "• Amount: SGD {amount:,.2f}\n"
+    "• From: {from_account}\n"
+    "• To: {to_account}\n\n"
+    "Proceed with this transfer?"
+)
+TRANSFER_DEFAULTS = {"amount": 0, "from_account": "N/A", "to_account": "N/A"}
+SUCCESS_LOCK_CARD = (
+    "✅ Success! Your card has been locked.\n\n"
+    "Reference: {reference}\n"
+    "Time: {time:%Y-%m-%d %H:%M:%S}\n\n"
+    "Next steps:\n"
+    "• Unlock anytime via app\n"
+    "• Request replacement if lost\n"
+    "• Call 1800-111-1111 to report fraud"
+)
+SUCCESS_DEFAULT = "✅ Transaction completed successfully.\nReference: {reference}"
+
+# Transfers confirmed within this window (seconds) go to core banking as
+# one batch request of up to TRANSFER_BATCH_SIZE
+TRANSFER_BATCH_SIZE = 64
+TRANSFER_BATCH_WINDOW = 0.005
+
+# Templated transfer requests ("transfer SGD 1,000 from savings to
+# checking"), parsed without an LLM call
+TRANSFER_RE = re.compile(
+    r"(?:transfer|send|move|pay)\s+(?:SGD\s*|S?\$\s*)?(?P<amount>\d[\d,]*(?:\.\d+)?)"
+    r"\s+from\s+(?:my\s+)?(?P<from_account>\w+)(?:\s+account)?"
+    r"\s+to\s+(?:my\s+)?(?P<to_account>\w+)",
+    re.IGNORECASE
+)
+
+# Intents the engine can run as transactions
+_INTENT_TO_TYPE = {
+    "lock_card": TransactionType.LOCK_CARD,
+    "unlock_card": TransactionType.UNLOCK_CARD,
+    "transfer_funds": TransactionType.TRANSFER_FUNDS,
+    "pay_bill": TransactionType.PAY_BILL
+}
+
+
+@lru_cache(maxsize=1)
+def get_transaction_engine() -> "TransactionEngine":
+    """Process-wide TransactionEngine (its in-flight transactions are shared)"""
+    return TransactionEngine()
 
 
 class TransactionEngine:
@@ -61,17 +162,40 @@ class TransactionEngine:
     def __init__(self):
         # Import here to avoid circular imports
         from transaction_engine.validators import TransactionValidator
-        from transaction_engine.core_banking_client import CoreBankingClient
+        from transaction_engine.core_banking_client import get_core_banking_client
         from security.fraud_detector import FraudDetector
-        from security.audit_logger import AuditLogger
+        from security.audit_logger import get_audit_logger
+        from transaction_engine.transaction_store import RedisTransactionStore
+        from knowledge_base.batcher import AsyncBatcher
+        from config.settings import settings
         
         self.validator = TransactionValidator()
-        self.core_banking = CoreBankingClient()
+        self.core_banking = get_core_banking_client()
         self.fraud_detector = FraudDetector()
-        self.audit = AuditLogger()
+        self.audit = get_audit_logger()
+        
+        # Transaction store (Redis once connected at startup, in-process until then)
+        self.transactions = RedisTransactionStore(ttl_seconds=settings.TRANSACTION_TTL)
+        
+        # Concurrent transfer executions share core banking requests
+        self._transfer_batcher = AsyncBatcher(
+            self._transfer_batch,
+            max_batch_size=TRANSFER_BATCH_SIZE,
+            max_wait=TRANSFER_BATCH_WINDOW
+        )
         
-        # In-memory transaction store (use Redis in production)
-        self.transactions: Dict[str, Transaction] = {}
+        # user_id -> (fetched at, get_user_cards result), least recently used first
+        self._cards_cache: OrderedDict = OrderedDict()
+    
+    async def warmup(self):
+        """
+        Do first-use setup before the first request (called at startup)
+        
+        Opens the audit file and starts the audit writer and transfer
+        batcher tasks on the serving loop.
+        """
+        await self.audit.warmup()
+        self._transfer_batcher.start()
     
     async def initiate(
         self,
@@ -93,9 +217,15 @@ class TransactionEngine:
             Dict with transaction status and message
         """
         try:
-            # Create transaction
-            tx_id = str(uuid.uuid4())
             tx_type = self._map_intent_to_type(intent)
+            if tx_type is None:
+                return {
+                    "message": "I can't process that type of transaction yet.",
+                    "error": True
+                }
+            
+            # Create transaction
+            tx_id = secrets.token_hex(16)
             
             transaction = Transaction(
                 tx_id=tx_id,
@@ -104,14 +234,12 @@ class TransactionEngine:
                 initiated_at=datetime.now()
             )
             
-            self.transactions[tx_id] = transaction
-            
             # Extract parameters from message
             params = await self._extract_parameters(message, tx_type, user_context)
             transaction.params = params
             
             # Validate transaction
-            validation_result = await self.validator.validate(
+            validation_result = self.validator.validate(
                 tx_type.value,  # Pass string value instead of enum
                 params, 
                 user_context
@@ -120,6 +248,7 @@ class TransactionEngine:
             if not validation_result["valid"]:
                 transaction.state = TransactionState.FAILED
                 transaction.error = validation_result["error"]
+                await self.transactions.save(transaction)
                 return {
                     "message": f"Unable to process: {validation_result['error']}",
                     "error": True
@@ -132,9 +261,10 @@ class TransactionEngine:
             if fraud_result["is_suspicious"]:
                 transaction.state = TransactionState.FAILED
                 transaction.error = "Transaction blocked due to suspicious activity"
+                await self.transactions.save(transaction)
                 
                 # Alert security
-                await self.audit.log_security_alert(
+                self.audit.log_security_alert(
                     user_id=user_context["user_id"],
                     transaction_id=tx_id,
                     reason=fraud_result["reason"]
@@ -147,6 +277,7 @@ class TransactionEngine:
             
             # Request confirmation
             transaction.state = TransactionState.PENDING_CONFIRMATION
+            await self.transactions.save(transaction)
             confirmation_message = self._generate_confirmation_message(transaction)
             
             return {
@@ -170,7 +301,7 @@ class TransactionEngine:
         self,
         transaction_type: str,
         params: Dict,
-        user_context: Dict
+        user_context: Optional[Dict]
     ) -> Dict:
         """
         Execute confirmed transaction
@@ -178,34 +309,79 @@ class TransactionEngine:
         Args:
             transaction_type: Type of transaction
             params: Transaction parameters including transaction_id
-            user_context: User context
+            user_context: Authenticated user context; only the user who
+                initiated the transaction may confirm it
             
         Returns:
             Dict with execution result
         """
+        transaction = None
         try:
-            tx_id = params.get("transaction_id")
-            transaction = self.transactions.get(tx_id)
+            tx_id = params.get("transaction_id") or ""
             
-            if not transaction:
-                raise ValueError("Transaction not found")
+            if not user_context or not user_context.get("user_id"):
+                return {
+                    "success": False,
+                    "message": "Please log in to confirm this transaction.",
+                    "error": True
+                }
+            
+            # Another user's transaction is answered like an unknown one, so
+            # transaction IDs cannot be probed
+            pending = await self.transactions.get(tx_id)
+            if pending is None or pending.user_id != user_context["user_id"]:
+                if pending is None:
+                    logger.warning("Confirmation for unknown transaction %s", tx_id)
+                else:
+                    logger.warning("User %s tried to confirm transaction %s of another user",
+                                   user_context["user_id"], tx_id)
+                return {
+                    "success": False,
+                    "message": "This transaction has expired or could not be found. Please start again.",
+                    "error": True
+                }
             
-            if transaction.state != TransactionState.PENDING_CONFIRMATION:
-                raise ValueError(f"Invalid transaction state: {transaction.state}")
+            # Claimed atomically so a repeated confirmation cannot execute twice
+            transaction, claimed = await self.transactions.claim(
+                tx_id,
+                TransactionState.PENDING_CONFIRMATION,
+                TransactionState.EXECUTING
+            )
             
-            transaction.state = TransactionState.EXECUTING
+            # Stale or replayed confirmations are expected - answer them
+            # without raising (and without a logged traceback)
+            if not transaction:
+                logger.warning("Confirmation for unknown transaction %s", tx_id)
+                return {
+                    "success": False,
+                    "message": "This transaction has expired or could not be found. Please start again.",
+                    "error": True
+                }
+            
+            if not claimed:
+                logger.warning("Confirmation for transaction %s in state %s", tx_id, transaction.state.value)
+                return {
+                    "success": False,
+                    "message": "This transaction has already been processed.",
+                    "error": True
+                }
             
             # Execute via core banking
             result = await self._execute_core_banking(transaction)
             
             if result["success"]:
                 transaction.state = TransactionState.COMPLETED
-                transaction.completed_at = datetime.now()
+                # Core banking already stamped the execution; reuse it
+                transaction.completed_at = result.get("timestamp") or datetime.now()
                 transaction.reference = result["reference"]
+                await self.transactions.save(transaction)
+                if transaction.tx_type in (TransactionType.LOCK_CARD, TransactionType.UNLOCK_CARD):
+                    # Card status changed - next lookup goes to core banking
+                    self._cards_cache.pop(transaction.user_id, None)
                 
                 # Audit log
-                await self.audit.log_transaction(
-                    user_id=user_context["user_id"],
+                self.audit.log_transaction(
+                    user_id=transaction.user_id,
                     transaction=transaction,
                     result="success"
                 )
@@ -221,6 +397,7 @@ class TransactionEngine:
             else:
                 transaction.state = TransactionState.FAILED
                 transaction.error = result.get("error", "Unknown error")
+                await self.transactions.save(transaction)
                 
                 return {
                     "success": False,
@@ -232,6 +409,10 @@ class TransactionEngine:
             logger.error(f"Transaction execution failed: {str(e)}", exc_info=True)
             if transaction:
                 transaction.state = TransactionState.FAILED
+                try:
+                    await self.transactions.save(transaction)
+                except Exception:
+                    logger.exception("Could not record failed transaction %s", transaction.tx_id)
             return {
                 "success": False,
                 "message": "Transaction could not be completed. Please try again.",
@@ -256,7 +437,7 @@ class TransactionEngine:
     async def _extract_card_params(self, message: str, user_context: Dict) -> Dict:
         """Extract card locking parameters"""
         # Get user's cards from core banking
-        user_data = await self.core_banking.get_user_cards(user_context["user_id"])
+        user_data = await self._get_user_cards(user_context["user_id"])
         
         # If user has multiple cards, need to ask which one
         if len(user_data["cards"]) > 1:
@@ -269,8 +450,31 @@ class TransactionEngine:
                 "card_id": user_data["cards"][0]["id"]
             }
     
+    async def _get_user_cards(self, user_id: str) -> Dict:
+        """User's cards, reused for CARDS_CACHE_TTL seconds (e.g. across clarifications)"""
+        now = time.monotonic()
+        entry = self._cards_cache.get(user_id)
+        if entry is not None and now - entry[0] < CARDS_CACHE_TTL:
+            self._cards_cache.move_to_end(user_id)
+            return entry[1]
+        
+        user_data = await self.core_banking.get_user_cards(user_id)
+        self._cards_cache[user_id] = (now, user_data)
+        self._cards_cache.move_to_end(user_id)
+        if len(self._cards_cache) > CARDS_CACHE_SIZE:
+            self._cards_cache.popitem(last=False)
+        return user_data
+    
     async def _extract_transfer_params(self, message: str, user_context: Dict) -> Dict:
         """Extract fund transfer parameters"""
+        match = TRANSFER_RE.search(message)
+        if match:
+            return {
+                "amount": float(match["amount"].replace(",", "")),
+                "from_account": match["from_account"].lower(),
+                "to_account": match["to_account"].lower()
+            }
+        
         # In production, use Mistral function calling for entity extraction
         return {
             "amount": 1000.0,
@@ -278,61 +482,47 @@ class TransactionEngine:
             "to_account": "checking"
         }
     
-    def _map_intent_to_type(self, intent: str) -> TransactionType:
-        """Map intent string to transaction type enum"""
-        mapping = {
-            "lock_card": TransactionType.LOCK_CARD,
-            "unlock_card": TransactionType.UNLOCK_CARD,
-            "transfer_funds": TransactionType.TRANSFER_FUNDS,
-            "pay_bill": TransactionType.PAY_BILL
-        }
-        return mapping.get(intent, TransactionType.LOCK_CARD)
+    def _map_intent_to_type(self, intent: str) -> Optional[TransactionType]:
+        """Map intent string to transaction type enum (None if unsupported)"""
+        return _INTENT_TO_TYPE.get(intent)
     
     def _generate_confirmation_message(self, transaction: Transaction) -> str:
         """Generate human-readable confirmation message"""
         if transaction.tx_type == TransactionType.LOCK_CARD:
-            return (
-                f"You're about to lock your card. This will:\n"
-                f"• Prevent all new transactions\n"
-                f"• Block ATM withdrawals\n"
-                f"• Stop online purchases\n\n"
-                f"You can unlock it anytime. Proceed?"
-            )
+            return CONFIRM_LOCK_CARD
         elif transaction.tx_type == TransactionType.TRANSFER_FUNDS:
-            params = transaction.params
-            return (
-                f"Confirm transfer:\n"
-                f"• Amount: SGD {params.get('amount', 0):,.2f}\n"
-                f"• From: {params.get('from_account', 'N/A')}\n"
-                f"• To: {params.get('to_account', 'N/A')}\n\n"
-                f"Proceed with this transfer?"
-            )
+            return CONFIRM_TRANSFER.format_map({**TRANSFER_DEFAULTS, **transaction.params})
         return "Please confirm this transaction."
     
     def _generate_success_message(self, transaction: Transaction, result: Dict) -> str:
         """Generate success message"""
         if transaction.tx_type == TransactionType.LOCK_CARD:
-            return (
-                f"✅ Success! Your card has been locked.\n\n"
-                f"Reference: {result['reference']}\n"
-                f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                f"Next steps:\n"
-                f"• Unlock anytime via app\n"
-                f"• Request replacement if lost\n"
-                f"• Call 1800-111-1111 to report fraud"
+            return SUCCESS_LOCK_CARD.format(
+                reference=result['reference'],
+                time=transaction.completed_at
             )
-        return f"✅ Transaction completed successfully.\nReference: {result['reference']}"
+        return SUCCESS_DEFAULT.format(reference=result['reference'])
     
     async def _execute_core_banking(self, transaction: Transaction) -> Dict:
         """Execute transaction via core banking API"""
+        params = transaction.params
         if transaction.tx_type == TransactionType.LOCK_CARD:
             return await self.core_banking.lock_card(
                 user_id=transaction.user_id,
-                card_id=transaction.params.get("card_id", "")
+                card_id=params.get("card_id", "")
             )
         elif transaction.tx_type == TransactionType.TRANSFER_FUNDS:
-            return await self.core_banking.transfer_funds(
-                user_id=transaction.user_id,
-                **transaction.params
-            )
-        return {"success": False, "error": "Unsupported transaction type"}
\ No newline at end of file
+            # Validation guaranteed these; pass exactly the API's arguments
+            return await self._transfer_batcher.submit({
+                "user_id": transaction.user_id,
+                "amount": params["amount"],
+                "from_account": params["from_account"],
+                "to_account": params["to_account"]
+            })
+        return {"success": False, "error": "Unsupported transaction type"}
+    
+    async def _transfer_batch(self, transfers: List[Dict]) -> List[Dict]:
+        """AsyncBatcher callback: one core banking request per batch of transfers"""
+        if len(transfers) == 1:
+            return [await self.core_banking.transfer_funds(**transfers[0])]
+        return await self.core_banking.transfer_funds_batch(transfers)
\ No newline at end of file